@@ -1,18 +1,32 @@
 import os
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.core.config import settings
 from backend.app.core.middlewares import add_middlewares
-from backend.app.logic.universal_controller_instance import universal_controller
+from backend.app.core.logging_config import setup_logging, stop_logging
+from backend.app.core.responses import RespuestaJSON
+from backend.app.core.lanes import carriles
+from backend.app.logic.universal_controller_instance import universal_controller, vigilante_cambios
+from backend.app.logic.antipassback import estado_presencia
+from backend.app.logic.archivo import archivo_mensual
+from backend.app.logic.face_embedding import extractor_facial
+from backend.app.logic.verification import comparador_facial
 from backend.app.api.routes import access_service
 from backend.app.api.routes.biometria import biometria_cud, biometria_query
+from backend.app.api.routes.credenciales import credenciales_query
 from backend.app.api.routes.historial_estado_usuario import historial_estado_usuario_cud, historial_estado_usuario_query
 from backend.app.api.routes.usuarios import usuarios_cud, usuarios_query
 from backend.app.api.routes.operarios import operarios_cud, operarios_query
 from backend.app.api.routes.registros_invalidos import registros_invalidos_cud, registros_invalidos_query
 from backend.app.api.routes.registros import registros_cud, registros_query
 from backend.app.api.routes.torniquetes import torniquetes_cud, torniquetes_query
+from backend.app.api.routes.trafico import trafico_query
+
+# Logging centralizado con escritura en segundo plano
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Montar archivos estáticos
 
@@ -20,19 +34,34 @@ from backend.app.api.routes.torniquetes import torniquetes_cud, torniquetes_quer
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # ===== STARTUP =====
-    print("Conexión establecida con la base de datos")
+    logger.info("Conexión establecida con la base de datos")
+    # Mantiene las cachés de este worker al día con las escrituras de los demás
+    vigilante_cambios.iniciar()
+    # Estado de anti-passback reconstruido desde Registros y su escritor en segundo plano
+    estado_presencia.iniciar()
+    # Traslado periódico de los meses cerrados a sus archivos mensuales
+    archivo_mensual.iniciar()
 
     try:
         yield  # 👈 Aquí se ejecuta la app mientras está viva
     finally:
         # ===== SHUTDOWN =====
-        if hasattr(universal_controller, "conn") and universal_controller.conn:
-            universal_controller.conn.close()
-            print("Conexión cerrada correctamente")
+        for carril in carriles.values():
+            carril.detener()
+        estado_presencia.detener()
+        archivo_mensual.detener()
+        if extractor_facial is not None:
+            extractor_facial.detener()
+        comparador_facial.detener()
+        vigilante_cambios.detener()
+        universal_controller.cerrar()
+        logger.info("Conexión cerrada correctamente")
+        stop_logging()
 
 # Inicializar la aplicación FastAPI
 # Placeholder for settings
-app = FastAPI(title=settings.PROJECT_NAME,lifespan=lifespan)
+# Respuestas serializadas con orjson (si está instalado) en lugar de json de la biblioteca estándar
+app = FastAPI(title=settings.PROJECT_NAME,lifespan=lifespan,default_response_class=RespuestaJSON)
 
 # Añadir middlewares globales
 add_middlewares(app)
@@ -49,6 +78,7 @@ app.add_middleware(
 app.include_router(access_service.app)
 app.include_router(biometria_cud.app)
 app.include_router(biometria_query.app)
+app.include_router(credenciales_query.app)
 app.include_router(historial_estado_usuario_cud.app)
 app.include_router(historial_estado_usuario_query.app)
 app.include_router(usuarios_cud.app)
@@ -60,4 +90,5 @@ app.include_router(registros_invalidos_query.app)
 app.include_router(registros_cud.app)
 app.include_router(registros_query.app)
 app.include_router(torniquetes_cud.app)
-app.include_router(torniquetes_query.app)
\ No newline at end of file
+app.include_router(torniquetes_query.app)
+app.include_router(trafico_query.app)
\ No newline at end of file
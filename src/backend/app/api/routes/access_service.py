@@ -1,42 +1,91 @@
-from fastapi import APIRouter
-from backend.app.models.access import AccesoRequest, AccesoResponse
+import asyncio
+import logging
+import cv2
+import numpy as np
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from backend.app.core.admission import control_admision
+from backend.app.core.auth import verify_role
+from backend.app.core.lanes import carriles
+from backend.app.models.access import (
+    AccesoRequest, AccesoResponse, CandidatosResponse, MedioAcceso, MotivoRechazo, SentidoAcceso,
+)
 from backend.app.logic.access_logic import AccessService
+from backend.app.logic.face_embedding import extractor_facial
+from backend.app.logic.frame_quality import evaluador_calidad
 from backend.app.logic.verification import VerificadorHuella, VerificadorCamara, VerificadorRFID
 
+logger = logging.getLogger(__name__)
+
 app = APIRouter(tags=["Acceso"])
 
+def _validar_sentido(sentido: SentidoAcceso | None, id_torniquete: int | None):
+    """El anti-passback necesita saber en qué torniquete ocurre el paso."""
+    if sentido is not None and id_torniquete is None:
+        raise HTTPException(status_code=422, detail="id_torniquete es obligatorio cuando se indica el sentido")
+
+async def _decidir(request: AccesoRequest) -> AccesoResponse:
+    """Decide en el carril de acceso; 503 si la comparación excede su presupuesto."""
+    try:
+        return await carriles["acceso"].ejecutar(AccessService.solicitar_acceso, request)
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="Verificación facial saturada", headers={"Retry-After": "1"})
+
+async def _verificar(request: AccesoRequest) -> AccesoResponse:
+    """Verifica en el carril de acceso si hay hueco de verificación."""
+    async with control_admision.verificacion():
+        return await _decidir(request)
+
+async def _procesar(request: AccesoRequest, clave: str) -> AccesoResponse:
+    """Aplica el control de admisión y verifica en el carril de acceso."""
+    control_admision.limitar(clave)
+    return await _verificar(request)
+
 @app.post("/acceso/rfid", response_model=AccesoResponse)
-async def solicitar_acceso(rfid_tag: str):
+async def solicitar_acceso(peticion: Request, rfid_tag: str, sentido: SentidoAcceso = None, id_torniquete: int = None):
     """
     Endpoint para solicitar acceso con un medio específico.
     - medio: "rfid"
     - rfid_tag: Código RFID del usuario
+    - sentido / id_torniquete: opcionales; si se indican se aplica anti-passback
     """
-    request = AccesoRequest(medio="rfid", data={"rfid_tag": rfid_tag})
-    return AccessService.solicitar_acceso(request)
-from pydantic import BaseModel
+    _validar_sentido(sentido, id_torniquete)
+    request = AccesoRequest(medio="rfid", data={"rfid_tag": rfid_tag}, sentido=sentido, id_torniquete=id_torniquete)
+    # Los lectores RFID no envían dispositivo_id: se limita por IP
+    return await _procesar(request, f"ip:{peticion.client.host if peticion.client else '-'}")
+from pydantic import BaseModel, Field
 
 class HuellaRequest(BaseModel):
     dispositivo_id: str
     vector: str
     fecha: str | None = None
+    sentido: SentidoAcceso | None = None
+    id_torniquete: int | None = None
 
 @app.post("/acceso/huella", response_model=AccesoResponse)
 async def solicitar_acceso(req: HuellaRequest):
     """
     Endpoint para solicitar acceso con huella dactilar.
     """
+    _validar_sentido(req.sentido, req.id_torniquete)
     request = AccesoRequest(
         medio="huella",
         data={
             "dispositivo_id": req.dispositivo_id,
             "vector": req.vector,
             "fecha": req.fecha
-        }
+        },
+        sentido=req.sentido,
+        id_torniquete=req.id_torniquete,
     )
-    return AccessService.solicitar_acceso(request)
+    return await _procesar(request, f"dispositivo:{req.dispositivo_id}")
 @app.post("/acceso/camara", response_model=AccesoResponse)
-async def solicitar_acceso_camara(dispositivo_id: str, vector: str, fecha: str = None):
+async def solicitar_acceso_camara(
+    dispositivo_id: str,
+    vector: str,
+    fecha: str = None,
+    sentido: SentidoAcceso = None,
+    id_torniquete: int = None,
+):
     """
     Endpoint para solicitar acceso mediante reconocimiento facial.
     
@@ -46,6 +95,8 @@ async def solicitar_acceso_camara(dispositivo_id: str, vector: str, fecha: str =
                   * String JSON: "[0.123, -0.456, 0.789, ...]"
                   * Base64 del array numpy serializado
         - fecha: Fecha y hora de la captura (opcional)
+        - sentido: "entrada" o "salida" (opcional; activa el anti-passback)
+        - id_torniquete: Torniquete del paso (obligatorio si se indica sentido)
     
     Returns:
         AccesoResponse con status, usuario_id y mensaje
@@ -58,12 +109,123 @@ async def solicitar_acceso_camara(dispositivo_id: str, vector: str, fecha: str =
             "fecha": "2025-10-19T10:30:00"
         }
     """
+    _validar_sentido(sentido, id_torniquete)
     request = AccesoRequest(
         medio="camara", 
         data={
             "dispositivo_id": dispositivo_id,
             "vector": vector,
             "fecha": fecha
-        }
+        },
+        sentido=sentido,
+        id_torniquete=id_torniquete,
+    )
+    return await _procesar(request, f"dispositivo:{dispositivo_id}")
+
+def _captura_rechazada(motivo: MotivoRechazo) -> AccesoResponse:
+    """Respuesta para una captura descartada: el dispositivo debe repetirla."""
+    logger.info("Captura rechazada por calidad: %s", motivo.value)
+    return AccesoResponse(
+        status=False,
+        medio=MedioAcceso.camara,
+        mensaje=f"Captura no válida ({motivo.value}): repetir captura",
+        motivo=motivo,
     )
-    return AccessService.solicitar_acceso(request)
\ No newline at end of file
+
+@app.post("/acceso/camara/frame", response_model=AccesoResponse)
+async def solicitar_acceso_frame(
+    imagen: UploadFile = File(...),
+    dispositivo_id: str = Form(...),
+    fecha: str = Form(None),
+    sentido: SentidoAcceso = Form(None),
+    id_torniquete: int = Form(None),
+):
+    """
+    Endpoint para cámaras que no calculan el embedding: reciben el frame (JPEG)
+    y el servidor detecta el rostro y extrae el embedding antes de verificar.
+
+    Args:
+        - imagen: Frame JPEG capturado por la cámara
+        - dispositivo_id: ID del dispositivo
+        - fecha, sentido, id_torniquete: como en /acceso/camara
+
+    Returns:
+        AccesoResponse; si la captura es inservible (desenfocada, mal expuesta,
+        sin rostro o con el rostro demasiado pequeño) status False y `motivo`
+        indica por qué, para que el dispositivo repita la captura
+
+    Raises:
+        HTTPException: 503 si no hay MODELO_FACIAL configurado.
+    """
+    if extractor_facial is None:
+        # Sin modelo facial configurado no se toman decisiones con frames
+        raise HTTPException(status_code=503, detail="Extracción facial no disponible: MODELO_FACIAL no configurado")
+    _validar_sentido(sentido, id_torniquete)
+    clave = f"dispositivo:{dispositivo_id}"
+    control_admision.limitar(clave)
+
+    datos = await imagen.read()
+    # Calidad, decodificación y extracción cuentan para el límite global de
+    # verificaciones concurrentes: son la parte más cara de la petición
+    async with control_admision.verificacion():
+        # Filtro de calidad sobre el JPEG decodificado reducido: las capturas
+        # inservibles se rechazan antes de la decodificación completa y el modelo
+        calidad = await asyncio.to_thread(evaluador_calidad.evaluar_jpeg, datos)
+        if calidad is None:
+            raise HTTPException(status_code=422, detail="La imagen no es un JPEG válido")
+        if not calidad.apta:
+            return _captura_rechazada(calidad.motivo)
+
+        frame = await asyncio.to_thread(cv2.imdecode, np.frombuffer(datos, np.uint8), cv2.IMREAD_COLOR)
+
+        # Las peticiones concurrentes se agrupan en micro-lotes para el modelo
+        embedding = await extractor_facial.extraer(frame)
+        if embedding is None:
+            return _captura_rechazada(MotivoRechazo.sin_rostro)
+
+        request = AccesoRequest(
+            medio="camara",
+            data={
+                "dispositivo_id": dispositivo_id,
+                "vector": embedding,
+                "fecha": fecha
+            },
+            sentido=sentido,
+            id_torniquete=id_torniquete,
+        )
+        return await _decidir(request)
+
+# Identificar 1:N sin la compuerta del facial_hash solo es para revisión por personal autorizado
+ROLES_REVISION = ["system", "supervisor", "operario"]
+
+@app.post("/acceso/camara/candidates", response_model=CandidatosResponse)
+async def candidatos_camara(
+    vector: str, k: int = Query(5, ge=1, le=50), revisor: dict = Depends(verify_role(ROLES_REVISION))
+):
+    """
+    Las k identidades más parecidas a un embedding facial, con su score y el
+    margen con el siguiente, para revisar accesos denegados. Se ejecuta en el
+    carril de reportes: no compite con las decisiones de acceso.
+
+    Requiere un rol de revisión (ROLES_REVISION) y está limitado por usuario.
+    """
+    control_admision.limitar(f"revisor:{revisor['sub']}")
+    try:
+        ranking, umbral = await carriles["reportes"].ejecutar(VerificadorCamara().candidatos, {"vector": vector}, k)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return CandidatosResponse(medio=MedioAcceso.camara, umbral=umbral, candidatos=ranking)
+
+class CandidatosHuellaRequest(BaseModel):
+    vector: str
+    k: int = Field(5, ge=1, le=50)
+
+@app.post("/acceso/huella/candidates", response_model=CandidatosResponse)
+async def candidatos_huella(req: CandidatosHuellaRequest, revisor: dict = Depends(verify_role(ROLES_REVISION))):
+    """
+    Las k identidades más parecidas a una huella (template o imagen en Base64).
+    Mismos permisos y límite que /acceso/camara/candidates.
+    """
+    control_admision.limitar(f"revisor:{revisor['sub']}")
+    ranking, umbral = await carriles["reportes"].ejecutar(VerificadorHuella().candidatos, {"vector": req.vector}, req.k)
+    return CandidatosResponse(medio=MedioAcceso.huella, umbral=umbral, candidatos=ranking)
@@ -1,16 +1,17 @@
 import logging
-from fastapi import Form, HTTPException, APIRouter
+from fastapi import File, Form, HTTPException, APIRouter, UploadFile
 from backend.app.models.biometria import BiometriaCreate, BiometriaOut
 from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.logic.bulk_import import ImportadorBiometria, leer_registros
+from backend.app.core.lanes import ruta_carril
 import hashlib
 import base64
 import numpy as np
 import json
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = APIRouter(prefix="/biometria", tags=["biometria"])
+app = APIRouter(prefix="/biometria", tags=["biometria"], route_class=ruta_carril("admin"))
 
 
 @app.post("/create")
@@ -67,7 +68,7 @@ async def create_biometria(
         )
 
         controller.add(item)
-        logger.info(f"[POST /create] Biometria creada exitosamente: {item}")
+        logger.info("[POST /create] Biometria creada exitosamente para id_usuario=%s", id_usuario)
 
         return {
             "operation": "create",
@@ -169,3 +170,35 @@ async def delete_biometria(id_biometria: int = Form(...)):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/import")
+async def import_biometria(
+    archivo: UploadFile = File(...),
+    formato: str = Form(None),
+):
+    """
+    Alta masiva de usuarios y biometría desde un archivo NDJSON o CSV.
+    - El formato se deduce de la extensión si no se indica
+    - Los registros inválidos se omiten y se informan en "errores"
+    """
+    formato = formato or ("csv" if (archivo.filename or "").lower().endswith(".csv") else "ndjson")
+    if formato not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato}")
+    try:
+        contenido = (await archivo.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El archivo debe estar codificado en UTF-8")
+
+    try:
+        resumen = ImportadorBiometria(controller).importar(leer_registros(contenido.splitlines(), formato))
+    except Exception as e:
+        logger.error("[POST /import] Error interno: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "operation": "import",
+        "success": True,
+        "data": resumen,
+        "message": f"{resumen['biometrias_creadas']} biometrías importadas, {len(resumen['errores'])} errores.",
+    }
@@ -2,17 +2,19 @@ import logging
 from fastapi import Query, Request, APIRouter
 from backend.app.models.biometria import BiometriaOut
 from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.core.lanes import ruta_carril
+from backend.app.core.responses import JSONCrudo
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = APIRouter(prefix="/biometria", tags=["biometria"])
+app = APIRouter(prefix="/biometria", tags=["biometria"], route_class=ruta_carril("reportes"))
 
-@app.get("/all")
+@app.get("/all", response_class=JSONCrudo)
 async def get_all_biometria():
-    items = controller.read_all(BiometriaOut)
-    logger.info(f"[GET /all] Número de Biometria encontrados: {len(items)}")
-    return items
+    # SQLite serializa la tabla directamente a JSON: sin dicts ni jsonable_encoder por fila
+    contenido = controller.read_all_json(BiometriaOut)
+    logger.info(f"[GET /all] Listado de Biometria: {len(contenido)} bytes")
+    return JSONCrudo(contenido)
 
 @app.get("/by_id")
 def get_biometria_by_id(request: Request, id_biometria: int = Query(...)):
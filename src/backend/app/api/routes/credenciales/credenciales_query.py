@@ -0,0 +1,38 @@
+import logging
+from fastapi import Query, Request, Response, APIRouter
+from backend.app.logic.credential_feed import CredentialFeed
+from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.core.lanes import ruta_carril
+
+logger = logging.getLogger(__name__)
+
+app = APIRouter(prefix="/credenciales", tags=["credenciales"], route_class=ruta_carril("reportes"))
+
+feed = CredentialFeed(controller)
+
+def _etag(version: int, incluir_faciales: bool) -> str:
+    return f'"cred-{version}{"-f" if incluir_faciales else ""}"'
+
+@app.get("/snapshot")
+def get_credenciales(
+    request: Request,
+    response: Response,
+    since_version: int | None = Query(None, ge=0),
+    incluir_faciales: bool = Query(False),
+):
+    """
+    Lista versionada de credenciales activas para los controladores de torniquete.
+    - Sin since_version: snapshot completo.
+    - Con since_version: solo altas/bajas posteriores (o snapshot completo si ya no es posible).
+    - Responde 304 si el ETag enviado en If-None-Match corresponde a la versión actual.
+    """
+    etag = _etag(feed.version_actual(), incluir_faciales)
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    data = feed.exportar(since_version, incluir_faciales)
+    response.headers["ETag"] = _etag(data["version"], incluir_faciales)
+    response.headers["Cache-Control"] = "no-cache"
+    logger.info("[GET /snapshot] Credenciales exportadas: version=%s altas=%d bajas=%d",
+                data["version"], len(data["altas"]), len(data["bajas"]))
+    return data
@@ -1,12 +1,14 @@
 import logging
+from datetime import datetime
 from fastapi import Query, Request, APIRouter
 from backend.app.models.historial_estado_usuario import HistorialEstadoUsuarioOut
 from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.logic.archivo import archivo_mensual
+from backend.app.core.lanes import ruta_carril
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = APIRouter(prefix="/historial_estado_usuario", tags=["historial_estado_usuario"])
+app = APIRouter(prefix="/historial_estado_usuario", tags=["historial_estado_usuario"], route_class=ruta_carril("reportes"))
 
 @app.get("/all")
 async def get_all_historial_estado_usuario():
@@ -21,3 +23,10 @@ def get_historial_estado_usuario_by_id(request: Request, id_historial: int = Que
         return unit.model_dump()
     else:
         return None
+
+@app.get("/rango")
+def get_historial_estado_usuario_rango(desde: datetime = Query(...), hasta: datetime = Query(...)):
+    # fecha_cambio en [desde, hasta), incluidos los meses ya archivados
+    items = archivo_mensual.consultar(HistorialEstadoUsuarioOut, desde, hasta)
+    logger.info(f"[GET /rango] Número de HistorialEstadoUsuario encontrados: {len(items)}")
+    return items
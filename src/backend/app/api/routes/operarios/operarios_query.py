@@ -1,22 +1,33 @@
 import logging
-from fastapi import Query, Request, APIRouter
+from fastapi import Query, Request, Response, APIRouter
 from backend.app.models.operarios import OperariosOut
 from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.core.lanes import ruta_carril
+from backend.app.core.etag import no_modificado, fijar_etag
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = APIRouter(prefix="/operarios", tags=["operarios"])
+app = APIRouter(prefix="/operarios", tags=["operarios"], route_class=ruta_carril("reportes"))
 
 @app.get("/all")
-async def get_all_operarios():
+async def get_all_operarios(request: Request, response: Response):
+    etag = controller.etag(OperariosOut)
+    respuesta_304 = no_modificado(request, etag)
+    if respuesta_304 is not None:
+        return respuesta_304
     items = controller.read_all(OperariosOut)
+    fijar_etag(response, etag)
     logger.info(f"[GET /all] Número de Operarios encontrados: {len(items)}")
     return items
 
 @app.get("/by_id")
-def get_operarios_by_id(request: Request, id_operario: int = Query(...)):
+def get_operarios_by_id(request: Request, response: Response, id_operario: int = Query(...)):
+    etag = controller.etag(OperariosOut)
+    respuesta_304 = no_modificado(request, etag)
+    if respuesta_304 is not None:
+        return respuesta_304
     unit = controller.get_by_id(OperariosOut, id_operario)
+    fijar_etag(response, etag)
     if unit:
         return unit.model_dump()
     else:
@@ -1,18 +1,25 @@
 import logging
+from datetime import datetime
 from fastapi import Query, Request, APIRouter
 from backend.app.models.registros import RegistrosOut
 from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.logic.archivo import archivo_mensual
+from backend.app.logic.busqueda import BuscadorTexto
+from backend.app.core.lanes import ruta_carril
+from backend.app.core.responses import JSONCrudo
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = APIRouter(prefix="/registros", tags=["registros"])
+app = APIRouter(prefix="/registros", tags=["registros"], route_class=ruta_carril("reportes"))
 
-@app.get("/all")
+buscador = BuscadorTexto(controller)
+
+@app.get("/all", response_class=JSONCrudo)
 async def get_all_registros():
-    items = controller.read_all(RegistrosOut)
-    logger.info(f"[GET /all] Número de Registros encontrados: {len(items)}")
-    return items
+    # SQLite serializa la tabla directamente a JSON: sin dicts ni jsonable_encoder por fila
+    contenido = controller.read_all_json(RegistrosOut)
+    logger.info(f"[GET /all] Listado de Registros: {len(contenido)} bytes")
+    return JSONCrudo(contenido)
 
 @app.get("/by_id")
 def get_registros_by_id(request: Request, id_registro: int = Query(...)):
@@ -21,3 +28,20 @@ def get_registros_by_id(request: Request, id_registro: int = Query(...)):
         return unit.model_dump()
     else:
         return None
+
+@app.get("/rango")
+def get_registros_rango(desde: datetime = Query(...), hasta: datetime = Query(...)):
+    # fecha_hora en [desde, hasta), incluidos los meses ya archivados
+    items = archivo_mensual.consultar(RegistrosOut, desde, hasta)
+    logger.info(f"[GET /rango] Número de Registros encontrados: {len(items)}")
+    return items
+
+@app.get("/search")
+def search_registros(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(50, ge=1, le=500)):
+    """
+    Búsqueda en las observaciones de los registros (solo los meses aún no archivados).
+    - Ordenada por relevancia (bm25), con el fragmento coincidente en "fragmento".
+    """
+    items = buscador.registros(q, limit)
+    logger.info(f"[GET /search] Número de Registros encontrados: {len(items)}")
+    return items
@@ -2,11 +2,11 @@ import logging
 from fastapi import Form, HTTPException, APIRouter
 from backend.app.models.registros_invalidos import RegistrosInvalidosCreate, RegistrosInvalidosOut
 from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.core.lanes import ruta_carril
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = APIRouter(prefix="/registros_invalidos", tags=["registros_invalidos"])
+app = APIRouter(prefix="/registros_invalidos", tags=["registros_invalidos"], route_class=ruta_carril("admin"))
 
 @app.post("/create")
 async def create_registros_invalidos(
@@ -1,12 +1,14 @@
 import logging
+from datetime import datetime
 from fastapi import Query, Request, APIRouter
 from backend.app.models.registros_invalidos import RegistrosInvalidosOut
 from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.logic.archivo import archivo_mensual
+from backend.app.core.lanes import ruta_carril
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = APIRouter(prefix="/registros_invalidos", tags=["registros_invalidos"])
+app = APIRouter(prefix="/registros_invalidos", tags=["registros_invalidos"], route_class=ruta_carril("reportes"))
 
 @app.get("/all")
 async def get_all_registros_invalidos():
@@ -21,3 +23,10 @@ def get_registros_invalidos_by_id(request: Request, id_invalido: int = Query(...
         return unit.model_dump()
     else:
         return None
+
+@app.get("/rango")
+def get_registros_invalidos_rango(desde: datetime = Query(...), hasta: datetime = Query(...)):
+    # fecha_invalido en [desde, hasta), incluidos los meses ya archivados
+    items = archivo_mensual.consultar(RegistrosInvalidosOut, desde, hasta)
+    logger.info(f"[GET /rango] Número de RegistrosInvalidos encontrados: {len(items)}")
+    return items
@@ -1,22 +1,33 @@
 import logging
-from fastapi import Query, Request, APIRouter
+from fastapi import Query, Request, Response, APIRouter
 from backend.app.models.torniquetes import TorniquetesOut
 from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.core.lanes import ruta_carril
+from backend.app.core.etag import no_modificado, fijar_etag
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = APIRouter(prefix="/torniquetes", tags=["torniquetes"])
+app = APIRouter(prefix="/torniquetes", tags=["torniquetes"], route_class=ruta_carril("reportes"))
 
 @app.get("/all")
-async def get_all_torniquetes():
+async def get_all_torniquetes(request: Request, response: Response):
+    etag = controller.etag(TorniquetesOut)
+    respuesta_304 = no_modificado(request, etag)
+    if respuesta_304 is not None:
+        return respuesta_304
     items = controller.read_all(TorniquetesOut)
+    fijar_etag(response, etag)
     logger.info(f"[GET /all] Número de Torniquetes encontrados: {len(items)}")
     return items
 
 @app.get("/by_id")
-def get_torniquetes_by_id(request: Request, id_torniquete: int = Query(...)):
+def get_torniquetes_by_id(request: Request, response: Response, id_torniquete: int = Query(...)):
+    etag = controller.etag(TorniquetesOut)
+    respuesta_304 = no_modificado(request, etag)
+    if respuesta_304 is not None:
+        return respuesta_304
     unit = controller.get_by_id(TorniquetesOut, id_torniquete)
+    fijar_etag(response, etag)
     if unit:
         return unit.model_dump()
     else:
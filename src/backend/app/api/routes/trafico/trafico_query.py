@@ -0,0 +1,43 @@
+import logging
+from datetime import datetime
+from fastapi import Query, HTTPException, APIRouter
+from backend.app.logic.trafico import TraficoDashboard, rango_por_defecto
+from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.core.lanes import ruta_carril
+
+logger = logging.getLogger(__name__)
+
+app = APIRouter(prefix="/trafico", tags=["trafico"], route_class=ruta_carril("reportes"))
+
+dashboard = TraficoDashboard(controller)
+
+def _rango(desde: datetime | None, hasta: datetime | None) -> tuple[datetime, datetime]:
+    defecto_desde, defecto_hasta = rango_por_defecto()
+    desde, hasta = desde or defecto_desde, hasta or defecto_hasta
+    if desde >= hasta:
+        raise HTTPException(status_code=400, detail="'desde' debe ser anterior a 'hasta'")
+    return desde, hasta
+
+@app.get("/ocupacion")
+def get_ocupacion():
+    """Ocupación actual del edificio (entradas menos salidas autorizadas)."""
+    return dashboard.ocupacion()
+
+@app.get("/por_hora")
+def get_trafico_por_hora(
+    desde: datetime | None = Query(None),
+    hasta: datetime | None = Query(None),
+    id_torniquete: int | None = Query(None),
+):
+    """
+    Entradas, salidas y denegados por torniquete y hora.
+    - Por defecto, las últimas 24 horas.
+    """
+    desde, hasta = _rango(desde, hasta)
+    return dashboard.por_hora(desde, hasta, id_torniquete)
+
+@app.get("/totales")
+def get_trafico_totales(desde: datetime | None = Query(None), hasta: datetime | None = Query(None)):
+    """Totales por torniquete en el rango (por defecto, las últimas 24 horas)."""
+    desde, hasta = _rango(desde, hasta)
+    return dashboard.totales(desde, hasta)
@@ -1,23 +1,47 @@
 import logging
-from fastapi import Query, Request, APIRouter
+from fastapi import Query, Request, Response, APIRouter
 from backend.app.models.usuarios import UsuariosOut
 from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.logic.busqueda import BuscadorTexto
+from backend.app.core.lanes import ruta_carril
+from backend.app.core.etag import no_modificado, fijar_etag
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = APIRouter(prefix="/usuarios", tags=["usuarios"])
+app = APIRouter(prefix="/usuarios", tags=["usuarios"], route_class=ruta_carril("reportes"))
+
+buscador = BuscadorTexto(controller)
 
 @app.get("/all")
-async def get_all_usuarios():
+async def get_all_usuarios(request: Request, response: Response):
+    etag = controller.etag(UsuariosOut)
+    respuesta_304 = no_modificado(request, etag)
+    if respuesta_304 is not None:
+        return respuesta_304
     items = controller.read_all(UsuariosOut)
+    fijar_etag(response, etag)
     logger.info(f"[GET /all] Número de Usuarios encontrados: {len(items)}")
     return items
 
 @app.get("/by_id")
-def get_usuarios_by_id(request: Request, id_usuario: int = Query(...)):
+def get_usuarios_by_id(request: Request, response: Response, id_usuario: int = Query(...)):
+    etag = controller.etag(UsuariosOut)
+    respuesta_304 = no_modificado(request, etag)
+    if respuesta_304 is not None:
+        return respuesta_304
     unit = controller.get_by_id(UsuariosOut, id_usuario)
+    fijar_etag(response, etag)
     if unit:
         return unit.model_dump()
     else:
         return None
+
+@app.get("/search")
+def search_usuarios(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1, le=200)):
+    """
+    Búsqueda por nombre o cargo (prefijo de cada palabra, sin acentos ni mayúsculas).
+    - Ordenada por relevancia (bm25).
+    """
+    items = buscador.usuarios(q, limit)
+    logger.info(f"[GET /search] Número de Usuarios encontrados: {len(items)}")
+    return items
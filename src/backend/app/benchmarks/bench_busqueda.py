@@ -0,0 +1,77 @@
+"""
+Benchmark de búsqueda de usuarios: filtro LIKE sobre la tabla (recorrido
+completo) frente al índice FTS5 de la migración 6.
+
+Uso (desde src/): python -m backend.app.benchmarks.bench_busqueda --filas 300000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from backend.app.logic.busqueda import BuscadorTexto
+from backend.app.logic.migrations import aplicar_migraciones
+
+_ESQUEMA = """
+CREATE TABLE Usuarios (id_usuario INTEGER PRIMARY KEY AUTOINCREMENT, nombre_completo TEXT, cargo TEXT, estado BOOLEAN DEFAULT 1, fecha_registro DATETIME);
+CREATE TABLE Biometria (id_biometria INTEGER PRIMARY KEY AUTOINCREMENT, id_usuario INTEGER NOT NULL, vector_facial TEXT, facial_hash TEXT, huella_hash TEXT, template_huella TEXT, rfid_tag TEXT, fecha_actualizacion DATETIME);
+CREATE TABLE Operarios (id_operario INTEGER PRIMARY KEY AUTOINCREMENT, nombre_operario TEXT, usuario_sistema TEXT, contraseña_hash TEXT, activo BOOLEAN);
+CREATE TABLE Torniquetes (id_torniquete INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT, ubicacion TEXT, estado BOOLEAN);
+CREATE TABLE Registros (id_registro INTEGER PRIMARY KEY AUTOINCREMENT, id_usuario INTEGER, id_torniquete INTEGER, id_operario INTEGER, fecha_hora DATETIME, tipo_acceso TEXT, imagen_capturada TEXT, resultado BOOLEAN, observaciones TEXT);
+"""
+
+_NOMBRES = ["José", "Ana", "Luis", "María", "Carlos", "Lucía", "Jorge", "Sofía", "Pedro", "Elena"]
+_APELLIDOS = ["García", "Pérez", "Gómez", "Rodríguez", "Martínez", "López", "Sánchez", "Díaz", "Torres", "Ruiz"]
+_CARGOS = ["Vigilante", "Contador", "Asistente", "Ingeniera", "Recepción", "Gerente"]
+
+
+class _Controlador:
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def _medir(nombre: str, funcion, repeticiones: int) -> float:
+    funcion()  # calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    ms = (time.perf_counter() - inicio) / repeticiones * 1e3
+    print(f"{nombre:<40} {ms:9.3f} ms  ({len(resultado)} resultados)")
+    return ms
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, default=300000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directorio:
+        conn = sqlite3.connect(os.path.join(directorio, "bench.db"))
+        conn.row_factory = sqlite3.Row
+        conn.executescript(_ESQUEMA)
+        aplicar_migraciones(conn)
+        conn.executemany(
+            "INSERT INTO Usuarios (nombre_completo, cargo, estado) VALUES (?, ?, 1)",
+            ((f"{rng.choice(_NOMBRES)} {rng.choice(_APELLIDOS)} {rng.choice(_APELLIDOS)} {i}", rng.choice(_CARGOS))
+             for i in range(args.filas)),
+        )
+        conn.commit()
+        buscador = BuscadorTexto(_Controlador(conn))
+
+        print(f"Usuarios ({args.filas} filas, por consulta)")
+        # Consulta selectiva: LIKE tiene que recorrer toda la tabla
+        antes = _medir("  LIKE '%garc%' AND '%12345%'", lambda: conn.execute(
+            "SELECT * FROM Usuarios WHERE nombre_completo LIKE '%garc%' AND nombre_completo LIKE '%12345%' LIMIT 20"
+        ).fetchall(), args.repeticiones)
+        ahora = _medir("  FTS5 'garc 12345' (bm25)", lambda: buscador.usuarios("garc 12345"), args.repeticiones)
+        _medir("  FTS5 'jose' (amplia: recientes)", lambda: buscador.usuarios("jose"), args.repeticiones)
+        _medir("  FTS5 'jose garcia ruiz' (bm25)", lambda: buscador.usuarios("jose garcia ruiz"), args.repeticiones)
+        print(f"  mejora x{antes / ahora:.0f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
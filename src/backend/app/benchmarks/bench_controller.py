@@ -0,0 +1,112 @@
+"""
+Benchmark de lecturas de UniversalController: ruta anterior (SQL y dicts por
+llamada, DDL en cada lectura) frente al plan de consulta precompilado.
+
+Uso (desde src/): python -m backend.app.benchmarks.bench_controller --filas 100000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from backend.app.logic import universal_controller_server
+from backend.app.models.registros import RegistrosOut
+
+# Esquema de Registros como en logic/script_db.py (clave primaria indexada)
+_REGISTROS = """
+CREATE TABLE Registros (
+    id_registro INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_usuario INTEGER NOT NULL,
+    id_torniquete INTEGER NOT NULL,
+    id_operario INTEGER,
+    fecha_hora DATETIME DEFAULT CURRENT_TIMESTAMP,
+    tipo_acceso TEXT,
+    imagen_capturada TEXT,
+    resultado BOOLEAN,
+    observaciones TEXT
+)
+"""
+
+
+def controlador_temporal(directorio: str, filas: int) -> universal_controller_server.UniversalController:
+    """Controlador sobre una base de datos desechable en `directorio` con `filas` Registros (no toca data/data.db)."""
+    universal_controller_server.DB_FILE = os.path.join(directorio, "bench.db")
+    conn = sqlite3.connect(universal_controller_server.DB_FILE)
+    conn.execute(_REGISTROS)
+    conn.close()
+    controller = universal_controller_server.UniversalController()
+    controller.cursor.executemany(
+        "INSERT INTO Registros (id_registro, id_usuario, id_torniquete, id_operario, fecha_hora,"
+        " tipo_acceso, imagen_capturada, resultado, observaciones) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((i, i % 500, i % 8, None, f"2025-10-20 {i % 24:02d}:00:00", "rfid", None, i % 2, "")
+         for i in range(1, filas + 1)),
+    )
+    controller.conn.commit()
+    return controller
+
+
+def _get_by_id_anterior(controller, model, id):
+    """Implementación previa de `_get_by_id`, como referencia."""
+    table = model.__entity_name__
+    fields = model.get_fields()
+    columns = ", ".join(f"{k} {v}" for k, v in fields.items())
+    controller.cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+    controller.conn.commit()
+    primary_key = list(model.get_fields().keys())[0]
+    controller.cursor.execute(f"SELECT * FROM {table} WHERE {primary_key} = ?", (id,))
+    row = controller.cursor.fetchone()
+    if not row:
+        return None
+    data = {key: row[idx] for idx, key in enumerate(model.get_fields().keys())}
+    return model(**data)
+
+
+def _read_all_anterior(controller, model):
+    """Implementación previa de `read_all` (sin caché), como referencia."""
+    table = model.__entity_name__
+    fields = model.get_fields()
+    columns = ", ".join(f"{k} {v}" for k, v in fields.items())
+    controller.cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+    controller.conn.commit()
+    controller.cursor.execute(f"SELECT * FROM {table}")
+    return [dict(row) for row in controller.cursor.fetchall()]
+
+
+def medir(nombre: str, funcion, repeticiones: int, unidades: int) -> float:
+    funcion()  # calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    por_unidad = (time.perf_counter() - inicio) / (repeticiones * unidades) * 1e6
+    print(f"{nombre:<40} {por_unidad:8.3f} µs")
+    return por_unidad
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, default=100000)
+    parser.add_argument("--consultas", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        controller = controlador_temporal(directorio, args.filas)
+
+        print(f"get_by_id ({args.consultas} consultas, por consulta)")
+        ids = iter(range(10**9))
+        antes = medir("  anterior", lambda: _get_by_id_anterior(
+            controller, RegistrosOut, next(ids) % args.filas + 1), args.consultas, 1)
+        ahora = medir("  plan precompilado", lambda: controller._get_by_id(
+            RegistrosOut, next(ids) % args.filas + 1), args.consultas, 1)
+        print(f"  mejora x{antes / ahora:.1f}")
+
+        print(f"lectura masiva ({args.filas} filas, por fila)")
+        antes = medir("  read_all anterior (sqlite3.Row)", lambda: _read_all_anterior(controller, RegistrosOut), 3, args.filas)
+        medir("  read_all (tuplas -> dict)", lambda: controller.read_all(RegistrosOut), 3, args.filas)
+        ahora = medir("  read_rows (tuplas)", lambda: controller.read_rows(RegistrosOut), 3, args.filas)
+        medir("  read_array (una columna)", lambda: controller.read_array(RegistrosOut, "id_usuario", int), 3, args.filas)
+        print(f"  mejora read_rows x{antes / ahora:.1f}")
+        controller.conn.close()
+
+
+if __name__ == "__main__":
+    main()
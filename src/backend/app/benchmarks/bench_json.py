@@ -0,0 +1,47 @@
+"""
+Benchmark de serialización de listados: GET /registros/all tal como lo
+respondía FastAPI (read_all + jsonable_encoder + json) frente a orjson y a la
+serialización directa en SQLite (read_all_json).
+
+Uso (desde src/): python -m backend.app.benchmarks.bench_json --filas 100000
+"""
+import argparse
+import json
+import tempfile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from backend.app.benchmarks.bench_controller import controlador_temporal, medir
+from backend.app.core.responses import orjson
+from backend.app.models.registros import RegistrosOut
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, default=100000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        controller = controlador_temporal(directorio, args.filas)
+        n, filas = args.repeticiones, args.filas
+
+        print(f"/registros/all ({filas} filas, por fila)")
+        antes = medir("  read_all + jsonable_encoder + json",
+                      lambda: JSONResponse(jsonable_encoder(controller.read_all(RegistrosOut))).body, n, filas)
+        if orjson is not None:
+            medir("  read_all + jsonable_encoder + orjson",
+                  lambda: orjson.dumps(jsonable_encoder(controller.read_all(RegistrosOut))), n, filas)
+            medir("  read_all + orjson", lambda: orjson.dumps(controller.read_all(RegistrosOut)), n, filas)
+        else:
+            print("  (orjson no está instalado)")
+        ahora = medir("  read_all_json (SQLite)", lambda: controller.read_all_json(RegistrosOut), n, filas)
+        print(f"  mejora x{antes / ahora:.1f}")
+
+        # Mismo contenido por las dos vías
+        assert json.loads(controller.read_all_json(RegistrosOut)) == controller.read_all(RegistrosOut)
+        print(f"  cuerpo: {len(controller.read_all_json(RegistrosOut)) / 2**20:.1f} MiB")
+        controller.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LimitadorTokens:
+    """
+    Token bucket por clave (dispositivo_id o IP del cliente).
+
+    Cada clave acumula `tasa` tokens por segundo hasta `rafaga`; cada petición
+    consume uno. Solo se guardan las `max_claves` claves usadas más
+    recientemente, para que una avalancha de ids inventados no agote la memoria.
+    """
+
+    def __init__(self, tasa: float, rafaga: float, max_claves: int = 10000):
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self.max_claves = max_claves
+        self._cubetas: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave: str) -> float:
+        """
+        Consume un token de la clave.
+
+        Returns:
+            float: 0 si se admite; si no, segundos hasta el próximo token.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, ultimo = self._cubetas.pop(clave, (self.rafaga, ahora))
+            tokens = min(self.rafaga, tokens + (ahora - ultimo) * self.tasa)
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = (1 - tokens) / self.tasa
+            self._cubetas[clave] = (tokens, ahora)
+            if len(self._cubetas) > self.max_claves:
+                self._cubetas.popitem(last=False)
+            return espera
+
+
+class ControlAdmision:
+    """
+    Control de admisión de las peticiones de acceso.
+
+    Dos barreras, ambas con rechazo inmediato para no encolar trabajo que ya
+    no llegaría a tiempo:
+    - Límite de tasa por dispositivo: 429 con Retry-After.
+    - Límite global de verificaciones concurrentes: si no hay hueco en
+      `espera` segundos, 503 con Retry-After.
+    """
+
+    def __init__(self, tasa: float, rafaga: float, concurrencia: int, espera: float):
+        self.limitador = LimitadorTokens(tasa, rafaga)
+        self.concurrencia = concurrencia
+        self.espera = espera
+        self._semaforo: asyncio.Semaphore | None = None
+        self.rechazos_tasa = 0
+        self.rechazos_carga = 0
+
+    def limitar(self, clave: str):
+        """
+        Aplica el límite de tasa de la clave.
+
+        Raises:
+            HTTPException: 429 con Retry-After si la clave agotó sus tokens.
+        """
+        espera = self.limitador.consumir(clave)
+        if espera > 0:
+            self.rechazos_tasa += 1
+            logger.debug("Petición de acceso limitada: clave=%s reintentar en %.2fs", clave, espera)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiadas peticiones desde este dispositivo",
+                headers={"Retry-After": str(max(1, math.ceil(espera)))},
+            )
+
+    @asynccontextmanager
+    async def verificacion(self):
+        """
+        Reserva un hueco de verificación durante el bloque.
+
+        Raises:
+            HTTPException: 503 con Retry-After si no hay hueco a tiempo.
+        """
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.concurrencia)
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), timeout=self.espera)
+        except asyncio.TimeoutError:
+            self.rechazos_carga += 1
+            logger.debug("Verificación rechazada por carga (%d en curso)", self.concurrencia)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servicio de acceso saturado",
+                headers={"Retry-After": str(max(1, math.ceil(self.espera)))},
+            )
+        try:
+            yield
+        finally:
+            self._semaforo.release()
+
+
+# Instancia única por proceso
+control_admision = ControlAdmision(
+    tasa=settings.ADMISION_TASA,
+    rafaga=settings.ADMISION_RAFAGA,
+    concurrencia=settings.ADMISION_CONCURRENCIA,
+    espera=settings.ADMISION_ESPERA,
+)
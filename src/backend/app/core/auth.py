@@ -3,7 +3,11 @@ from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from jose import jwt, JWTError
 from backend.app.core.config import settings
 from typing import Dict, List
+from collections import OrderedDict
+import hashlib
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +28,156 @@ def encode_token(payload: dict) -> str:
     """
     Encodes a JWT token using the given payload.
 
+    Stamps `iat` and, unless given, an `exp` of `AUTH_TOKEN_MAX_AGE` seconds after it, so
+    every token can be checked against subject revocations and none outlives them.
+
     Args:
         payload (dict): Data to encode in the token.
 
     Returns:
         str: Encoded JWT token.
     """
-    return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    claims = dict(payload)
+    claims.setdefault("iat", int(time.time()))
+    claims.setdefault("exp", claims["iat"] + settings.AUTH_TOKEN_MAX_AGE)
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified token claims, keyed by the SHA-256 digest of the token.
+
+    A hit skips the signature check but never outlives the token: entries expire at the
+    token's `exp` (or after `ttl` seconds if it has none). Revoked tokens and subjects are
+    rejected on both hits and misses; revocations are forgotten once every token they cover
+    has expired (`max_token_age` seconds at most).
+    """
+
+    def __init__(self, max_size: int = 4096, ttl: float = 300.0, max_token_age: float = 86400.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_token_age = max_token_age
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._revoked_tokens: OrderedDict[bytes, float] = OrderedDict()
+        self._revoked_subjects: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        """
+        Returns the cached claims of a previously verified token.
+
+        Args:
+            token (str): The raw JWT.
+
+        Returns:
+            dict | None: The claims, or None if the token must be fully verified.
+        """
+        key = self.digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if now >= expires_at or self._is_revoked(key, claims):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token: str, claims: dict):
+        """Caches the claims of a token whose signature and expiry were just verified."""
+        key = self.digest(token)
+        expires_at = time.time() + self.ttl
+        if isinstance(claims.get("exp"), (int, float)):
+            expires_at = min(expires_at, claims["exp"])
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def is_revoked(self, token: str, claims: dict) -> bool:
+        """Whether the token, or every token of its subject issued before now, was revoked."""
+        with self._lock:
+            return self._is_revoked(self.digest(token), claims)
+
+    def _is_revoked(self, key: bytes, claims: dict) -> bool:
+        if key in self._revoked_tokens:
+            return True
+        revoked_at = self._revoked_subjects.get(claims.get("sub"))
+        if revoked_at is None:
+            return False
+        if revoked_at + self.max_token_age <= time.time():
+            # Every token issued before the revocation has expired by now
+            del self._revoked_subjects[claims.get("sub")]
+            return False
+        issued_at = claims.get("iat")
+        return not isinstance(issued_at, (int, float)) or issued_at <= revoked_at
+
+    def revoke_token(self, token: str, expires_at: float | None = None):
+        """
+        Rejects a single token from now on (e.g. on logout).
+
+        Args:
+            token (str): The raw JWT.
+            expires_at (float | None): Its `exp`; the denylist entry is dropped after it.
+        """
+        key = self.digest(token)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._revoked_tokens[key] = expires_at or float("inf")
+            now = time.time()
+            for revoked, until in list(self._revoked_tokens.items()):
+                if until <= now:
+                    del self._revoked_tokens[revoked]
+            while len(self._revoked_tokens) > self.max_size:
+                self._revoked_tokens.popitem(last=False)
+
+    def revoke_subject(self, sub: str):
+        """Rejects every token of `sub` issued up to now (e.g. a disabled operator)."""
+        now = time.time()
+        with self._lock:
+            for revoked, at in list(self._revoked_subjects.items()):
+                if at + self.max_token_age <= now:
+                    del self._revoked_subjects[revoked]
+            self._revoked_subjects[sub] = now
+            for key in [k for k, (_, claims) in self._entries.items() if claims.get("sub") == sub]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL, settings.AUTH_TOKEN_MAX_AGE)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Returns the verified claims of a token, using the cache when possible.
+
+    Args:
+        token (str): The raw JWT.
+
+    Returns:
+        dict: The token claims.
+
+    Raises:
+        JWTError: If the signature, expiry or format is invalid, or the token was revoked.
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if token_cache.is_revoked(token, claims):
+        raise JWTError("Token revoked")
+    token_cache.put(token, claims)
+    return claims
 
 
 def get_current_user(
@@ -63,7 +210,7 @@ def get_current_user(
         )
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         user_id: str = payload.get("sub")
         scope: str = payload.get("scope")
         if user_id is None or scope is None:
@@ -89,7 +236,8 @@ def verify_role(allowed_roles: List[str]):
     """
 
     def _verify(current_user: dict = Depends(get_current_user)):
-        if not any(scope in allowed_roles for scope in current_user["scopes"]):
+        # "scope" is a space-separated list, as in OAuth2
+        if not any(scope in allowed_roles for scope in current_user["scope"].split()):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You do not have permission to access this route",
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PlanificadorLotes:
+    """
+    Micro-lotes dinámicos entre peticiones concurrentes.
+
+    Los elementos se encolan desde cualquier hilo o corrutina y un hilo
+    dedicado los agrupa: en cuanto llega uno espera como mucho `espera`
+    segundos (o hasta juntar `max_lote`) y llama una sola vez a
+    `procesar_lote`, que devuelve un resultado por elemento y en el mismo
+    orden. Cada petición recibe el suyo por un Future, así que la latencia
+    añadida está acotada por `espera` y, con carga, el coste fijo de cada
+    llamada se reparte entre todo el lote.
+    """
+
+    def __init__(
+        self,
+        procesar_lote: Callable[[list[Any]], list[Any]],
+        max_lote: int = 16,
+        espera: float = 0.005,
+        nombre: str = "lotes",
+    ):
+        self.procesar_lote = procesar_lote
+        self.max_lote = max_lote
+        self.espera = espera
+        self.nombre = nombre
+        self.lotes = 0
+        self.elementos = 0
+        self._cola: queue.Queue = queue.Queue()
+        self._hilo: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _asegurar_hilo(self):
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._bucle, name=self.nombre, daemon=True)
+                    self._hilo.start()
+
+    def enviar(self, elemento: Any) -> Future:
+        """Encola un elemento; el futuro se resuelve con su resultado."""
+        self._asegurar_hilo()
+        futuro = Future()
+        self._cola.put((elemento, futuro))
+        return futuro
+
+    async def resolver(self, elemento: Any) -> Any:
+        """Versión para corrutinas de `enviar(elemento).result()`."""
+        return await asyncio.wrap_future(self.enviar(elemento))
+
+    def _bucle(self):
+        parar = False
+        while not parar:
+            item = self._cola.get()
+            if item is None:
+                break
+            lote = [item]
+            limite = time.monotonic() + self.espera
+            while len(lote) < self.max_lote:
+                try:
+                    item = self._cola.get(timeout=max(0.0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    parar = True
+                    break
+                lote.append(item)
+            self._procesar(lote)
+
+    def _procesar(self, lote: list[tuple[Any, Future]]):
+        # Las peticiones canceladas (cliente desconectado) no entran en el lote
+        lote = [(elemento, futuro) for elemento, futuro in lote if futuro.set_running_or_notify_cancel()]
+        if not lote:
+            return
+        self.lotes += 1
+        self.elementos += len(lote)
+        try:
+            resultados = self.procesar_lote([elemento for elemento, _ in lote])
+            if len(resultados) != len(lote):
+                raise RuntimeError(f"procesar_lote devolvió {len(resultados)} resultados para {len(lote)} elementos")
+        except Exception as e:
+            logger.exception("Error procesando un lote de %s (%d elementos)", self.nombre, len(lote))
+            for _, futuro in lote:
+                self._resolver_futuro(futuro, excepcion=e)
+            return
+        for (_, futuro), resultado in zip(lote, resultados):
+            self._resolver_futuro(futuro, resultado)
+
+    def _resolver_futuro(self, futuro: Future, resultado: Any = None, excepcion: BaseException | None = None):
+        # Un error al entregar un resultado no debe matar el hilo del planificador
+        try:
+            if excepcion is not None:
+                futuro.set_exception(excepcion)
+            else:
+                futuro.set_result(resultado)
+        except InvalidStateError:
+            logger.debug("Futuro de %s ya resuelto; resultado descartado", self.nombre)
+
+    def detener(self):
+        """Procesa lo pendiente y detiene el hilo."""
+        if self._hilo is not None:
+            self._cola.put(None)
+            self._hilo.join()
+            self._hilo = None
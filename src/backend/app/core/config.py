@@ -1,8 +1,19 @@
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()  # Carga las variables desde el archivo .env
 
+
+def _leer_umbrales(ruta: str) -> dict:
+    """Umbrales por medio escritos por la herramienta de calibración ({} si no hay archivo)."""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f).get("umbrales", {})
+    except (OSError, ValueError):
+        return {}
+
+
 class Settings:
     PROJECT_NAME: str = "Torniquete API"
     # Corrige: quita espacios y comillas extras si hay en la variable de entorno
@@ -10,12 +21,99 @@ class Settings:
 
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = "HS256"
+    # Caché de tokens JWT verificados: entradas máximas y vida máxima (s) si el token no tiene exp
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+    AUTH_CACHE_TTL: float = float(os.getenv("AUTH_CACHE_TTL", "300"))
+    # Vida máxima (s) de los tokens emitidos sin exp; las revocaciones por sujeto caducan tras ella
+    AUTH_TOKEN_MAX_AGE: int = int(os.getenv("AUTH_TOKEN_MAX_AGE", "86400"))
+    # Modo WAL de data.db: las lecturas ven una instantánea y no bloquean ni esperan a las escrituras
+    SQLITE_WAL: bool = os.getenv("SQLITE_WAL", "1") == "1"
     HOST: str = os.getenv("HOST")
     PORT: str = os.getenv("PORT")
     DB: str = os.getenv("DB")
     PASSWORD: str = os.getenv("PASSWORD")
     USER: str = os.getenv("USER")
 
+    # Logging: nivel, formato ("json" o "text"), tamaño de la cola y muestreo de DEBUG
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json").lower()
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_SAMPLE_DEBUG: float = float(os.getenv("LOG_SAMPLE_DEBUG", "0.05"))
+
+    # Segundos entre sondeos del log de cambios (coherencia de cachés entre workers)
+    CAMBIOS_INTERVALO: float = float(os.getenv("CAMBIOS_INTERVALO", "0.5"))
+
+    # Archivo de embeddings faciales compartido entre workers (por defecto data/embeddings.bin)
+    EMBEDDINGS_FILE: str | None = os.getenv("EMBEDDINGS_FILE")
+    EMBEDDINGS_DTYPE: str = os.getenv("EMBEDDINGS_DTYPE", "float32")
+
+    # Anti-passback: "entrada" (no dos entradas seguidas), "estricto" (tampoco dos salidas)
+    # o "desactivado"; el estado de un usuario caduca tras ANTIPASSBACK_EXPIRA segundos (0 = nunca)
+    ANTIPASSBACK_MODO: str = os.getenv("ANTIPASSBACK_MODO", "entrada").lower()
+    ANTIPASSBACK_EXPIRA: float = float(os.getenv("ANTIPASSBACK_EXPIRA", "43200"))
+
+    # Control de admisión de /acceso: token bucket por dispositivo (peticiones/s y ráfaga),
+    # verificaciones concurrentes y espera máxima (s) por un hueco antes de responder 503
+    ADMISION_TASA: float = float(os.getenv("ADMISION_TASA", "5"))
+    ADMISION_RAFAGA: float = float(os.getenv("ADMISION_RAFAGA", "10"))
+    ADMISION_CONCURRENCIA: int = int(os.getenv("ADMISION_CONCURRENCIA", "8"))
+    ADMISION_ESPERA: float = float(os.getenv("ADMISION_ESPERA", "0.1"))
+
+    # Carriles de prioridad: hilos (cada uno con su conexión) para CRUD y para consultas,
+    # y tareas pendientes admitidas por carril antes de responder 503.
+    # El carril de acceso usa ADMISION_CONCURRENCIA hilos. Por defecto el carril admin
+    # tiene un solo hilo: es el escritor dedicado de los routers *_cud (SQLite admite
+    # un único escritor a la vez); los de reportes abren conexiones de solo lectura.
+    CARRIL_ADMIN_CONCURRENCIA: int = int(os.getenv("CARRIL_ADMIN_CONCURRENCIA", "1"))
+    CARRIL_REPORTES_CONCURRENCIA: int = int(os.getenv("CARRIL_REPORTES_CONCURRENCIA", "2"))
+    CARRIL_MAX_PENDIENTES: int = int(os.getenv("CARRIL_MAX_PENDIENTES", "64"))
+
+    # Entradas máximas de la caché de lecturas de UniversalController
+    ENTIDADES_CACHE_MAX: int = int(os.getenv("ENTIDADES_CACHE_MAX", "10000"))
+
+    # Extracción de embeddings en el servidor: modelo "modulo:Clase" (vacío = /acceso/camara/frame
+    # responde 503; ModeloStub es solo para pruebas),
+    # frames máximos por lote y espera máxima (ms) para completar un lote
+    MODELO_FACIAL: str | None = os.getenv("MODELO_FACIAL")
+    EXTRACCION_LOTE: int = int(os.getenv("EXTRACCION_LOTE", "16"))
+    EXTRACCION_ESPERA_MS: float = float(os.getenv("EXTRACCION_ESPERA_MS", "5"))
+
+    # Comparación facial por lotes: sondas máximas por lote y espera máxima (ms) para
+    # completarlo, que es la latencia añadida como mucho a cada verificación; tiempo máximo
+    # (ms) de espera por el resultado antes de responder 503
+    COMPARACION_LOTE: int = int(os.getenv("COMPARACION_LOTE", "32"))
+    COMPARACION_ESPERA_MS: float = float(os.getenv("COMPARACION_ESPERA_MS", "2"))
+    COMPARACION_TIMEOUT_MS: float = float(os.getenv("COMPARACION_TIMEOUT_MS", "500"))
+
+    # Filtro de calidad de capturas: ancho (px) del frame reducido que se evalúa, varianza
+    # mínima del Laplaciano, brillo medio admitido (0-255) y alto mínimo del rostro (fracción)
+    CALIDAD_LADO: int = int(os.getenv("CALIDAD_LADO", "160"))
+    CALIDAD_NITIDEZ_MIN: float = float(os.getenv("CALIDAD_NITIDEZ_MIN", "30"))
+    CALIDAD_BRILLO_MIN: float = float(os.getenv("CALIDAD_BRILLO_MIN", "40"))
+    CALIDAD_BRILLO_MAX: float = float(os.getenv("CALIDAD_BRILLO_MAX", "215"))
+    CALIDAD_ROSTRO_MIN: float = float(os.getenv("CALIDAD_ROSTRO_MIN", "0.2"))
+
+    # Umbrales de coincidencia por medio: variable de entorno, si no el archivo que escribe
+    # la calibración (python -m backend.app.logic.calibration --escribir), si no el valor por defecto
+    UMBRALES_FILE: str = os.getenv(
+        "UMBRALES_FILE", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "umbrales.json")
+    )
+    UMBRAL_FACIAL: float = float(os.getenv("UMBRAL_FACIAL", _leer_umbrales(UMBRALES_FILE).get("camara", 0.70)))
+    UMBRAL_HUELLA_VECTOR: float = float(
+        os.getenv("UMBRAL_HUELLA_VECTOR", _leer_umbrales(UMBRALES_FILE).get("huella_vector", 0.98))
+    )
+    UMBRAL_HUELLA_IMAGEN: float = float(
+        os.getenv("UMBRAL_HUELLA_IMAGEN", _leer_umbrales(UMBRALES_FILE).get("huella_imagen", 0.85))
+    )
+
+    # Archivo mensual de Registros, RegistrosInvalidos e HistorialEstadoUsuario: directorio de los
+    # archivos (por defecto data/archivo), meses recientes que se quedan en data.db, segundos entre
+    # pasadas del archivado (0 = desactivado) y páginas que devuelve cada vacuum incremental
+    ARCHIVO_DIR: str | None = os.getenv("ARCHIVO_DIR")
+    ARCHIVO_MESES_CALIENTES: int = int(os.getenv("ARCHIVO_MESES_CALIENTES", "3"))
+    ARCHIVO_INTERVALO: float = float(os.getenv("ARCHIVO_INTERVALO", "3600"))
+    ARCHIVO_VACUUM_PAGINAS: int = int(os.getenv("ARCHIVO_VACUUM_PAGINAS", "2000"))
+
     @property
     def db_config(self) -> dict:
         # Devuelve un diccionario con la configuración de la base de datos
@@ -0,0 +1,27 @@
+from fastapi import Request, Response
+
+
+def no_modificado(request: Request, etag: str | None) -> Response | None:
+    """
+    Respuesta 304 si el cliente ya tiene la versión `etag` (cabecera If-None-Match).
+
+    Args:
+        request (Request): Petición entrante.
+        etag (str | None): ETag actual del recurso; None si no es cacheable.
+
+    Returns:
+        Response | None: 304 listo para devolver, o None si hay que responder normalmente.
+    """
+    if etag is None:
+        return None
+    enviados = {e.strip().removeprefix("W/") for e in request.headers.get("if-none-match", "").split(",")}
+    if etag in enviados or "*" in enviados:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
+
+
+def fijar_etag(response: Response, etag: str | None):
+    """Añade ETag y Cache-Control: no-cache (el cliente revalida siempre con If-None-Match)."""
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
@@ -0,0 +1,147 @@
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from fastapi import HTTPException, status
+from fastapi.routing import APIRoute
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Estado de cada hilo de carril: su controlador (conexión propia) y su event loop
+_hilo = threading.local()
+
+
+def controlador_del_hilo():
+    """Controlador del carril que ejecuta el hilo actual, o None fuera de un carril."""
+    return getattr(_hilo, "controlador", None)
+
+
+class Carril:
+    """
+    Carril de ejecución con hilos y conexiones a la base de datos propios.
+
+    Cada hilo del carril abre su propio UniversalController, de modo que un
+    informe largo o una escritura administrativa no comparten cursor ni
+    conexión con las decisiones de acceso. Los carriles de baja prioridad
+    limitan además su cola: si hay demasiado trabajo pendiente responden 503
+    en lugar de acumularlo.
+
+    En un carril `solo_lectura` las conexiones no admiten escrituras y cada
+    tarea corre dentro de una instantánea: todas sus consultas ven el mismo
+    estado de la base de datos sin bloquear a los escritores.
+    """
+
+    def __init__(self, nombre: str, concurrencia: int, max_pendientes: int | None = None, solo_lectura: bool = False):
+        self.nombre = nombre
+        self.concurrencia = concurrencia
+        self.max_pendientes = max_pendientes
+        self.solo_lectura = solo_lectura
+        self._pendientes = 0
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _iniciar_hilo(self):
+        from backend.app.logic.universal_controller_server import UniversalController
+        _hilo.carril = self.nombre
+        _hilo.controlador = UniversalController(self.solo_lectura)
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.concurrencia,
+                        thread_name_prefix=f"carril-{self.nombre}",
+                        initializer=self._iniciar_hilo,
+                    )
+        return self._executor
+
+    def _llamar(self, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        if self.solo_lectura:
+            with _hilo.controlador.instantanea():
+                return self._invocar(fn, args, kwargs)
+        return self._invocar(fn, args, kwargs)
+
+    @staticmethod
+    def _invocar(fn: Callable, args: tuple, kwargs: dict) -> Any:
+        if inspect.iscoroutinefunction(fn):
+            # Endpoints async con cuerpo bloqueante: se corren en el loop propio del hilo
+            loop = getattr(_hilo, "loop", None)
+            if loop is None:
+                loop = _hilo.loop = asyncio.new_event_loop()
+            return loop.run_until_complete(fn(*args, **kwargs))
+        return fn(*args, **kwargs)
+
+    async def ejecutar(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta `fn` (función o corrutina) en un hilo del carril.
+
+        Raises:
+            HTTPException: 503 si el carril ya tiene `max_pendientes` tareas.
+        """
+        if getattr(_hilo, "carril", None) == self.nombre:
+            # Ya estamos en este carril (llamada anidada): no volver a encolar
+            return self._llamar(fn, args, kwargs)
+        with self._lock:
+            if self.max_pendientes is not None and self._pendientes >= self.max_pendientes:
+                logger.warning("Carril %s saturado (%d pendientes)", self.nombre, self._pendientes)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=f"Carril {self.nombre} saturado",
+                    headers={"Retry-After": "1"},
+                )
+            self._pendientes += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._obtener_executor(), self._llamar, fn, args, kwargs)
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+
+    def envolver(self, endpoint: Callable) -> Callable:
+        """Endpoint equivalente que se ejecuta en este carril."""
+        if getattr(endpoint, "__carril__", None) is not None:
+            return endpoint
+
+        @functools.wraps(endpoint)
+        async def en_carril(*args, **kwargs):
+            return await self.ejecutar(endpoint, *args, **kwargs)
+
+        en_carril.__carril__ = self.nombre
+        return en_carril
+
+    def detener(self):
+        """Espera a las tareas en curso y libera los hilos."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Carriles del proceso: las decisiones de acceso nunca esperan a CRUD o informes.
+# Los routers *_cud escriben desde "admin" y los *_query leen desde "reportes"
+carriles: dict[str, Carril] = {
+    "acceso": Carril("acceso", settings.ADMISION_CONCURRENCIA),
+    "admin": Carril("admin", settings.CARRIL_ADMIN_CONCURRENCIA, settings.CARRIL_MAX_PENDIENTES),
+    "reportes": Carril(
+        "reportes", settings.CARRIL_REPORTES_CONCURRENCIA, settings.CARRIL_MAX_PENDIENTES, solo_lectura=True
+    ),
+}
+
+
+def ruta_carril(nombre: str) -> type[APIRoute]:
+    """
+    Clase de ruta para `APIRouter(route_class=...)` que ejecuta los endpoints
+    del router en el carril indicado, fuera del event loop.
+    """
+    carril = carriles[nombre]
+
+    class RutaCarril(APIRoute):
+        def __init__(self, path: str, endpoint: Callable, **kwargs):
+            super().__init__(path, carril.envolver(endpoint), **kwargs)
+
+    RutaCarril.__name__ = f"RutaCarril_{nombre}"
+    return RutaCarril
@@ -0,0 +1,152 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from backend.app.core.config import settings
+
+# Logger dedicado a los eventos de acceso (una línea JSON por decisión)
+ACCESS_LOGGER = "backend.app.acceso"
+
+_CAMPOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: logging.handlers.QueueListener | None = None
+_handler: "ColaHandler | None" = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON, incluyendo los campos de `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _CAMPOS_ESTANDAR and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar solo una fracción de los registros de cada nivel.
+
+    Args:
+        tasas (dict[int, float]): Nivel -> probabilidad de conservar el registro.
+            Los niveles ausentes se conservan siempre.
+    """
+
+    def __init__(self, tasas: dict[int, float]):
+        super().__init__()
+        self.tasas = tasas
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        tasa = self.tasas.get(record.levelno, 1.0)
+        return tasa >= 1.0 or random.random() < tasa
+
+
+class ColaHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que nunca bloquea a quien registra.
+
+    Antes de encolar solo se resuelve `msg % args` (los argumentos podrían
+    cambiar antes de que el hilo del listener lo formatee); el formato
+    completo se hace en ese hilo, y si la cola está llena el registro se
+    descarta (y se cuenta).
+    """
+
+    def __init__(self, cola: queue.Queue):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Copia: otros handlers del mismo registro siguen viendo msg y args originales
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+def setup_logging() -> None:
+    """
+    Configura el logger raíz con un escritor en segundo plano.
+
+    Cada llamada de log solo encola el registro; un hilo `QueueListener` lo
+    formatea y lo escribe en stderr. Llamarla más de una vez no tiene efecto.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    salida = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT == "json":
+        salida.setFormatter(JSONFormatter())
+    else:
+        salida.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    _handler = ColaHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    _handler.addFilter(FiltroMuestreo({logging.DEBUG: settings.LOG_SAMPLE_DEBUG}))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(_handler.queue, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Vacía los registros pendientes, detiene el escritor en segundo plano y
+    quita el handler del logger raíz (así `setup_logging` puede reinstalarlo)."""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+def log_evento_acceso(medio: str, autorizado: bool, usuario_id: int | None, inicio: float, **campos) -> None:
+    """
+    Emite un evento de acceso estructurado.
+
+    Args:
+        medio (str): Medio de acceso utilizado.
+        autorizado (bool): Resultado de la verificación.
+        usuario_id (int | None): Usuario reconocido, si lo hay.
+        inicio (float): Instante `time.perf_counter()` en que empezó la verificación.
+        **campos: Datos adicionales del evento (dispositivo, torniquete, ...).
+    """
+    logger = logging.getLogger(ACCESS_LOGGER)
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info(
+        "acceso",
+        extra={
+            "evento": "acceso",
+            "medio": medio,
+            "autorizado": autorizado,
+            "usuario_id": usuario_id,
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            **campos,
+        },
+    )
@@ -0,0 +1,22 @@
+from typing import Any
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el codificador json estándar
+    orjson = None
+
+# Clase de respuesta por defecto de la app: orjson (en C, serializa numpy) si está instalado
+RespuestaJSON: type[JSONResponse] = ORJSONResponse if orjson is not None else JSONResponse
+
+
+class JSONCrudo(Response):
+    """
+    Respuesta con un cuerpo JSON ya codificado (p. ej. generado por SQLite con
+    json_group_array): se envía tal cual, sin jsonable_encoder ni re-serializar.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else content.encode("utf-8")
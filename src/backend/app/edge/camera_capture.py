@@ -0,0 +1,202 @@
+import argparse
+import logging
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from backend.app.core.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+class ServicioCaptura:
+    """
+    Servicio de captura que mantiene la cámara abierta.
+
+    Un hilo de fondo lee frames continuamente y los guarda en un buffer
+    circular preasignado (sin reservar memoria por frame), de modo que ante un
+    disparo el frame más reciente ya está en memoria y se entrega al instante,
+    en lugar de abrir el dispositivo, esperar 2 s y descartar frames como en
+    `legacy/camara.py`.
+
+    `fuente` puede ser el índice de la cámara o la ruta de un video; con un
+    video se respeta su FPS y se repite al terminar, así sirve de sustituto del
+    dispositivo en pruebas.
+    """
+
+    def __init__(
+        self,
+        fuente: int | str = 0,
+        capacidad: int = 8,
+        ancho: int | None = None,
+        alto: int | None = None,
+        repetir: bool = True,
+        reintento: float = 1.0,
+    ):
+        if capacidad < 2:
+            raise ValueError("capacidad debe ser al menos 2 (una ranura se está escribiendo)")
+        self.fuente = fuente
+        self.capacidad = capacidad
+        self.ancho = ancho
+        self.alto = alto
+        self.repetir = repetir
+        self.reintento = reintento
+        self._es_archivo = isinstance(fuente, str) and os.path.exists(fuente)
+        self._cap: cv2.VideoCapture | None = None
+        self._buffer: np.ndarray | None = None
+        self._instantes = np.zeros(capacidad, dtype=np.float64)
+        self._escritos = 0  # frames escritos desde el arranque; el último está en (escritos - 1) % capacidad
+        self._cond = threading.Condition()
+        self._parar = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+    def _abrir(self) -> cv2.VideoCapture | None:
+        cap = cv2.VideoCapture(self.fuente)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        if self.ancho:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.ancho)
+        if self.alto:
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.alto)
+        return cap
+
+    def _bucle(self):
+        intervalo = 0.0
+        while not self._parar.is_set():
+            if self._cap is None:
+                self._cap = self._abrir()
+                if self._cap is None:
+                    logger.warning("No se puede abrir la fuente de video %s; reintentando", self.fuente)
+                    self._parar.wait(self.reintento)
+                    continue
+                fps = self._cap.get(cv2.CAP_PROP_FPS) if self._es_archivo else 0
+                intervalo = 1.0 / fps if fps and fps > 0 else 0.0
+
+            inicio = time.monotonic()
+            if self._buffer is None:
+                ok, frame = self._cap.read()
+                if ok:
+                    self._buffer = np.empty((self.capacidad, *frame.shape), dtype=frame.dtype)
+                    self._buffer[0] = frame
+            else:
+                ranura = self._escritos % self.capacidad
+                ok, leido = self._cap.read(self._buffer[ranura])
+                if ok and (leido.shape != self._buffer.shape[1:] or leido.dtype != self._buffer.dtype):
+                    # Otra resolución (p. ej. al reabrir el dispositivo): OpenCV devuelve un array
+                    # nuevo sin tocar la ranura; se reasigna el buffer y se descartan los frames viejos
+                    logger.info("La fuente %s cambió a %s; se reasigna el buffer", self.fuente, leido.shape)
+                    with self._cond:
+                        self._buffer = np.empty((self.capacidad, *leido.shape), dtype=leido.dtype)
+                        self._buffer[0] = leido
+                        self._escritos = 0
+
+            if not ok:
+                if self._es_archivo and self.repetir:
+                    self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                logger.warning("Lectura fallida de %s; reabriendo el dispositivo", self.fuente)
+                self._cap.release()
+                self._cap = None
+                self._parar.wait(self.reintento)
+                continue
+
+            with self._cond:
+                self._instantes[self._escritos % self.capacidad] = time.time()
+                self._escritos += 1
+                self._cond.notify_all()
+
+            if intervalo:
+                # Un archivo se lee tan rápido como se decodifica: se simula el ritmo de la cámara
+                self._parar.wait(max(0.0, intervalo - (time.monotonic() - inicio)))
+
+    def iniciar(self):
+        """Abre la fuente y arranca la captura en segundo plano."""
+        if self._hilo is None:
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="captura-camara", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        """Detiene la captura y libera el dispositivo."""
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def ultimo_frame(self, timeout: float = 0.0) -> tuple[float, np.ndarray] | None:
+        """
+        Copia del frame más reciente.
+
+        Args:
+            timeout (float): Espera máxima (s) si todavía no hay ningún frame.
+
+        Returns:
+            tuple[float, np.ndarray] | None: (instante de captura, frame BGR), o None.
+        """
+        with self._cond:
+            if self._escritos == 0 and not self._cond.wait_for(lambda: self._escritos > 0, timeout):
+                return None
+            ranura = (self._escritos - 1) % self.capacidad
+            # Se copia bajo el lock: el hilo lector no reescribe la ranura mientras tanto
+            return float(self._instantes[ranura]), self._buffer[ranura].copy()
+
+    def frame_posterior(self, instante: float, timeout: float = 0.5) -> tuple[float, np.ndarray] | None:
+        """
+        Primer frame capturado después de `instante` (p. ej. el del disparo),
+        esperando como mucho `timeout` segundos.
+        """
+        with self._cond:
+            ultimo = lambda: self._instantes[(self._escritos - 1) % self.capacidad]
+            if not self._cond.wait_for(lambda: self._escritos > 0 and ultimo() >= instante, timeout):
+                return None
+            ranura = (self._escritos - 1) % self.capacidad
+            return float(self._instantes[ranura]), self._buffer[ranura].copy()
+
+    def recientes(self) -> list[tuple[float, np.ndarray]]:
+        """Copia de los frames del buffer, del más antiguo al más reciente."""
+        with self._cond:
+            # La ranura más antigua puede estar escribiéndose: se omite
+            n = min(self._escritos, self.capacidad - 1)
+            ranuras = [(self._escritos - n + k) % self.capacidad for k in range(n)]
+            return [(float(self._instantes[r]), self._buffer[r].copy()) for r in ranuras]
+
+
+def guardar_frame(frame: np.ndarray, directorio: str = ".", instante: float | None = None) -> str:
+    """Guarda el frame como PNG con nombre basado en la hora (como `legacy/camara.py`)."""
+    ruta = os.path.join(directorio, f"imagen_{int((instante or time.time()) * 1000)}.png")
+    cv2.imwrite(ruta, frame)
+    return ruta
+
+
+def main(argv: list[str] | None = None):
+    """CLI: captura continua y guarda un frame por cada línea leída en stdin."""
+    parser = argparse.ArgumentParser(description="Servicio de captura con la cámara siempre abierta")
+    parser.add_argument("--fuente", default="0", help="Índice de la cámara o ruta de un video")
+    parser.add_argument("--directorio", default=".", help="Dónde guardar las capturas")
+    parser.add_argument("--capacidad", type=int, default=8, help="Frames en el buffer circular")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    fuente = int(args.fuente) if args.fuente.isdigit() else args.fuente
+    servicio = ServicioCaptura(fuente, capacidad=args.capacidad)
+    servicio.iniciar()
+    try:
+        for _ in iter(input, None):
+            capturado = servicio.ultimo_frame(timeout=5)
+            if capturado is None:
+                logger.error("Sin frames de %s", fuente)
+                continue
+            logger.info("Imagen guardada como %s", guardar_frame(capturado[1], args.directorio, capturado[0]))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        servicio.detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import base64
+import importlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+import httpx
+import numpy as np
+from backend.app.core.logging_config import setup_logging
+from backend.app.edge.camera_capture import ServicioCaptura
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows: sin termios la pasarela no puede abrir los puertos
+    termios = tty = None
+
+logger = logging.getLogger(__name__)
+
+# Línea que envía el ESP32 al pulsar el botón (legacy/trigger_cam)
+LINEA_DISPARO = "capture"
+
+_BAUDIOS = {} if termios is None else {
+    9600: termios.B9600, 19200: termios.B19200, 38400: termios.B38400,
+    57600: termios.B57600, 115200: termios.B115200,
+}
+
+# extractor(frame BGR) -> embedding facial de 128 floats, o None si no hay rostro
+Extractor = Callable[[np.ndarray], np.ndarray | None]
+
+
+@dataclass
+class Puerta:
+    """Un torniquete: su puerto serie, su cámara y cómo se identifica ante el backend."""
+    puerto: str
+    dispositivo_id: str
+    captura: ServicioCaptura
+    id_torniquete: int | None = None
+    sentido: str | None = None
+    baudios: int = 9600
+    fd: int | None = field(default=None, repr=False)
+    _pendiente: bytes = field(default=b"", repr=False)
+    _ocupada: bool = field(default=False, repr=False)
+
+
+class GatewaySerial:
+    """
+    Pasarela asíncrona entre los puertos serie de varios torniquetes y el backend.
+
+    Cada puerto se abre en modo no bloqueante y se registra en el event loop
+    (`add_reader`), así que no hay hilos por puerto ni sondeo con `sleep`: las
+    líneas se procesan en cuanto llegan. Un disparo toma el último frame de la
+    cámara de esa puerta, extrae el embedding fuera del loop y lo envía a
+    `/acceso/camara` con un cliente HTTP con conexiones persistentes. La
+    respuesta se devuelve por el mismo puerto ("ACCESO 1" / "ACCESO 0"); todo
+    disparo recibe respuesta, también si no hay frame, rostro o backend.
+
+    Si un puerto se cae (fin de archivo o error de lectura, p. ej. al
+    desenchufar el adaptador USB) se deja de escuchar y se reintenta abrirlo
+    con espera exponencial entre `reintento_min` y `reintento_max` segundos.
+
+    Solo funciona en sistemas POSIX (Linux, macOS): usa termios y `add_reader`
+    sobre el descriptor del puerto, que los event loops de Windows no ofrecen.
+    """
+
+    def __init__(
+        self,
+        puertas: list[Puerta],
+        backend_url: str,
+        extractor: Extractor,
+        cliente: httpx.AsyncClient | None = None,
+        max_conexiones: int = 10,
+        timeout: float = 5.0,
+        reintento_min: float = 0.5,
+        reintento_max: float = 30.0,
+    ):
+        self.puertas = puertas
+        self.extractor = extractor
+        self.reintento_min = reintento_min
+        self.reintento_max = reintento_max
+        self.cliente = cliente or httpx.AsyncClient(
+            base_url=backend_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_conexiones, max_keepalive_connections=max_conexiones),
+        )
+        self._tareas: set[asyncio.Task] = set()
+        self._reaperturas: set[asyncio.Task] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @staticmethod
+    def _abrir_puerto(puerta: Puerta) -> int:
+        fd = os.open(puerta.puerto, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        if os.isatty(fd):
+            tty.setraw(fd)
+            atributos = termios.tcgetattr(fd)
+            velocidad = _BAUDIOS.get(puerta.baudios, termios.B9600)
+            atributos[4] = atributos[5] = velocidad
+            termios.tcsetattr(fd, termios.TCSANOW, atributos)
+        return fd
+
+    async def iniciar(self):
+        """Abre los puertos y empieza a escuchar disparos."""
+        if termios is None:
+            raise RuntimeError("GatewaySerial solo funciona en sistemas POSIX (Linux, macOS)")
+        self._loop = asyncio.get_running_loop()
+        for puerta in self.puertas:
+            puerta.captura.iniciar()
+            puerta.fd = self._abrir_puerto(puerta)
+            self._loop.add_reader(puerta.fd, self._leer, puerta)
+            logger.info("Escuchando %s (%s)", puerta.puerto, puerta.dispositivo_id)
+
+    def _leer(self, puerta: Puerta):
+        try:
+            datos = os.read(puerta.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.error("Error leyendo %s: %s", puerta.puerto, e)
+            self._desconectar(puerta)
+            return
+        if not datos:
+            # Fin de archivo: el dispositivo se desconectó; sin quitar el lector
+            # el loop volvería a llamar a _leer en cada vuelta
+            logger.error("Puerto %s cerrado", puerta.puerto)
+            self._desconectar(puerta)
+            return
+        instante = time.time()
+        *lineas, puerta._pendiente = (puerta._pendiente + datos).split(b"\n")
+        for linea in lineas:
+            texto = linea.decode("utf-8", errors="ignore").strip()
+            if texto == LINEA_DISPARO:
+                self._disparo(puerta, instante)
+            elif texto:
+                logger.debug("Línea ignorada de %s: %r", puerta.puerto, texto)
+
+    def _desconectar(self, puerta: Puerta):
+        """Deja de escuchar un puerto caído y programa su reapertura."""
+        self._loop.remove_reader(puerta.fd)
+        try:
+            os.close(puerta.fd)
+        except OSError:
+            pass
+        puerta.fd = None
+        puerta._pendiente = b""
+        tarea = self._loop.create_task(self._reabrir(puerta))
+        self._reaperturas.add(tarea)
+        tarea.add_done_callback(self._reaperturas.discard)
+
+    async def _reabrir(self, puerta: Puerta):
+        espera = self.reintento_min
+        while True:
+            await asyncio.sleep(espera)
+            try:
+                puerta.fd = self._abrir_puerto(puerta)
+            except (OSError, termios.error) as e:
+                logger.debug("No se pudo reabrir %s: %s (reintento en %.1fs)", puerta.puerto, e, espera)
+                espera = min(espera * 2, self.reintento_max)
+                continue
+            self._loop.add_reader(puerta.fd, self._leer, puerta)
+            logger.info("Puerto %s reabierto", puerta.puerto)
+            return
+
+    def _disparo(self, puerta: Puerta, instante: float):
+        if puerta._ocupada:
+            # Rebote del botón o disparo mientras se decide el anterior
+            logger.debug("Disparo descartado en %s: decisión en curso", puerta.puerto)
+            return
+        puerta._ocupada = True
+        tarea = self._loop.create_task(self._procesar(puerta, instante))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+
+    async def _procesar(self, puerta: Puerta, instante: float):
+        try:
+            capturado = puerta.captura.ultimo_frame()
+            if capturado is None:
+                logger.warning("Sin frames de la cámara de %s", puerta.dispositivo_id)
+                self._responder(puerta, False)
+                return
+            vector = await self._loop.run_in_executor(None, self.extractor, capturado[1])
+            if vector is None:
+                logger.info("Sin rostro en la captura de %s", puerta.dispositivo_id)
+                self._responder(puerta, False)
+                return
+            params = {
+                "dispositivo_id": puerta.dispositivo_id,
+                "vector": base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode(),
+                "fecha": datetime.fromtimestamp(instante).isoformat(timespec="seconds"),
+            }
+            if puerta.sentido is not None:
+                params.update(sentido=puerta.sentido, id_torniquete=puerta.id_torniquete)
+            respuesta = await self.cliente.post("/acceso/camara", params=params)
+            if respuesta.status_code != 200:
+                logger.warning("Backend respondió %d a %s", respuesta.status_code, puerta.dispositivo_id)
+                self._responder(puerta, False)
+                return
+            resultado = respuesta.json()
+            logger.info("Acceso %s en %s (usuario=%s, %.0f ms desde el disparo)",
+                        "concedido" if resultado.get("status") else "denegado", puerta.dispositivo_id,
+                        resultado.get("usuario_id"), (time.time() - instante) * 1000)
+            self._responder(puerta, bool(resultado.get("status")))
+        except httpx.HTTPError as e:
+            logger.error("Error enviando el acceso de %s: %s", puerta.dispositivo_id, e)
+            self._responder(puerta, False)
+        except Exception:
+            logger.exception("Error procesando el disparo de %s", puerta.dispositivo_id)
+            self._responder(puerta, False)
+        finally:
+            puerta._ocupada = False
+
+    @staticmethod
+    def _responder(puerta: Puerta, concedido: bool):
+        if puerta.fd is None:
+            logger.warning("No se pudo responder por %s: puerto desconectado", puerta.puerto)
+            return
+        try:
+            os.write(puerta.fd, b"ACCESO 1\n" if concedido else b"ACCESO 0\n")
+        except OSError as e:
+            logger.warning("No se pudo responder por %s: %s", puerta.puerto, e)
+
+    async def detener(self):
+        """Espera los disparos en curso, cierra los puertos, las cámaras y el cliente HTTP."""
+        for tarea in self._reaperturas:
+            tarea.cancel()
+        if self._reaperturas:
+            await asyncio.gather(*self._reaperturas, return_exceptions=True)
+        if self._tareas:
+            await asyncio.gather(*self._tareas, return_exceptions=True)
+        for puerta in self.puertas:
+            if puerta.fd is not None:
+                self._loop.remove_reader(puerta.fd)
+                os.close(puerta.fd)
+                puerta.fd = None
+            puerta.captura.detener()
+        await self.cliente.aclose()
+
+
+def _cargar_extractor(ruta: str) -> Extractor:
+    modulo, _, nombre = ruta.partition(":")
+    return getattr(importlib.import_module(modulo), nombre)
+
+
+def main(argv: list[str] | None = None):
+    """
+    CLI: python -m backend.app.edge.serial_gateway --backend http://servidor:8000
+         --extractor paquete.modulo:funcion
+         --puerta /dev/ttyUSB0,ESP32_001,0 --puerta /dev/ttyUSB1,ESP32_002,1
+    """
+    parser = argparse.ArgumentParser(description="Pasarela serie -> /acceso/camara para varios torniquetes")
+    parser.add_argument("--backend", required=True, help="URL base del backend")
+    parser.add_argument("--extractor", required=True, help="Función modulo:funcion que devuelve el embedding")
+    parser.add_argument("--puerta", action="append", required=True,
+                        help="puerto,dispositivo_id,camara[,id_torniquete,sentido]")
+    parser.add_argument("--baudios", type=int, default=9600)
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    puertas = []
+    for spec in args.puerta:
+        puerto, dispositivo_id, camara, *resto = spec.split(",")
+        fuente = int(camara) if camara.isdigit() else camara
+        puertas.append(Puerta(
+            puerto, dispositivo_id, ServicioCaptura(fuente),
+            id_torniquete=int(resto[0]) if resto else None,
+            sentido=resto[1] if len(resto) > 1 else None,
+            baudios=args.baudios,
+        ))
+
+    async def correr():
+        gateway = GatewaySerial(puertas, args.backend, _cargar_extractor(args.extractor))
+        await gateway.iniciar()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await gateway.detener()
+
+    try:
+        asyncio.run(correr())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
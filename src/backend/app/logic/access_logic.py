@@ -1,16 +1,34 @@
+import time
 from backend.app.models.access import AccesoRequest, AccesoResponse
 from backend.app.logic.verification import VerificadorFactory
+from backend.app.logic.antipassback import estado_presencia
+from backend.app.core.logging_config import log_evento_acceso
 # Servicio de acceso (DIP: depende de la abstracción VerificadorAcceso)
 class AccessService:
     @staticmethod
     def solicitar_acceso(request: AccesoRequest) -> AccesoResponse:
+        inicio = time.perf_counter()
         verificador = VerificadorFactory.obtener(request.medio)
         autorizado, usuario_id = verificador.verificar(request.data)
 
+        # Anti-passback: solo si el dispositivo informa el sentido del paso
+        antipassback = False
+        if autorizado and request.sentido is not None:
+            antipassback = not estado_presencia.admitir(usuario_id, request.sentido.value, request.id_torniquete)
+            autorizado = not antipassback
+
         status = True if autorizado else False
+        log_evento_acceso(
+            request.medio.value, status, usuario_id, inicio,
+            dispositivo_id=request.data.get("dispositivo_id"),
+            id_torniquete=request.id_torniquete,
+            sentido=request.sentido.value if request.sentido else None,
+            antipassback=antipassback,
+        )
         return AccesoResponse(
             status=status,
             medio=request.medio,
             usuario_id=usuario_id,
-            mensaje="Acceso concedido" if autorizado else "Acceso denegado"
-        )
\ No newline at end of file
+            mensaje="Acceso concedido" if autorizado else
+                    "Acceso denegado (anti-passback)" if antipassback else "Acceso denegado"
+        )
@@ -0,0 +1,257 @@
+import logging
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+import numpy as np
+from backend.app.core.config import settings
+from backend.app.logic.change_log import VigilanteCambios
+from backend.app.logic.universal_controller_instance import vigilante_cambios
+from backend.app.logic.universal_controller_server import DB_FILE
+
+logger = logging.getLogger(__name__)
+
+# Códigos del último sentido registrado por usuario
+SIN_ESTADO, ENTRADA, SALIDA = 0, 1, 2
+_CODIGOS = {"entrada": ENTRADA, "salida": SALIDA}
+
+# Ids mayores se guardan en un dict para no inflar los arrays
+MAX_ID_DENSO = 1 << 22
+# Registros por transacción del escritor en segundo plano
+_LOTE_ESCRITURA = 500
+
+_SELECT_ULTIMOS = """
+    SELECT id_usuario, MAX(id_registro) AS id_registro, lower(trim(tipo_acceso)) AS sentido,
+           fecha_hora, id_torniquete
+    FROM Registros
+    WHERE resultado = 1 AND lower(trim(tipo_acceso)) IN ('entrada', 'salida') AND id_registro <= ?
+    GROUP BY id_usuario
+"""
+_SELECT_NUEVOS = """
+    SELECT id_usuario, lower(trim(tipo_acceso)) AS sentido, fecha_hora, id_torniquete
+    FROM Registros
+    WHERE id_registro > ? AND id_registro <= ?
+      AND resultado = 1 AND lower(trim(tipo_acceso)) IN ('entrada', 'salida')
+    ORDER BY id_registro
+"""
+_INSERT_REGISTRO = """
+    INSERT INTO Registros (id_usuario, id_torniquete, fecha_hora, tipo_acceso, resultado, observaciones)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def _a_epoch(fecha_hora: str | None) -> float:
+    try:
+        return datetime.fromisoformat(fecha_hora).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class EstadoPresencia:
+    """
+    Estado de presencia por usuario para aplicar anti-passback sin consultar
+    `Registros` en cada pasada.
+
+    Guarda, en arrays indexados por id_usuario, el último sentido autorizado,
+    su instante y el torniquete. Se reconstruye desde `Registros` al arrancar,
+    cada decisión se persiste como un registro nuevo desde un hilo escritor, y
+    los registros que escriben otros workers se incorporan al sincronizar el
+    VigilanteCambios (siguiendo `id_registro`, ya que Registros es de solo
+    inserción y no pasa por RegistroCambios).
+    """
+
+    def __init__(
+        self,
+        vigilante: VigilanteCambios,
+        db_file: str,
+        modo: str = "entrada",
+        expira: float = 0.0,
+        capacidad: int = 1024,
+    ):
+        self.vigilante = vigilante
+        self.db_file = db_file
+        self.modo = modo
+        self.expira = expira
+        self._lock = threading.Lock()
+        self._sentido = np.zeros(capacidad, dtype=np.int8)
+        self._instante = np.zeros(capacidad, dtype=np.float64)
+        self._torniquete = np.zeros(capacidad, dtype=np.int32)
+        self._dispersos: dict[int, tuple[int, float, int]] = {}
+        self._cargado = False
+        self._ultimo_registro = 0
+        self._cola: queue.Queue = queue.Queue()
+        self._parar = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+    # ----- Estado en memoria -----
+
+    def _leer(self, id_usuario: int) -> tuple[int, float, int]:
+        if 0 <= id_usuario < len(self._sentido):
+            return int(self._sentido[id_usuario]), float(self._instante[id_usuario]), int(self._torniquete[id_usuario])
+        return self._dispersos.get(id_usuario, (SIN_ESTADO, 0.0, 0))
+
+    def _fijar(self, id_usuario: int, sentido: int, instante: float, id_torniquete: int):
+        if 0 <= id_usuario < MAX_ID_DENSO:
+            if id_usuario >= len(self._sentido):
+                nueva = max(id_usuario + 1, 2 * len(self._sentido))
+                for nombre in ("_sentido", "_instante", "_torniquete"):
+                    actual = getattr(self, nombre)
+                    ampliado = np.zeros(nueva, dtype=actual.dtype)
+                    ampliado[:len(actual)] = actual
+                    setattr(self, nombre, ampliado)
+            self._sentido[id_usuario] = sentido
+            self._instante[id_usuario] = instante
+            self._torniquete[id_usuario] = id_torniquete
+        else:
+            self._dispersos[id_usuario] = (sentido, instante, id_torniquete)
+
+    def _aplicar_fila(self, fila):
+        """Incorpora un registro autorizado salvo que el estado ya sea más reciente."""
+        instante = _a_epoch(fila["fecha_hora"])
+        if instante >= self._leer(fila["id_usuario"])[1]:
+            self._fijar(fila["id_usuario"], _CODIGOS[fila["sentido"]], instante, fila["id_torniquete"] or 0)
+
+    def _asegurar_cargado(self):
+        if not self._cargado:
+            with self.vigilante.lock:
+                if not self._cargado:
+                    self.vigilante.observar(self.sincronizar)
+                    self._reconstruir()
+                    self._cargado = True
+
+    def _reconstruir(self):
+        conn = self.vigilante.conexion()
+        maxima = conn.execute("SELECT COALESCE(MAX(id_registro), 0) FROM Registros").fetchone()[0]
+        filas = conn.execute(_SELECT_ULTIMOS, (maxima,)).fetchall()
+        with self._lock:
+            self._sentido[:] = SIN_ESTADO
+            self._instante[:] = 0.0
+            self._torniquete[:] = 0
+            self._dispersos.clear()
+            for fila in filas:
+                self._aplicar_fila(fila)
+            self._ultimo_registro = maxima
+        logger.info("Estado de presencia reconstruido: %d usuarios", len(filas))
+
+    def sincronizar(self):
+        """Incorpora los registros confirmados por otros procesos desde la última llamada."""
+        if not self._cargado:
+            return
+        with self.vigilante.lock:
+            conn = self.vigilante.conexion()
+            maxima = conn.execute("SELECT COALESCE(MAX(id_registro), 0) FROM Registros").fetchone()[0]
+            if maxima < self._ultimo_registro:
+                # Registros se vació o se reemplazó la base de datos
+                self._reconstruir()
+                return
+            if maxima == self._ultimo_registro:
+                return
+            filas = conn.execute(_SELECT_NUEVOS, (self._ultimo_registro, maxima)).fetchall()
+            with self._lock:
+                for fila in filas:
+                    self._aplicar_fila(fila)
+                self._ultimo_registro = maxima
+
+    # ----- Decisión -----
+
+    def admitir(self, id_usuario: int, sentido: str, id_torniquete: int) -> bool:
+        """
+        Decide si el usuario puede pasar en ese sentido y registra la decisión.
+
+        Se rechaza una entrada tras otra entrada (y, en modo "estricto", una salida
+        tras otra salida) salvo que el estado anterior haya caducado.
+
+        Args:
+            id_usuario (int): Usuario ya identificado por el verificador.
+            sentido (str): "entrada" o "salida".
+            id_torniquete (int): Torniquete donde ocurre el paso.
+
+        Returns:
+            bool: True si se permite el paso.
+        """
+        self._asegurar_cargado()
+        codigo = _CODIGOS[sentido]
+        fecha = datetime.now().isoformat(sep=" ", timespec="milliseconds")
+        instante = _a_epoch(fecha)
+        with self._lock:
+            previo, instante_previo, _ = self._leer(id_usuario)
+            if self.expira and instante - instante_previo > self.expira:
+                previo = SIN_ESTADO
+            repetido = previo == codigo and (codigo == ENTRADA or self.modo == "estricto")
+            permitido = self.modo == "desactivado" or not repetido
+            if permitido:
+                self._fijar(id_usuario, codigo, instante, id_torniquete)
+        self._persistir((id_usuario, id_torniquete, fecha, sentido, permitido,
+                         None if permitido else "anti-passback"))
+        return permitido
+
+    def ultimo_paso(self, id_usuario: int) -> dict | None:
+        """Último paso autorizado del usuario según el estado en memoria."""
+        self._asegurar_cargado()
+        with self._lock:
+            sentido, instante, id_torniquete = self._leer(id_usuario)
+        if sentido == SIN_ESTADO:
+            return None
+        return {
+            "sentido": "entrada" if sentido == ENTRADA else "salida",
+            "fecha_hora": datetime.fromtimestamp(instante).isoformat(sep=" ", timespec="milliseconds"),
+            "id_torniquete": id_torniquete,
+        }
+
+    # ----- Persistencia asíncrona -----
+
+    def _persistir(self, registro: tuple):
+        self._cola.put(registro)
+        if self._hilo is None:
+            self.iniciar()
+
+    def _escritor(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            while not (self._parar.is_set() and self._cola.empty()):
+                try:
+                    lote = [self._cola.get(timeout=0.5)]
+                except queue.Empty:
+                    continue
+                while len(lote) < _LOTE_ESCRITURA:
+                    try:
+                        lote.append(self._cola.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    conn.executemany(_INSERT_REGISTRO, lote)
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    logger.exception("No se pudieron persistir %d registros de paso", len(lote))
+                finally:
+                    for _ in lote:
+                        self._cola.task_done()
+        finally:
+            conn.close()
+
+    def iniciar(self):
+        """Reconstruye el estado (si hace falta) y arranca el hilo escritor."""
+        self._asegurar_cargado()
+        with self._lock:
+            if self._hilo is None:
+                self._parar.clear()
+                self._hilo = threading.Thread(target=self._escritor, name="presencia-escritor", daemon=True)
+                self._hilo.start()
+
+    def vaciar(self):
+        """Espera a que se persistan todas las decisiones pendientes."""
+        self._cola.join()
+
+    def detener(self):
+        """Persiste lo pendiente y detiene el hilo escritor."""
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+
+
+# Instancia única por proceso
+estado_presencia = EstadoPresencia(
+    vigilante_cambios, DB_FILE, modo=settings.ANTIPASSBACK_MODO, expira=settings.ANTIPASSBACK_EXPIRA
+)
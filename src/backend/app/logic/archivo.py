@@ -0,0 +1,307 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from backend.app.core.config import settings
+from backend.app.core.logging_config import setup_logging
+from backend.app.logic.universal_controller_server import DB_FILE, DIR_DATA
+
+logger = logging.getLogger(__name__)
+
+# Tablas históricas que se particionan por mes y su columna de fecha
+TABLAS_ARCHIVABLES = {
+    "Registros": "fecha_hora",
+    "RegistrosInvalidos": "fecha_invalido",
+    "HistorialEstadoUsuario": "fecha_cambio",
+}
+
+# Bases adjuntas por consulta (SQLite admite 10 por defecto)
+_MAX_ADJUNTAS = 8
+
+
+def limites_mes(mes: str) -> tuple[str, str]:
+    """Rango [inicio, fin) del mes como texto comparable con las fechas guardadas."""
+    anio, numero = int(mes[:4]), int(mes[5:7])
+    siguiente = f"{anio + numero // 12:04d}-{numero % 12 + 1:02d}"
+    return f"{mes}-01", f"{siguiente}-01"
+
+
+def _texto(fecha: datetime | str) -> str:
+    """Fecha como texto ISO con espacio entre fecha y hora (la forma normalizada)."""
+    return fecha.isoformat(sep=" ") if isinstance(fecha, datetime) else fecha.replace("T", " ")
+
+
+def _normalizada(columna: str) -> str:
+    """Columna de fecha con separador espacio: los dispositivos envían 'AAAA-MM-DDTHH:MM:SS'."""
+    return f"replace({columna}, 'T', ' ')"
+
+
+class ArchivoMensual:
+    """
+    Particionado por meses de las tablas históricas.
+
+    Los meses cerrados (anteriores a los `meses_calientes` más recientes) se
+    mueven de data.db a un archivo SQLite por mes, `archivo_AAAA-MM.db`, con
+    las mismas tablas. Así data.db solo guarda lo reciente y los recorridos,
+    copias de seguridad y VACUUM no crecen con la historia.
+
+    Las consultas por rango de fechas adjuntan con ATTACH (solo lectura) los
+    archivos de los meses que cubre el rango y unen sus filas con las de
+    data.db, de modo que el histórico sigue disponible sin cambiar de API.
+
+    Los contadores de tráfico (TraficoHorario, Ocupacion) no se tocan al
+    archivar: la migración 5 desactiva su trigger de borrado mientras
+    ArchivadoEnCurso tiene una fila, que solo existe dentro de la transacción
+    de archivado.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        directorio: str,
+        meses_calientes: int = 3,
+        intervalo: float = 3600,
+        paginas_vacuum: int = 2000,
+    ):
+        self.db_file = db_file
+        self.directorio = directorio
+        self.meses_calientes = meses_calientes
+        self.intervalo = intervalo
+        self.paginas_vacuum = paginas_vacuum
+        self._parar = threading.Event()
+        self._hilo: threading.Thread | None = None
+        # Un único archivado a la vez dentro del proceso (entre procesos serializa BEGIN IMMEDIATE)
+        self._lock = threading.Lock()
+
+    def ruta(self, mes: str) -> str:
+        """Archivo SQLite de un mes."""
+        return os.path.join(self.directorio, f"archivo_{mes}.db")
+
+    def meses_archivados(self) -> list[str]:
+        """Meses con archivo, en orden."""
+        prefijo = len("archivo_")
+        return sorted(os.path.basename(r)[prefijo:prefijo + 7] for r in glob.glob(self.ruta("*")))
+
+    def _conectar(self) -> sqlite3.Connection:
+        # uri=True: las consultas adjuntan los archivos en solo lectura (file:...?mode=ro)
+        conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False, uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _tablas(conn: sqlite3.Connection) -> dict[str, str]:
+        existentes = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master WHERE type='table'")}
+        return {tabla: fecha for tabla, fecha in TABLAS_ARCHIVABLES.items() if tabla in existentes}
+
+    def corte(self, ahora: datetime | None = None) -> str:
+        """Primer mes que se mantiene en data.db."""
+        ahora = ahora or datetime.now()
+        indice = ahora.year * 12 + ahora.month - 1 - self.meses_calientes
+        return f"{indice // 12:04d}-{indice % 12 + 1:02d}"
+
+    def meses_pendientes(self, ahora: datetime | None = None) -> list[str]:
+        """Meses cerrados que aún tienen filas en data.db."""
+        limite = limites_mes(self.corte(ahora))[0]
+        conn = self._conectar()
+        try:
+            meses = set()
+            for tabla, fecha in self._tablas(conn).items():
+                meses.update(
+                    row[0] for row in conn.execute(
+                        f"SELECT DISTINCT substr({fecha}, 1, 7) FROM {tabla} WHERE {fecha} < ?", (limite,)
+                    ) if row[0]
+                )
+            return sorted(meses)
+        finally:
+            conn.close()
+
+    def archivar_mes(self, mes: str) -> dict[str, int]:
+        """
+        Mueve las filas de un mes a su archivo en una sola transacción.
+
+        Es idempotente: si se interrumpe entre la copia y el borrado, repetirlo
+        reemplaza las filas ya copiadas y termina de borrarlas de data.db.
+
+        Returns:
+            dict[str, int]: Filas movidas por tabla.
+        """
+        inicio, fin = limites_mes(mes)
+        os.makedirs(self.directorio, exist_ok=True)
+        with self._lock:
+            conn = self._conectar()
+            try:
+                if not conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='ArchivadoEnCurso'"
+                ).fetchone():
+                    raise RuntimeError("Falta la migración 5 (ArchivadoEnCurso); no se archiva.")
+                conn.execute("ATTACH DATABASE ? AS archivo", (self.ruta(mes),))
+                movidas = {}
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute("INSERT OR IGNORE INTO ArchivadoEnCurso (id) VALUES (1)")
+                    for tabla, fecha in self._tablas(conn).items():
+                        columnas = self._crear_tabla_archivo(conn, tabla, fecha)
+                        lista = ", ".join(columnas)
+                        conn.execute(
+                            f"INSERT OR REPLACE INTO archivo.{tabla} ({lista}) "
+                            f"SELECT {lista} FROM main.{tabla} WHERE {fecha} >= ? AND {fecha} < ?",
+                            (inicio, fin),
+                        )
+                        movidas[tabla] = conn.execute(
+                            f"DELETE FROM main.{tabla} WHERE {fecha} >= ? AND {fecha} < ?", (inicio, fin)
+                        ).rowcount
+                    conn.execute("DELETE FROM ArchivadoEnCurso")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                conn.execute("DETACH DATABASE archivo")
+            finally:
+                conn.close()
+        logger.info("Mes %s archivado en %s: %s", mes, self.ruta(mes), movidas)
+        return movidas
+
+    @staticmethod
+    def _crear_tabla_archivo(conn: sqlite3.Connection, tabla: str, fecha: str) -> list[str]:
+        """Crea la tabla en el archivo con las columnas de data.db (sin claves foráneas) e índice por fecha."""
+        info = conn.execute(f"PRAGMA main.table_info({tabla})").fetchall()
+        definicion = ", ".join(
+            f"{c['name']} {c['type']}" + (" PRIMARY KEY" if c["pk"] == 1 else "") for c in info
+        )
+        conn.execute(f"CREATE TABLE IF NOT EXISTS archivo.{tabla} ({definicion})")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS archivo.idx_{tabla}_{fecha} ON {tabla} ({fecha})")
+        return [c["name"] for c in info]
+
+    def vacuum_incremental(self) -> int:
+        """
+        Devuelve al sistema hasta `paginas_vacuum` páginas libres de data.db.
+
+        Requiere auto_vacuum = INCREMENTAL (ver `convertir_vacuum_incremental`);
+        en otro modo no hace nada.
+
+        Returns:
+            int: Páginas liberadas.
+        """
+        conn = self._conectar()
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                logger.debug("data.db sin auto_vacuum incremental; se omite el vacuum.")
+                return 0
+            antes = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # executescript ejecuta el pragma hasta el final (execute solo libera una página por paso)
+            conn.executescript(f"PRAGMA incremental_vacuum({int(self.paginas_vacuum)})")
+            return antes - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+
+    def convertir_vacuum_incremental(self):
+        """Activa auto_vacuum = INCREMENTAL; exige un VACUUM completo (una sola vez, bloquea la base)."""
+        conn = self._conectar()
+        try:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def archivar(self, ahora: datetime | None = None) -> dict[str, dict[str, int]]:
+        """Archiva todos los meses cerrados pendientes y compacta data.db."""
+        resultado = {mes: self.archivar_mes(mes) for mes in self.meses_pendientes(ahora)}
+        if resultado:
+            logger.info("Vacuum incremental: %d páginas liberadas", self.vacuum_incremental())
+        return resultado
+
+    def consultar(self, modelo: Any, desde: datetime | str, hasta: datetime | str) -> list[dict]:
+        """
+        Filas de la tabla del modelo con fecha en [desde, hasta), de data.db y de
+        los archivos mensuales que cubre el rango, ordenadas por fecha.
+        """
+        tabla = modelo.__entity_name__
+        fecha = TABLAS_ARCHIVABLES[tabla]
+        desde, hasta = _texto(desde), _texto(hasta)
+        meses = [m for m in self.meses_archivados() if limites_mes(m)[0] < hasta and limites_mes(m)[1] > desde]
+
+        # Las fechas guardadas usan ' ' o 'T' como separador ('T' > ' '). El rango
+        # [desde, hasta con 'T') contiene ambas formas y recorre el índice de la
+        # fecha; la comparación exacta se hace sobre la fecha normalizada.
+        hasta_t = hasta[:10] + "T" + hasta[11:] if len(hasta) > 10 else hasta
+        parametros = (desde, hasta_t, desde, hasta)
+        conn = self._conectar()
+        try:
+            columnas = ", ".join(c["name"] for c in conn.execute(f"PRAGMA main.table_info({tabla})"))
+            condicion = (
+                f"WHERE {fecha} >= ? AND {fecha} < ? AND {_normalizada(fecha)} >= ? AND {_normalizada(fecha)} < ?"
+            )
+            filas = [dict(row) for row in conn.execute(f"SELECT {columnas} FROM main.{tabla} {condicion}", parametros)]
+            for i in range(0, len(meses), _MAX_ADJUNTAS):
+                grupo = meses[i:i + _MAX_ADJUNTAS]
+                for n, mes in enumerate(grupo):
+                    uri = Path(os.path.abspath(self.ruta(mes))).as_uri() + "?mode=ro"
+                    conn.execute(f"ATTACH DATABASE ? AS mes{n}", (uri,))
+                try:
+                    sql = " UNION ALL ".join(
+                        f"SELECT {columnas} FROM mes{n}.{tabla} {condicion}" for n in range(len(grupo))
+                    )
+                    filas.extend(dict(row) for row in conn.execute(sql, parametros * len(grupo)))
+                finally:
+                    for n in range(len(grupo)):
+                        conn.execute(f"DETACH DATABASE mes{n}")
+        finally:
+            conn.close()
+        filas.sort(key=lambda fila: _texto(fila[fecha] or ""))
+        return filas
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.archivar()
+            except Exception:
+                logger.exception("Error archivando meses cerrados")
+
+    def iniciar(self):
+        """Arranca el archivado periódico en un hilo de fondo (intervalo <= 0 lo desactiva)."""
+        if self._hilo is None and self.intervalo > 0:
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="archivo-mensual", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        """Detiene el archivado periódico."""
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+
+
+# Instancia única por proceso
+archivo_mensual = ArchivoMensual(
+    DB_FILE,
+    settings.ARCHIVO_DIR or os.path.join(DIR_DATA, "archivo"),
+    meses_calientes=settings.ARCHIVO_MESES_CALIENTES,
+    intervalo=settings.ARCHIVO_INTERVALO,
+    paginas_vacuum=settings.ARCHIVO_VACUUM_PAGINAS,
+)
+
+
+def main(argv: list[str] | None = None):
+    """CLI: python -m backend.app.logic.archivo [--meses-calientes 3] [--convertir-vacuum]"""
+    parser = argparse.ArgumentParser(description="Archiva en archivos mensuales los meses cerrados de data.db")
+    parser.add_argument("--meses-calientes", type=int, default=settings.ARCHIVO_MESES_CALIENTES)
+    parser.add_argument("--convertir-vacuum", action="store_true",
+                        help="Activar auto_vacuum incremental en data.db (VACUUM completo, una sola vez)")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    archivo_mensual.meses_calientes = args.meses_calientes
+    if args.convertir_vacuum:
+        archivo_mensual.convertir_vacuum_incremental()
+    print(json.dumps(archivo_mensual.archivar(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
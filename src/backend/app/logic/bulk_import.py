@@ -0,0 +1,277 @@
+import argparse
+import base64
+import csv
+import hashlib
+import json
+import logging
+import sys
+import time
+from typing import Iterable, Iterator
+import numpy as np
+from backend.app.logic.embeddings import DIMENSION_FACIAL, decodificar_embedding, normalizar_filas, hash_facial
+
+logger = logging.getLogger(__name__)
+
+# Columnas reconocidas en cada registro (NDJSON o CSV)
+CAMPOS = (
+    "id_usuario", "nombre_completo", "cargo", "estado", "fecha_registro",
+    "rfid_tag", "vector_facial", "template_huella", "fecha_actualizacion",
+)
+
+_INSERT_USUARIO = """
+    INSERT INTO Usuarios (id_usuario, nombre_completo, cargo, estado, fecha_registro)
+    VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+"""
+_INSERT_BIOMETRIA = """
+    INSERT INTO Biometria (id_usuario, vector_facial, facial_hash, huella_hash, template_huella, rfid_tag, fecha_actualizacion)
+    VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+"""
+
+
+def leer_registros(lineas: Iterable[str], formato: str) -> Iterator[tuple[int, dict]]:
+    """
+    Lee los registros de un archivo NDJSON o CSV.
+
+    Args:
+        lineas (Iterable[str]): Líneas del archivo.
+        formato (str): "ndjson" o "csv".
+
+    Yields:
+        tuple[int, dict]: (número de línea, registro).
+    """
+    if formato == "csv":
+        for numero, fila in enumerate(csv.DictReader(lineas), start=2):
+            yield numero, {k: v for k, v in fila.items() if k in CAMPOS and v not in (None, "")}
+    elif formato == "ndjson":
+        for numero, linea in enumerate(lineas, start=1):
+            if linea.strip():
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError as e:
+                    yield numero, {"_error": f"JSON inválido: {e}"}
+                    continue
+                if isinstance(registro, dict):
+                    yield numero, registro
+                else:
+                    yield numero, {"_error": f"Se esperaba un objeto JSON, no {type(registro).__name__}"}
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+
+def _bool(valor) -> bool:
+    if isinstance(valor, str):
+        return valor.strip().lower() in ("1", "true", "si", "sí", "yes")
+    return bool(valor)
+
+
+class ImportadorBiometria:
+    """
+    Alta masiva de usuarios y su biometría.
+
+    Los embeddings de cada lote se validan y normalizan juntos en NumPy, y cada
+    lote se escribe con `executemany` en una sola transacción. Las cachés en
+    memoria (IndiceBiometria, almacén de embeddings) se actualizan una vez al
+    final, no por fila.
+    """
+
+    def __init__(self, controller, tam_lote: int = 5000):
+        self.controller = controller
+        self.tam_lote = tam_lote
+
+    def importar(self, registros: Iterable[tuple[int, dict]]) -> dict:
+        """
+        Importa los registros.
+
+        Un registro con `nombre_completo` crea el usuario (con `id_usuario` dado o
+        asignado); sin él, `id_usuario` debe referirse a un usuario existente o
+        creado antes en el mismo archivo. Los registros inválidos (también los
+        id_usuario inexistentes o repetidos) se omiten y se informan en "errores"
+        con su número de línea.
+
+        Returns:
+            dict: Resumen con contadores, errores y duración.
+        """
+        inicio = time.perf_counter()
+        resumen = {"procesados": 0, "usuarios_creados": 0, "biometrias_creadas": 0, "errores": []}
+        conn = self.controller.conn
+        self._tags = {row[0] for row in conn.execute("SELECT rfid_tag FROM Biometria WHERE rfid_tag IS NOT NULL")}
+        # Ids de usuario existentes o ya reservados por registros válidos del import
+        self._usuarios = {row[0] for row in conn.execute("SELECT id_usuario FROM Usuarios")}
+
+        lote = []
+        for numero, registro in registros:
+            lote.append((numero, registro))
+            if len(lote) >= self.tam_lote:
+                self._procesar_lote(lote, resumen)
+                lote = []
+        if lote:
+            self._procesar_lote(lote, resumen)
+
+        # Una sola sincronización de las cachés para todo el import
+        self.controller.notify_commit()
+        resumen["duracion_s"] = round(time.perf_counter() - inicio, 3)
+        logger.info("Import masivo: %d procesados, %d usuarios, %d biometrías, %d errores en %.2fs",
+                    resumen["procesados"], resumen["usuarios_creados"], resumen["biometrias_creadas"],
+                    len(resumen["errores"]), resumen["duracion_s"])
+        return resumen
+
+    def _procesar_lote(self, lote: list[tuple[int, dict]], resumen: dict):
+        resumen["procesados"] += len(lote)
+        errores = resumen["errores"]
+        validos: list[list] = []  # [número de línea, registro, facial_hash]
+        crudos: list[np.ndarray] = []
+        con_vector: list[list] = []
+
+        for numero, registro in lote:
+            error = self._validar(registro)
+            if error:
+                errores.append({"linea": numero, "error": error})
+                continue
+            item = [numero, registro, None]
+            vector = registro.get("vector_facial")
+            if vector is not None:
+                try:
+                    embedding = (np.asarray(vector, dtype=np.float32) if isinstance(vector, list)
+                                 else decodificar_embedding(vector))
+                except (ValueError, TypeError) as e:
+                    errores.append({"linea": numero, "error": str(e)})
+                    continue
+                if embedding.shape != (DIMENSION_FACIAL,):
+                    errores.append({"linea": numero, "error": f"vector_facial de dimensión {embedding.shape}"})
+                    continue
+                con_vector.append(item)
+                crudos.append(embedding)
+            validos.append(item)
+            self._reservar(registro)
+
+        # Validación y normalización vectorizadas de todos los embeddings del lote
+        if crudos:
+            matriz = np.vstack(crudos)
+            correctos = np.isfinite(matriz).all(axis=1) & (np.abs(matriz).sum(axis=1) > 0)
+            for item, fila in zip((con_vector[k] for k in np.flatnonzero(correctos)), normalizar_filas(matriz[correctos])):
+                item[2] = hash_facial(fila)
+            descartados = set()
+            for k in np.flatnonzero(~correctos):
+                errores.append({"linea": con_vector[k][0], "error": "vector_facial no finito o nulo"})
+                if con_vector[k][1].get("nombre_completo") and con_vector[k][1].get("id_usuario") is not None:
+                    descartados.add(con_vector[k][1]["id_usuario"])
+                self._liberar(con_vector[k][1])
+                con_vector[k][1] = None
+            # Los registros que referían a un usuario que ya no se crea tampoco valen
+            for item in validos:
+                r = item[1]
+                if r is not None and not r.get("nombre_completo") and r["id_usuario"] in descartados:
+                    errores.append({"linea": item[0], "error": f"id_usuario inexistente: {r['id_usuario']}"})
+                    self._liberar(r)
+                    item[1] = None
+            validos = [item for item in validos if item[1] is not None]
+
+        if validos:
+            self._escribir(validos, resumen)
+
+    def _validar(self, registro: dict) -> str | None:
+        """Mensaje de error del registro, o None si es válido. Normaliza id_usuario a int."""
+        if "_error" in registro:
+            return registro["_error"]
+        if registro.get("id_usuario") is not None:
+            try:
+                registro["id_usuario"] = int(registro["id_usuario"])
+            except (TypeError, ValueError):
+                return f"id_usuario inválido: {registro['id_usuario']}"
+            existe = registro["id_usuario"] in self._usuarios
+            if registro.get("nombre_completo") and existe:
+                return f"id_usuario duplicado: {registro['id_usuario']}"
+            if not registro.get("nombre_completo") and not existe:
+                return f"id_usuario inexistente: {registro['id_usuario']}"
+        elif not registro.get("nombre_completo"):
+            return "Se requiere nombre_completo o id_usuario"
+        tag = registro.get("rfid_tag")
+        if tag is not None and str(tag) in self._tags:
+            return f"rfid_tag duplicado: {tag}"
+        template = registro.get("template_huella")
+        if template:
+            # Se decodifica aquí: un template corrupto en _escribir rechazaría todo el lote
+            try:
+                datos = base64.b64decode(template + '=' * (-len(template) % 4))
+            except (TypeError, ValueError):
+                return "template_huella no es base64 válido"
+            registro["_huella_hash"] = hashlib.sha256(datos).hexdigest()[:8]
+        return None
+
+    def _reservar(self, registro: dict):
+        """Marca como usados el rfid_tag y el id_usuario que crea un registro válido."""
+        if registro.get("rfid_tag") is not None:
+            self._tags.add(str(registro["rfid_tag"]))
+        if registro.get("nombre_completo") and registro.get("id_usuario") is not None:
+            self._usuarios.add(registro["id_usuario"])
+
+    def _liberar(self, registro: dict):
+        """Deshace `_reservar` para un registro que finalmente no se escribe."""
+        if registro.get("rfid_tag") is not None:
+            self._tags.discard(str(registro["rfid_tag"]))
+        if registro.get("nombre_completo") and registro.get("id_usuario") is not None:
+            self._usuarios.discard(registro["id_usuario"])
+
+    def _escribir(self, validos: list[list], resumen: dict):
+        conn = self.controller.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            siguiente = conn.execute("SELECT COALESCE(MAX(id_usuario), 0) FROM Usuarios").fetchone()[0] + 1
+            usuarios, biometrias, asignados = [], [], []
+            for _, r, facial_hash in validos:
+                id_usuario = r.get("id_usuario")
+                if r.get("nombre_completo"):
+                    if id_usuario is None:
+                        # Saltar los ids que reservan registros con id explícito
+                        while siguiente in self._usuarios:
+                            siguiente += 1
+                        id_usuario = siguiente
+                        asignados.append(id_usuario)
+                        self._usuarios.add(id_usuario)
+                        siguiente += 1
+                    usuarios.append((id_usuario, r["nombre_completo"], r.get("cargo"),
+                                     _bool(r.get("estado", True)), r.get("fecha_registro")))
+                vector = r.get("vector_facial")
+                if isinstance(vector, list):
+                    vector = base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode()
+                template = r.get("template_huella")
+                huella_hash = r.get("_huella_hash")
+                tag = r.get("rfid_tag")
+                if vector or template or tag is not None:
+                    biometrias.append((id_usuario, vector, facial_hash, huella_hash, template,
+                                       None if tag is None else str(tag), r.get("fecha_actualizacion")))
+            conn.executemany(_INSERT_USUARIO, usuarios)
+            conn.executemany(_INSERT_BIOMETRIA, biometrias)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error("Lote de import rechazado (líneas %d-%d): %s", validos[0][0], validos[-1][0], e)
+            resumen["errores"].append({"linea": validos[0][0], "error": f"Lote rechazado hasta la línea {validos[-1][0]}: {e}"})
+            for _, r, _ in validos:
+                self._liberar(r)
+            self._usuarios.difference_update(asignados)
+            return
+        resumen["usuarios_creados"] += len(usuarios)
+        resumen["biometrias_creadas"] += len(biometrias)
+
+
+def main(argv: list[str] | None = None):
+    """CLI: python -m backend.app.logic.bulk_import usuarios.ndjson [--formato csv] [--lote 5000]"""
+    parser = argparse.ArgumentParser(description="Importación masiva de usuarios y biometría")
+    parser.add_argument("archivo", help="Archivo NDJSON o CSV")
+    parser.add_argument("--formato", choices=["ndjson", "csv"], help="Por defecto según la extensión")
+    parser.add_argument("--lote", type=int, default=5000, help="Registros por transacción")
+    args = parser.parse_args(argv)
+
+    from backend.app.logic.universal_controller_instance import universal_controller
+
+    formato = args.formato or ("csv" if args.archivo.lower().endswith(".csv") else "ndjson")
+    with open(args.archivo, encoding="utf-8-sig", newline="") as f:
+        resumen = ImportadorBiometria(universal_controller, args.lote).importar(leer_registros(f, formato))
+    json.dump(resumen, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 1 if resumen["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
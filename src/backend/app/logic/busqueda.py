@@ -0,0 +1,70 @@
+import re
+
+# Términos de la consulta: secuencias de letras/dígitos (el resto de caracteres separa)
+_TERMINO = re.compile(r"\w+", re.UNICODE)
+
+
+def consulta_fts(texto: str, max_terminos: int = 8) -> str | None:
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura.
+
+    Cada término se entrecomilla (la sintaxis de FTS5 no llega a la base de
+    datos) y se busca por prefijo; todos los términos deben aparecer.
+
+    Returns:
+        str | None: Consulta MATCH, o None si el texto no tiene términos.
+    """
+    terminos = _TERMINO.findall(texto)[:max_terminos]
+    if not terminos:
+        return None
+    return " ".join(f'"{t}"*' for t in terminos)
+
+
+class BuscadorTexto:
+    """
+    Búsqueda de texto completo sobre los índices FTS5 de la migración 6.
+
+    `UsuariosFTS` (nombre_completo, cargo) y `RegistrosFTS` (observaciones)
+    los mantienen los triggers de sus tablas. Los resultados se ordenan por
+    bm25 (el nombre pesa más que el cargo), salvo que la consulta sea tan
+    amplia (más de `max_ranking` coincidencias) que puntuarlas todas cueste
+    decenas de ms: entonces se devuelven las más recientes, que FTS5 recorre
+    en orden de rowid sin puntuar.
+    """
+
+    def __init__(self, controller, max_ranking: int = 2000):
+        self.controller = controller
+        self.max_ranking = max_ranking
+
+    def _buscar(self, fts: str, tabla: str, pk: str, columnas: str, pesos: str, texto: str, limite: int) -> list[dict]:
+        consulta = consulta_fts(texto)
+        if consulta is None:
+            return []
+        conn = self.controller.conn
+        coincidencias = conn.execute(
+            f"SELECT count(*) FROM (SELECT rowid FROM {fts} WHERE {fts} MATCH ? LIMIT ?)",
+            (consulta, self.max_ranking + 1),
+        ).fetchone()[0]
+        orden = f"{fts}.rowid DESC" if coincidencias > self.max_ranking else f"bm25({fts}{pesos})"
+        sql = f"""
+            SELECT {columnas} FROM {fts} JOIN {tabla} t ON t.{pk} = {fts}.rowid
+            WHERE {fts} MATCH ? ORDER BY {orden} LIMIT ?
+        """
+        return [dict(row) for row in conn.execute(sql, (consulta, limite))]
+
+    def usuarios(self, texto: str, limite: int = 20) -> list[dict]:
+        """Usuarios cuyo nombre o cargo contiene palabras que empiezan por los términos."""
+        return self._buscar(
+            "UsuariosFTS", "Usuarios", "id_usuario",
+            "t.id_usuario, t.nombre_completo, t.cargo, t.estado, t.fecha_registro",
+            ", 10.0, 1.0", texto, limite,
+        )
+
+    def registros(self, texto: str, limite: int = 50) -> list[dict]:
+        """Registros cuyas observaciones coinciden, con el fragmento que coincide marcado."""
+        return self._buscar(
+            "RegistrosFTS", "Registros", "id_registro",
+            "t.id_registro, t.id_usuario, t.id_torniquete, t.fecha_hora, t.tipo_acceso, t.resultado, "
+            "t.observaciones, snippet(RegistrosFTS, 0, '[', ']', '…', 12) AS fragmento",
+            "", texto, limite,
+        )
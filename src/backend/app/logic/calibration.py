@@ -0,0 +1,293 @@
+import argparse
+import base64
+import csv
+import json
+import logging
+import math
+import os
+import sqlite3
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import numpy as np
+from backend.app.core.config import settings
+from backend.app.core.logging_config import setup_logging
+from backend.app.logic.embeddings import DIMENSION_FACIAL, decodificar_embedding, normalizar_filas
+
+logger = logging.getLogger(__name__)
+
+# Medios calibrables: embeddings faciales (coseno) y templates de huella en modo vector (correlación)
+MEDIOS = ("camara", "huella_vector")
+
+# Bytes de memoria por par comparado en un bloque (scores, índices de bin, máscaras y copias)
+_BYTES_POR_PAR = 24
+
+
+@dataclass
+class Calibracion:
+    medio: str
+    muestras: int
+    pares_genuinos: int
+    pares_impostores: int
+    umbral_eer: float
+    eer: float
+    umbral_far: float
+    far: float
+    frr: float
+
+
+def preparar(vectores: list[np.ndarray], medio: str) -> np.ndarray:
+    """
+    Matriz cuyo producto fila a fila es el score del verificador del medio:
+    - camara: embeddings normalizados (similitud coseno);
+    - huella_vector: templates recortados a la longitud común, centrados y
+      normalizados (correlación de Pearson, como VerificadorHuella). Solo
+      equivale al verificador si todos los templates miden lo mismo o son
+      dos; `puntuar` agrupa los conjuntos con longitudes distintas.
+    """
+    if medio == "camara":
+        return normalizar_filas(np.stack(vectores).astype(np.float32))
+    longitud = min(len(v) for v in vectores)
+    matriz = np.stack([v[:longitud] for v in vectores]).astype(np.float32)
+    matriz -= matriz.mean(axis=1, keepdims=True)
+    return matriz / (np.linalg.norm(matriz, axis=1, keepdims=True) + 1e-8)
+
+
+def _decodificar(texto: str, medio: str) -> np.ndarray:
+    if medio == "camara":
+        return decodificar_embedding(texto)
+    return np.frombuffer(base64.b64decode(texto + "=" * (-len(texto) % 4)), dtype=np.uint8).astype(np.float32)
+
+
+def cargar_conjunto(ruta: str, medio: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Carga un conjunto etiquetado.
+
+    Formatos:
+    - .npz con los arrays `vectores` (N x D) y `etiquetas` (N);
+    - .jsonl con una muestra por línea: {"etiqueta": ..., "vector": "<Base64 o JSON>"}.
+
+    Returns:
+        tuple[list[np.ndarray], np.ndarray]: vectores (ver `puntuar`) y etiquetas.
+    """
+    if ruta.endswith(".npz"):
+        datos = np.load(ruta, allow_pickle=False)
+        return list(datos["vectores"]), np.asarray(datos["etiquetas"])
+    vectores, etiquetas = [], []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                muestra = json.loads(linea)
+                vectores.append(_decodificar(muestra["vector"], medio))
+                etiquetas.append(str(muestra["etiqueta"]))
+    return vectores, np.asarray(etiquetas)
+
+
+def cargar_desde_db(db_file: str, medio: str) -> tuple[np.ndarray, np.ndarray]:
+    """Usa los registros de Biometria como conjunto etiquetado (etiqueta = id_usuario)."""
+    columna = "vector_facial" if medio == "camara" else "template_huella"
+    conn = sqlite3.connect(db_file)
+    try:
+        filas = conn.execute(f"SELECT id_usuario, {columna} FROM Biometria WHERE {columna} IS NOT NULL").fetchall()
+    finally:
+        conn.close()
+    vectores, etiquetas = [], []
+    for id_usuario, texto in filas:
+        vector = _decodificar(texto, medio)
+        if medio == "camara" and vector.shape[0] != DIMENSION_FACIAL:
+            continue
+        vectores.append(vector)
+        etiquetas.append(id_usuario)
+    return vectores, np.asarray(etiquetas)
+
+
+def _acumular(
+    a: np.ndarray, la: np.ndarray, b: np.ndarray, lb: np.ndarray, diagonal: bool,
+    genuinos: np.ndarray, impostores: np.ndarray, memoria_mb: float,
+):
+    """
+    Suma a los histogramas los scores de cada fila de `a` con cada fila de `b`
+    (con `diagonal`, a es b y solo cuenta el triángulo superior), por bloques
+    cuadrados de tamaño acotado por `memoria_mb`.
+    """
+    bins = len(genuinos)
+    bloque = max(1, int(math.sqrt(memoria_mb * 2**20 / _BYTES_POR_PAR)))
+    for i0 in range(0, len(a), bloque):
+        ba, bla = a[i0:i0 + bloque], la[i0:i0 + bloque]
+        for j0 in range(i0 if diagonal else 0, len(b), bloque):
+            bb, blb = b[j0:j0 + bloque], lb[j0:j0 + bloque]
+            indices = np.clip(((ba @ bb.T + 1) * (bins / 2)).astype(np.int64), 0, bins - 1)
+            mismo = bla[:, None] == blb[None, :]
+            if diagonal and i0 == j0:
+                # Bloque diagonal: cada par una sola vez y sin comparar una muestra consigo misma
+                superior = np.triu(np.ones(mismo.shape, dtype=bool), k=1)
+                genuinos += np.bincount(indices[mismo & superior], minlength=bins)
+                impostores += np.bincount(indices[~mismo & superior], minlength=bins)
+            else:
+                genuinos += np.bincount(indices[mismo], minlength=bins)
+                impostores += np.bincount(indices[~mismo], minlength=bins)
+        logger.debug("Calibración: filas %d-%d de %d", i0, min(i0 + bloque, len(a)), len(a))
+
+
+def distribuciones(
+    matriz: np.ndarray, etiquetas: np.ndarray, memoria_mb: float = 256, bins: int = 2000
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Histogramas de scores genuinos e impostores de todos los pares distintos.
+
+    La matriz de scores N x N no se materializa: se recorre por bloques
+    cuadrados (solo el triángulo superior) de tamaño acotado por
+    `memoria_mb`, y cada bloque se vuelca a histogramas fijos en [-1, 1].
+
+    Returns:
+        tuple: cuentas genuinas (bins), cuentas impostoras (bins) y bordes (bins + 1).
+    """
+    genuinos = np.zeros(bins, dtype=np.int64)
+    impostores = np.zeros(bins, dtype=np.int64)
+    _, etiquetas = np.unique(etiquetas, return_inverse=True)
+    _acumular(matriz, etiquetas, matriz, etiquetas, True, genuinos, impostores, memoria_mb)
+    return genuinos, impostores, np.linspace(-1, 1, bins + 1)
+
+
+def distribuciones_huella(
+    vectores: list[np.ndarray], etiquetas: np.ndarray, memoria_mb: float = 256, bins: int = 2000
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Como `distribuciones` para templates de huella de longitudes distintas.
+
+    VerificadorHuella recorta cada par a la menor de sus dos longitudes, así
+    que los templates se agrupan por longitud y cada pareja de grupos se
+    compara recortada a la menor de las dos: cada score es el del verificador.
+    """
+    genuinos = np.zeros(bins, dtype=np.int64)
+    impostores = np.zeros(bins, dtype=np.int64)
+    _, etiquetas = np.unique(etiquetas, return_inverse=True)
+    grupos: dict[int, list[int]] = {}
+    for k, v in enumerate(vectores):
+        grupos.setdefault(len(v), []).append(k)
+    longitudes = sorted(grupos)
+    for gi, la in enumerate(longitudes):
+        for lb in longitudes[gi:]:
+            a = preparar([vectores[k][:la] for k in grupos[la]], "huella_vector")
+            b = preparar([vectores[k][:la] for k in grupos[lb]], "huella_vector")
+            _acumular(a, etiquetas[grupos[la]], b, etiquetas[grupos[lb]], la == lb, genuinos, impostores, memoria_mb)
+    return genuinos, impostores, np.linspace(-1, 1, bins + 1)
+
+
+def puntuar(
+    vectores: list[np.ndarray], etiquetas: np.ndarray, medio: str, memoria_mb: float = 256, bins: int = 2000
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Histogramas de scores genuinos e impostores con el score que usa el verificador del medio."""
+    if medio == "camara":
+        return distribuciones(preparar(vectores, medio), etiquetas, memoria_mb, bins)
+    return distribuciones_huella(vectores, etiquetas, memoria_mb, bins)
+
+
+def curvas(genuinos: np.ndarray, impostores: np.ndarray, bordes: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    FAR y FRR para cada umbral candidato (borde inferior de cada bin; se
+    acepta un score >= umbral). ROC = (far, 1 - frr); DET = (far, frr).
+    """
+    total_genuinos = max(int(genuinos.sum()), 1)
+    total_impostores = max(int(impostores.sum()), 1)
+    far = impostores[::-1].cumsum()[::-1] / total_impostores
+    frr = np.concatenate(([0], genuinos.cumsum()[:-1])) / total_genuinos
+    return {"umbral": bordes[:-1], "far": far, "frr": frr}
+
+
+def recomendar(medio: str, muestras: int, genuinos: np.ndarray, impostores: np.ndarray,
+               bordes: np.ndarray, far_objetivo: float) -> Calibracion:
+    """Umbral de igual error (EER) y el menor umbral con FAR <= far_objetivo."""
+    c = curvas(genuinos, impostores, bordes)
+    k_eer = int(np.argmin(np.abs(c["far"] - c["frr"])))
+    admisibles = np.flatnonzero(c["far"] <= far_objetivo)
+    k_far = int(admisibles[0]) if len(admisibles) else len(bordes) - 2
+    return Calibracion(
+        medio=medio,
+        muestras=muestras,
+        pares_genuinos=int(genuinos.sum()),
+        pares_impostores=int(impostores.sum()),
+        umbral_eer=float(c["umbral"][k_eer]),
+        eer=float((c["far"][k_eer] + c["frr"][k_eer]) / 2),
+        umbral_far=float(c["umbral"][k_far]),
+        far=float(c["far"][k_far]),
+        frr=float(c["frr"][k_far]),
+    )
+
+
+def guardar_curvas(ruta: str, c: dict[str, np.ndarray]):
+    """CSV con umbral, FAR, FRR y TPR: basta para dibujar las curvas ROC y DET."""
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["umbral", "far", "frr", "tpr"])
+        for umbral, far, frr in zip(c["umbral"], c["far"], c["frr"]):
+            escritor.writerow([f"{umbral:.4f}", f"{far:.6g}", f"{frr:.6g}", f"{1 - frr:.6g}"])
+
+
+def escribir_umbrales(ruta: str, calibracion: Calibracion, umbral: float):
+    """Actualiza el umbral del medio en el archivo que lee la configuración."""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            contenido = json.load(f)
+    except (OSError, ValueError):
+        contenido = {}
+    contenido.setdefault("umbrales", {})[calibracion.medio] = round(umbral, 4)
+    contenido.setdefault("calibracion", {})[calibracion.medio] = {
+        **asdict(calibracion), "fecha": datetime.now().isoformat(timespec="seconds"),
+    }
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(contenido, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def main(argv: list[str] | None = None):
+    """
+    CLI: python -m backend.app.logic.calibration --medio camara --conjunto muestras.npz
+         --far 1e-4 --curvas roc.csv --escribir
+    """
+    parser = argparse.ArgumentParser(description="Calibración de umbrales: scores genuinos/impostores, FAR/FRR")
+    parser.add_argument("--medio", choices=MEDIOS, required=True)
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--conjunto", help="Conjunto etiquetado (.npz o .jsonl)")
+    origen.add_argument("--db", nargs="?", const="", help="Usar Biometria (por defecto la base de datos de la app)")
+    parser.add_argument("--far", type=float, default=1e-4, help="FAR objetivo para el umbral recomendado")
+    parser.add_argument("--criterio", choices=("far", "eer"), default="far", help="Umbral que se escribe")
+    parser.add_argument("--memoria-mb", type=float, default=256, help="Memoria máxima por bloque de scores")
+    parser.add_argument("--bins", type=int, default=2000)
+    parser.add_argument("--curvas", help="CSV de salida con las curvas ROC/DET")
+    parser.add_argument("--escribir", action="store_true", help="Guardar el umbral en UMBRALES_FILE")
+    parser.add_argument("--umbrales", default=settings.UMBRALES_FILE, help="Archivo de umbrales")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    if args.conjunto:
+        vectores, etiquetas = cargar_conjunto(args.conjunto, args.medio)
+    else:
+        from backend.app.logic.universal_controller_server import DB_FILE
+        vectores, etiquetas = cargar_desde_db(args.db or DB_FILE, args.medio)
+
+    genuinos, impostores, bordes = puntuar(vectores, etiquetas, args.medio, args.memoria_mb, args.bins)
+    calibracion = recomendar(args.medio, len(vectores), genuinos, impostores, bordes, args.far)
+    print(json.dumps(asdict(calibracion), indent=2))
+    if calibracion.pares_genuinos == 0:
+        logger.warning("El conjunto no tiene pares genuinos (una muestra por identidad): el FRR no es fiable")
+    if calibracion.pares_impostores == 0:
+        logger.warning("El conjunto no tiene pares impostores (una sola identidad): el FAR no es fiable")
+
+    if args.curvas:
+        guardar_curvas(args.curvas, curvas(genuinos, impostores, bordes))
+        logger.info("Curvas ROC/DET guardadas en %s", args.curvas)
+    if args.escribir:
+        if calibracion.pares_genuinos == 0 or calibracion.pares_impostores == 0:
+            # El umbral saldría de un extremo de la curva (p. ej. -1: se aceptaría cualquier muestra)
+            logger.error("Umbral %s no guardado: hacen falta pares genuinos e impostores", args.medio)
+            return 1
+        umbral = calibracion.umbral_far if args.criterio == "far" else calibracion.umbral_eer
+        escribir_umbrales(args.umbrales, calibracion, umbral)
+        logger.info("Umbral %s = %.4f guardado en %s", args.medio, umbral, args.umbrales)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import logging
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Máximo de parámetros por consulta IN (...)
+_LOTE_IN = 500
+
+# callback(filas): {id: fila actual (dict) o None si se eliminó}; None = recargar todo
+Suscriptor = Callable[[dict[int, dict | None] | None], None]
+
+
+class VigilanteCambios:
+    """
+    Mantiene coherentes las cachés en memoria de un proceso (worker) leyendo el
+    log `RegistroCambios` que escriben los triggers de cada tabla.
+
+    Cada proceso tiene su propio vigilante con una conexión que solo lee. El
+    chequeo barato es `PRAGMA data_version`, que solo cambia cuando otra conexión
+    confirma una transacción; entonces se leen las entradas posteriores a la
+    marca de agua y se entregan a los suscriptores únicamente las filas cambiadas.
+    No hay locks entre procesos: la base de datos es la única fuente de verdad.
+    """
+
+    def __init__(self, db_file: str, intervalo: float = 0.5):
+        self.db_file = db_file
+        self.intervalo = intervalo
+        self.watermark: int | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._data_version: int | None = None
+        self._suscriptores: dict[str, list[Suscriptor]] = defaultdict(list)
+        self._pks: dict[str, str] = {}
+        self._observadores: list[Callable[[], None]] = []
+        # Serializa la sincronización; las cachés lo toman antes que su propio lock
+        self.lock = threading.RLock()
+        self._parar = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+    def conexion(self) -> sqlite3.Connection:
+        """Conexión propia del vigilante (se abre y fija la marca de agua al primer uso)."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self.watermark = self._version_maxima()
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return self._conn
+
+    def _version_maxima(self) -> int:
+        return self._conn.execute("SELECT MAX(version) FROM RegistroCambios").fetchone()[0] or 0
+
+    def _pk(self, tabla: str) -> str:
+        if tabla not in self._pks:
+            columnas = self.conexion().execute(f"PRAGMA table_info({tabla})").fetchall()
+            self._pks[tabla] = next(c["name"] for c in columnas if c["pk"] == 1)
+        return self._pks[tabla]
+
+    def suscribir(self, tabla: str, callback: Suscriptor):
+        """
+        Registra una caché interesada en los cambios de `tabla`.
+
+        La caché debe hacer su carga completa *después* de suscribirse: los cambios
+        confirmados entre medias se vuelven a entregar y se aplican como upserts.
+        """
+        with self.lock:
+            self.conexion()
+            self._suscriptores[tabla].append(callback)
+
+    def observar(self, callback: Callable[[], None]):
+        """
+        Registra un callback sin argumentos que se llama cada vez que otra conexión
+        confirmó algo, para cachés de tablas que no están en RegistroCambios
+        (p. ej. las de solo inserción, que se siguen por su propio id).
+        """
+        with self.lock:
+            self.conexion()
+            self._observadores.append(callback)
+
+    def sincronizar(self) -> int:
+        """
+        Aplica a los suscriptores los cambios confirmados desde la última llamada.
+
+        Returns:
+            int: Número de entradas del log procesadas.
+        """
+        with self.lock:
+            conn = self.conexion()
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return 0
+            self._data_version = data_version
+            for callback in self._observadores:
+                try:
+                    callback()
+                except Exception:
+                    logger.exception("Error notificando un observador de cambios")
+
+            maxima = self._version_maxima()
+            if maxima < self.watermark:
+                # El log retrocedió (base de datos reemplazada): recarga completa
+                logger.warning("RegistroCambios retrocedió (%d < %d); recargando cachés.", maxima, self.watermark)
+                self.watermark = maxima
+                for callbacks in self._suscriptores.values():
+                    for callback in callbacks:
+                        callback(None)
+                return 0
+
+            entradas = conn.execute(
+                "SELECT tabla, id_registro FROM RegistroCambios WHERE version > ? AND version <= ?",
+                (self.watermark, maxima),
+            ).fetchall()
+            cambiados: dict[str, set[int]] = defaultdict(set)
+            for entrada in entradas:
+                if entrada["tabla"] in self._suscriptores:
+                    cambiados[entrada["tabla"]].add(entrada["id_registro"])
+
+            # Durante la entrega, watermark ya es la versión que reflejan las filas
+            self.watermark = maxima
+            for tabla, ids in cambiados.items():
+                filas = self.leer_filas(tabla, sorted(ids))
+                for callback in self._suscriptores[tabla]:
+                    try:
+                        callback(filas)
+                    except Exception:
+                        logger.exception("Error aplicando cambios de %s a una caché", tabla)
+            return len(entradas)
+
+    def leer_filas(self, tabla: str, ids: list[int]) -> dict[int, dict | None]:
+        """Estado actual de las filas cambiadas; las eliminadas quedan como None."""
+        pk = self._pk(tabla)
+        filas: dict[int, dict | None] = dict.fromkeys(ids)
+        for i in range(0, len(ids), _LOTE_IN):
+            lote = ids[i:i + _LOTE_IN]
+            marcas = ", ".join("?" for _ in lote)
+            for row in self._conn.execute(f"SELECT * FROM {tabla} WHERE {pk} IN ({marcas})", lote):
+                filas[row[pk]] = dict(row)
+        return filas
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.sincronizar()
+            except Exception:
+                logger.exception("Error sincronizando cachés con RegistroCambios")
+
+    def iniciar(self):
+        """Arranca el sondeo periódico en un hilo de fondo."""
+        if self._hilo is None:
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="vigilante-cambios", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        """Detiene el sondeo periódico."""
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
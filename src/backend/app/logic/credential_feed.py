@@ -0,0 +1,122 @@
+import base64
+import logging
+from typing import Iterable
+from backend.app.logic.embeddings import (
+    DIMENSION_FACIAL, ESCALA_INT8, decodificar_embedding, normalizar, cuantizar_int8
+)
+
+logger = logging.getLogger(__name__)
+
+# Tablas cuyos cambios afectan al listado de credenciales
+TABLAS_CREDENCIALES = ("Biometria", "Usuarios")
+
+# Máximo de parámetros por consulta IN (...)
+_LOTE_IN = 500
+
+# Solo credenciales de usuarios existentes y activos: borrar el usuario las revoca
+_SELECT_CREDENCIALES = """
+    SELECT b.id_biometria, b.id_usuario, b.rfid_tag, b.vector_facial
+    FROM Biometria b
+    JOIN Usuarios u ON u.id_usuario = b.id_usuario
+    WHERE COALESCE(u.estado, 1) = 1
+"""
+
+
+def _lotes(ids: list[int]) -> Iterable[list[int]]:
+    for i in range(0, len(ids), _LOTE_IN):
+        yield ids[i:i + _LOTE_IN]
+
+
+class CredentialFeed:
+    """
+    Exporta las credenciales activas (RFID y, opcionalmente, embeddings faciales
+    cuantizados) de forma versionada, para que los controladores de torniquete
+    mantengan una lista local y decidan sin consultar al backend.
+
+    La versión es el último `RegistroCambios.version`. Un cliente que envía la
+    versión que ya tiene recibe solo las altas/bajas posteriores; si esa versión
+    ya no se puede reconstruir desde el log recibe un snapshot completo.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    def version_actual(self) -> int:
+        """Versión más reciente del log de cambios (0 si está vacío)."""
+        row = self.controller.conn.execute("SELECT MAX(version) FROM RegistroCambios").fetchone()
+        return row[0] or 0
+
+    def _delta_disponible(self, since_version: int, version: int) -> bool:
+        if since_version > version:
+            return False  # El cliente viene de otra base de datos o de un reinicio
+        row = self.controller.conn.execute("SELECT MIN(version) FROM RegistroCambios").fetchone()
+        minima = row[0] or version + 1
+        return since_version >= minima - 1
+
+    def _entrada(self, row, incluir_faciales: bool) -> dict | None:
+        """Convierte una fila de Biometria en la entrada compacta que recibe el dispositivo."""
+        entrada = {"id": row["id_biometria"], "u": row["id_usuario"]}
+        if row["rfid_tag"]:
+            entrada["rfid"] = row["rfid_tag"]
+        if incluir_faciales and row["vector_facial"]:
+            try:
+                embedding = decodificar_embedding(row["vector_facial"])
+            except ValueError:
+                embedding = None
+            if embedding is not None and embedding.shape[0] == DIMENSION_FACIAL:
+                entrada["f"] = base64.b64encode(cuantizar_int8(normalizar(embedding))).decode()
+        # Sin ninguna credencial utilizable la entrada no aporta nada al dispositivo
+        return entrada if len(entrada) > 2 else None
+
+    def exportar(self, since_version: int | None = None, incluir_faciales: bool = False) -> dict:
+        """
+        Construye el snapshot o delta de credenciales.
+
+        Args:
+            since_version (int | None): Versión que ya tiene el cliente.
+            incluir_faciales (bool): Incluir embeddings int8 en base64 (clave "f").
+
+        Returns:
+            dict: {"version", "completo", "escala_facial", "altas", "bajas"}. Las altas
+            son upserts por "id" (id_biometria) y las bajas ids a eliminar.
+        """
+        conn = self.controller.conn
+        # Leer la versión antes que las filas: un cambio concurrente puede llegar
+        # dos veces (upsert idempotente) pero nunca perderse.
+        version = self.version_actual()
+        resultado = {"version": version, "completo": True, "escala_facial": ESCALA_INT8, "altas": [], "bajas": []}
+
+        if since_version is None or not self._delta_disponible(since_version, version):
+            for row in conn.execute(_SELECT_CREDENCIALES):
+                entrada = self._entrada(row, incluir_faciales)
+                if entrada:
+                    resultado["altas"].append(entrada)
+            return resultado
+
+        resultado["completo"] = False
+        cambios = conn.execute(
+            "SELECT DISTINCT tabla, id_registro FROM RegistroCambios WHERE version > ? AND version <= ?",
+            (since_version, version),
+        ).fetchall()
+        ids_biometria = {c["id_registro"] for c in cambios if c["tabla"] == "Biometria"}
+        ids_usuario = [c["id_registro"] for c in cambios if c["tabla"] == "Usuarios"]
+
+        # Un cambio de usuario (p. ej. desactivación) afecta a todas sus credenciales
+        for lote in _lotes(ids_usuario):
+            marcas = ", ".join("?" for _ in lote)
+            for row in conn.execute(f"SELECT id_biometria FROM Biometria WHERE id_usuario IN ({marcas})", lote):
+                ids_biometria.add(row["id_biometria"])
+
+        vigentes = set()
+        for lote in _lotes(sorted(ids_biometria)):
+            marcas = ", ".join("?" for _ in lote)
+            for row in conn.execute(f"{_SELECT_CREDENCIALES} AND b.id_biometria IN ({marcas})", lote):
+                entrada = self._entrada(row, incluir_faciales)
+                if entrada:
+                    resultado["altas"].append(entrada)
+                    vigentes.add(entrada["id"])
+
+        resultado["bajas"] = sorted(ids_biometria - vigentes)
+        logger.debug("Delta de credenciales %s -> %s: %d altas, %d bajas",
+                     since_version, version, len(resultado["altas"]), len(resultado["bajas"]))
+        return resultado
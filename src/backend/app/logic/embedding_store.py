@@ -0,0 +1,295 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from backend.app.logic.embeddings import DIMENSION_FACIAL, ESCALA_INT8
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TQEMB001"
+_DTYPES = {"float32": 0, "int8": 1}
+_ALINEACION = 64
+_CAPACIDAD_MINIMA = 1024
+
+# Cabecera fija de 64 bytes al inicio del archivo
+_CABECERA = np.dtype([
+    ("magic", "S8"),
+    ("dim", "<u4"),
+    ("dtype", "<u4"),
+    ("obsoleto", "<u4"),
+    ("reservado", "<u4"),
+    ("capacidad", "<u8"),
+    ("cuenta", "<u8"),
+    ("borrados", "<u8"),
+    ("generacion", "<u8"),
+    ("watermark", "<u8"),
+])
+_TAM_CABECERA = _ALINEACION
+
+
+def _alinear(n: int) -> int:
+    return (n + _ALINEACION - 1) // _ALINEACION * _ALINEACION
+
+
+def _disposicion(capacidad: int, dim: int, dtype: np.dtype) -> tuple[int, int, int, int]:
+    """Offsets de ids, lápidas y matriz, y tamaño total del archivo."""
+    off_ids = _TAM_CABECERA
+    off_lapidas = off_ids + 8 * capacidad
+    off_matriz = _alinear(off_lapidas + capacidad)
+    return off_ids, off_lapidas, off_matriz, off_matriz + capacidad * dim * dtype.itemsize
+
+
+class AlmacenEmbeddings:
+    """
+    Archivo de embeddings faciales compartido por todos los workers.
+
+    Formato: cabecera fija de 64 bytes, array de ids (int64), array de lápidas
+    (uint8) y una matriz contigua `capacidad x dim` en float32 o int8 (escala
+    ESCALA_INT8). Los vectores se guardan normalizados.
+
+    Cada proceso lo mapea en solo lectura con `np.memmap`, así la caché de páginas
+    del sistema operativo se comparte entre workers y el arranque no decodifica
+    nada. Las escrituras (bajo un lock de archivo) añaden filas al final y
+    publican la nueva `cuenta` en la cabecera después de escribirlas; cuando no
+    queda capacidad o hay demasiadas lápidas se compacta en un archivo nuevo que
+    reemplaza al anterior, y el viejo se marca `obsoleto` para que los lectores
+    vuelvan a mapear.
+
+    Dentro del proceso, lecturas y escrituras se serializan con un lock: el
+    mapeo y el índice `_pos` se reemplazan al compactar o refrescar. Las
+    modificaciones añaden la fila nueva y publican la cuenta antes de marcar
+    la lápida de la anterior, así un id nunca desaparece para los lectores.
+    """
+
+    def __init__(self, path: str, dim: int = DIMENSION_FACIAL, dtype: str = "float32"):
+        if dtype not in _DTYPES:
+            raise ValueError(f"dtype no soportado: {dtype}")
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._cabecera = None
+        self._ids = None
+        self._lapidas = None
+        self._matriz = None
+        self._cuenta_vista = 0
+        self._pos: dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def existe(self) -> bool:
+        """True si el archivo existe y es compatible con la dimensión y el dtype."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < _TAM_CABECERA:
+            return False
+        cabecera = np.fromfile(self.path, dtype=_CABECERA, count=1)[0]
+        return (cabecera["magic"] == MAGIC and cabecera["dim"] == self.dim
+                and cabecera["dtype"] == _DTYPES[self.dtype.name])
+
+    def _mapear(self):
+        cabecera = np.memmap(self.path, dtype=_CABECERA, mode="r", shape=(1,))
+        capacidad = int(cabecera[0]["capacidad"])
+        off_ids, off_lapidas, off_matriz, _ = _disposicion(capacidad, self.dim, self.dtype)
+        self._cabecera = cabecera
+        if capacidad:
+            self._ids = np.memmap(self.path, dtype="<i8", mode="r", offset=off_ids, shape=(capacidad,))
+            self._lapidas = np.memmap(self.path, dtype=np.uint8, mode="r", offset=off_lapidas, shape=(capacidad,))
+            self._matriz = np.memmap(self.path, dtype=self.dtype, mode="r", offset=off_matriz, shape=(capacidad, self.dim))
+        else:
+            self._ids = np.empty(0, dtype="<i8")
+            self._lapidas = np.empty(0, dtype=np.uint8)
+            self._matriz = np.empty((0, self.dim), dtype=self.dtype)
+        self._cuenta_vista = 0
+        self._pos = {}
+
+    def _refrescar(self):
+        """Vuelve a mapear si el archivo fue compactado e indexa las filas nuevas."""
+        if self._cabecera is None or self._cabecera[0]["obsoleto"]:
+            self._mapear()
+        cuenta = int(self._cabecera[0]["cuenta"])
+        if cuenta > self._cuenta_vista:
+            inicio = self._cuenta_vista
+            vivas = np.flatnonzero(self._lapidas[inicio:cuenta] == 0) + inicio
+            self._pos.update(zip(self._ids[vivas].tolist(), vivas.tolist()))
+            self._cuenta_vista = cuenta
+
+    @property
+    def watermark(self) -> int:
+        """Versión de RegistroCambios que refleja el archivo."""
+        with self._lock:
+            self._refrescar()
+            return int(self._cabecera[0]["watermark"])
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refrescar()
+            return int(self._cabecera[0]["cuenta"] - self._cabecera[0]["borrados"])
+
+    def _posicion(self, id_biometria: int) -> int | None:
+        pos = self._pos.get(id_biometria)
+        if pos is not None and self._lapidas[pos]:
+            del self._pos[id_biometria]  # eliminado por otro worker
+            return None
+        return pos
+
+    def vectores(self, ids: list[int]) -> tuple[list[int], np.ndarray]:
+        """
+        Embeddings normalizados (float32) de los ids pedidos que estén en el archivo.
+
+        Returns:
+            tuple[list[int], np.ndarray]: ids encontrados y matriz `len(ids) x dim`.
+        """
+        with self._lock:
+            self._refrescar()
+            encontrados, posiciones = [], []
+            for id_biometria in ids:
+                pos = self._posicion(id_biometria)
+                if pos is not None:
+                    encontrados.append(id_biometria)
+                    posiciones.append(pos)
+            return encontrados, self._decodificar(self._matriz[posiciones])
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _bloqueo(self):
+        """Lock exclusivo entre procesos para los escritores."""
+        with open(self.path + ".lock", "a+b") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _codificar(self, matriz: np.ndarray) -> np.ndarray:
+        if self.dtype == np.int8:
+            return np.clip(np.rint(matriz * ESCALA_INT8), -ESCALA_INT8, ESCALA_INT8).astype(np.int8)
+        return matriz.astype(np.float32, copy=False)
+
+    def _decodificar(self, filas: np.ndarray) -> np.ndarray:
+        matriz = np.asarray(filas, dtype=np.float32)
+        if self.dtype == np.int8:
+            matriz /= ESCALA_INT8
+        return matriz
+
+    def _escribir_temporal(self, ids: np.ndarray, matriz: np.ndarray, watermark: int, generacion: int) -> str:
+        """Escribe un archivo nuevo con las filas dadas y devuelve su ruta temporal."""
+        n = len(ids)
+        capacidad = max(_CAPACIDAD_MINIMA, 2 * n)
+        off_ids, off_lapidas, off_matriz, total = _disposicion(capacidad, self.dim, self.dtype)
+        temporal = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as f:
+            f.truncate(total)
+        archivo = np.memmap(temporal, dtype=np.uint8, mode="r+")
+        archivo[:_TAM_CABECERA].view(_CABECERA)[0] = (
+            MAGIC, self.dim, _DTYPES[self.dtype.name], 0, 0, capacidad, n, 0, generacion, watermark
+        )
+        if n:
+            archivo[off_ids:off_ids + 8 * n].view("<i8")[:] = ids
+            fin = off_matriz + n * self.dim * self.dtype.itemsize
+            archivo[off_matriz:fin].view(self.dtype).reshape(n, self.dim)[:] = self._codificar(matriz)
+        archivo.flush()
+        del archivo
+        return temporal
+
+    def _instalar(self, temporal: str):
+        """Reemplaza el archivo actual y marca el anterior como obsoleto para los lectores."""
+        if os.path.exists(self.path):
+            viejo = np.memmap(self.path, dtype=_CABECERA, mode="r+", shape=(1,))
+            viejo[0]["obsoleto"] = 1
+            viejo.flush()
+            del viejo
+        os.replace(temporal, self.path)
+        self._cabecera = None
+        self._refrescar()
+
+    def reconstruir(self, ids: list[int], matriz: np.ndarray, watermark: int):
+        """Reemplaza el contenido completo del archivo (carga inicial o recuperación)."""
+        with self._lock, self._bloqueo():
+            generacion = 0
+            if self.existe():
+                self._refrescar()
+                generacion = int(self._cabecera[0]["generacion"]) + 1
+            ids = np.asarray(ids, dtype="<i8")
+            self._instalar(self._escribir_temporal(ids, matriz.reshape(len(ids), self.dim), watermark, generacion))
+        logger.info("AlmacenEmbeddings reconstruido: %d vectores (watermark=%d)", len(ids), watermark)
+
+    def aplicar(self, cambios: dict[int, np.ndarray | None], watermark: int) -> bool:
+        """
+        Aplica altas/modificaciones (vector normalizado) y bajas (None).
+
+        Si otro worker ya aplicó esa versión del log no se hace nada.
+
+        Returns:
+            bool: True si este proceso escribió los cambios.
+        """
+        with self._lock, self._bloqueo():
+            self._refrescar()
+            if int(self._cabecera[0]["watermark"]) >= watermark:
+                return False
+
+            escritura = np.memmap(self.path, dtype=np.uint8, mode="r+")
+            cabecera = escritura[:_TAM_CABECERA].view(_CABECERA)
+            capacidad = int(cabecera[0]["capacidad"])
+            off_ids, off_lapidas, off_matriz, _ = _disposicion(capacidad, self.dim, self.dtype)
+            lapidas = escritura[off_lapidas:off_lapidas + capacidad]
+
+            # Filas que sustituyen o eliminan los cambios (su lápida se marca al final)
+            viejas = {i: pos for i in cambios if (pos := self._posicion(i)) is not None}
+            nuevos = [(i, v) for i, v in cambios.items() if v is not None]
+            cuenta = int(cabecera[0]["cuenta"])
+            total_borrados = int(cabecera[0]["borrados"]) + len(viejas)
+
+            if cuenta + len(nuevos) > capacidad or total_borrados > max(cuenta // 2, _CAPACIDAD_MINIMA):
+                # Compactar: filas vivas + nuevas en un archivo nuevo (el viejo no se toca)
+                vivas_mascara = lapidas[:cuenta] == 0
+                vivas_mascara[list(viejas.values())] = False
+                vivas = np.flatnonzero(vivas_mascara)
+                ids = np.concatenate([self._ids[vivas], np.array([i for i, _ in nuevos], dtype="<i8")])
+                matriz = np.vstack([self._decodificar(self._matriz[vivas])] + [v.reshape(1, -1) for _, v in nuevos])
+                generacion = int(cabecera[0]["generacion"]) + 1
+                del escritura, cabecera, lapidas
+                self._instalar(self._escribir_temporal(ids, matriz, watermark, generacion))
+                logger.info("AlmacenEmbeddings compactado: %d vectores (generación %d)", len(ids), generacion)
+                return True
+
+            if nuevos:
+                k = len(nuevos)
+                ids = escritura[off_ids:off_ids + 8 * capacidad].view("<i8")
+                matriz = escritura[off_matriz:off_matriz + capacidad * self.dim * self.dtype.itemsize]
+                matriz = matriz.view(self.dtype).reshape(capacidad, self.dim)
+                ids[cuenta:cuenta + k] = [i for i, _ in nuevos]
+                lapidas[cuenta:cuenta + k] = 0
+                matriz[cuenta:cuenta + k] = self._codificar(np.vstack([v.reshape(1, -1) for _, v in nuevos]))
+                escritura.flush()
+                # La cuenta se publica después de escribir las filas
+                cabecera[0]["cuenta"] = cuenta + k
+                escritura.flush()
+            # Las filas anteriores se retiran cuando sus reemplazos ya son visibles
+            for id_biometria, pos in viejas.items():
+                lapidas[pos] = 1
+                del self._pos[id_biometria]
+            cabecera[0]["borrados"] = total_borrados
+            cabecera[0]["watermark"] = watermark
+            escritura.flush()
+            del escritura, cabecera, lapidas
+            self._refrescar()
+            return True
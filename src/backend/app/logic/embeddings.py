@@ -0,0 +1,61 @@
+import base64
+import hashlib
+import json
+import numpy as np
+
+# Dimensión de los embeddings faciales que envían los dispositivos
+DIMENSION_FACIAL = 128
+# Escala de cuantización int8 para embeddings normalizados (valores en [-1, 1])
+ESCALA_INT8 = 127
+
+
+def decodificar_embedding(vector: str) -> np.ndarray:
+    """
+    Decodifica un embedding facial almacenado o recibido como texto.
+
+    Args:
+        vector (str): Base64 del array float32 serializado o string JSON "[0.1, ...]".
+
+    Returns:
+        np.ndarray: Vector float32.
+
+    Raises:
+        ValueError: Si el texto no es Base64 ni JSON válido.
+    """
+    try:
+        padded = vector + '=' * (-len(vector) % 4)
+        return np.frombuffer(base64.b64decode(padded), dtype=np.float32)
+    except Exception:
+        try:
+            return np.array(json.loads(vector), dtype=np.float32)
+        except Exception as e:
+            raise ValueError(f"Vector facial no decodificable: {e}") from e
+
+
+def normalizar(embedding: np.ndarray) -> np.ndarray:
+    """Normaliza un embedding a norma L2 unitaria."""
+    return embedding / (np.linalg.norm(embedding) + 1e-8)
+
+
+def cuantizar_int8(embedding_norm: np.ndarray) -> bytes:
+    """Cuantiza un embedding normalizado a int8 (valor = q / ESCALA_INT8)."""
+    q = np.clip(np.rint(embedding_norm * ESCALA_INT8), -ESCALA_INT8, ESCALA_INT8)
+    return q.astype(np.int8).tobytes()
+
+
+def normalizar_filas(matriz: np.ndarray) -> np.ndarray:
+    """
+    Normaliza cada fila de una matriz float32 de embeddings.
+
+    El resultado es idéntico byte a byte a aplicar `normalizar` fila por fila
+    (`np.vecdot` calcula cada norma con el mismo producto punto que
+    `np.linalg.norm`; einsum o `(m * m).sum(1)` suman en otro orden), de modo
+    que el facial_hash coincide con el que calcula el verificador.
+    """
+    normas = np.sqrt(np.vecdot(matriz, matriz))
+    return matriz / (normas + 1e-8)[:, None]
+
+
+def hash_facial(embedding_norm: np.ndarray) -> str:
+    """Prefijo SHA-256 (8 hex) de un embedding normalizado, usado como facial_hash."""
+    return hashlib.sha256(embedding_norm.tobytes()).hexdigest()[:8]
@@ -0,0 +1,87 @@
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Tablas con triggers en RegistroCambios: solo estas pueden invalidarse entre workers
+TABLAS_CACHEABLES = frozenset({"Usuarios", "Biometria", "Torniquetes", "Operarios"})
+
+# Marca de "no está en caché" (None es un valor cacheable: registro inexistente)
+AUSENTE = object()
+
+
+class CacheEntidades:
+    """
+    Caché LRU de lecturas por tabla con contador de generación, compartida por
+    todos los controladores del proceso.
+
+    La generación de una tabla es la última `RegistroCambios.version` que la
+    tocó, así que es la misma en todos los workers y sirve directamente como
+    ETag. Cada entrada guarda la generación con la que se leyó y solo se sirve
+    mientras la tabla siga en esa generación. Las escrituras locales y las que
+    entrega el VigilanteCambios marcan la tabla como cambiada; la nueva
+    generación se lee (una consulta indexada) la próxima vez que se pida.
+    """
+
+    def __init__(self, max_entradas: int = 10000):
+        self.max_entradas = max_entradas
+        self._entradas: OrderedDict[tuple[str, Any], tuple[int, Any]] = OrderedDict()
+        self._generaciones: dict[str, int] = {}
+        # Invalidaciones por tabla: evita fijar una generación leída antes de una escritura
+        self._invalidaciones: dict[str | None, int] = {}
+        self._lock = threading.Lock()
+
+    def generacion(self, tabla: str, conn: sqlite3.Connection) -> int:
+        """Generación actual de la tabla (sin acceder a la base de datos si no cambió)."""
+        generacion = self._generaciones.get(tabla)
+        if generacion is None:
+            marca = (self._invalidaciones.get(tabla, 0), self._invalidaciones.get(None, 0))
+            generacion = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM RegistroCambios WHERE tabla = ?", (tabla,)
+            ).fetchone()[0]
+            if conn.in_transaction:
+                # Instantánea de lectura: puede ser anterior a la última invalidación, no se fija
+                return generacion
+            with self._lock:
+                if marca == (self._invalidaciones.get(tabla, 0), self._invalidaciones.get(None, 0)):
+                    self._generaciones[tabla] = generacion
+        return generacion
+
+    def fijar_generaciones(self, conn: sqlite3.Connection, tablas=TABLAS_CACHEABLES):
+        """
+        Lee y fija la generación de las tablas invalidadas. Se llama fuera de
+        una transacción, justo antes de abrir una instantánea de lectura:
+        dentro de ella la generación no se fija y cada petición volvería a
+        consultar RegistroCambios.
+        """
+        for tabla in tablas:
+            if tabla not in self._generaciones:
+                self.generacion(tabla, conn)
+
+    def invalidar(self, tabla: str | None = None):
+        """Marca la tabla (o todas) como cambiada; sus entradas dejan de servirse."""
+        with self._lock:
+            self._invalidaciones[tabla] = self._invalidaciones.get(tabla, 0) + 1
+            if tabla is None:
+                self._generaciones.clear()
+            else:
+                self._generaciones.pop(tabla, None)
+
+    def obtener(self, tabla: str, clave: Any, generacion: int) -> Any:
+        """Valor cacheado para esa generación, o AUSENTE."""
+        with self._lock:
+            entrada = self._entradas.get((tabla, clave))
+            if entrada is None or entrada[0] != generacion:
+                return AUSENTE
+            self._entradas.move_to_end((tabla, clave))
+            return entrada[1]
+
+    def guardar(self, tabla: str, clave: Any, generacion: int, valor: Any):
+        with self._lock:
+            self._entradas[(tabla, clave)] = (generacion, valor)
+            self._entradas.move_to_end((tabla, clave))
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
@@ -0,0 +1,75 @@
+import importlib
+import logging
+import cv2
+import numpy as np
+from backend.app.core.batching import PlanificadorLotes
+from backend.app.core.config import settings
+from backend.app.logic.embeddings import DIMENSION_FACIAL
+from backend.app.models.modelo_facial import ModeloFacial
+
+logger = logging.getLogger(__name__)
+
+
+class ModeloStub(ModeloFacial):
+    """
+    Modelo de referencia sin red neuronal, solo para pruebas: no distingue
+    personas y nunca se usa si no se configura explícitamente.
+
+    El "embedding" es la imagen en grises reducida a 16x8 y centrada; un frame
+    casi uniforme se considera sin rostro. Es determinista: el mismo frame
+    produce siempre el mismo vector.
+    """
+
+    def __init__(self, contraste_minimo: float = 2.0):
+        self.contraste_minimo = contraste_minimo
+
+    def extraer_lote(self, frames: list[np.ndarray]) -> list[np.ndarray | None]:
+        resultados = []
+        for frame in frames:
+            gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+            reducido = cv2.resize(gris, (16, DIMENSION_FACIAL // 16), interpolation=cv2.INTER_AREA).astype(np.float32)
+            if reducido.std() < self.contraste_minimo:
+                resultados.append(None)
+            else:
+                resultados.append((reducido - reducido.mean()).ravel())
+        return resultados
+
+    def detectar_rostros(self, gris: np.ndarray) -> list[tuple[int, int, int, int]]:
+        # Todo el frame es "el rostro" salvo que sea casi uniforme
+        if gris.std() < self.contraste_minimo:
+            return []
+        return [(0, 0, gris.shape[1], gris.shape[0])]
+
+
+def cargar_modelo(ruta: str | None) -> ModeloFacial | None:
+    """Instancia el modelo "modulo:Clase" configurado, o None si no hay ninguno."""
+    if not ruta:
+        logger.warning("MODELO_FACIAL no configurado: /acceso/camara/frame responderá 503")
+        return None
+    modulo, _, nombre = ruta.partition(":")
+    return getattr(importlib.import_module(modulo), nombre)()
+
+
+class ExtractorLotes(PlanificadorLotes):
+    """
+    Extracción de embeddings con micro-lotes dinámicos: los frames de
+    peticiones concurrentes se agrupan (hasta `max_lote` o `espera` segundos)
+    y el modelo se ejecuta una sola vez por lote.
+    """
+
+    def __init__(self, modelo: ModeloFacial, max_lote: int = 16, espera: float = 0.005):
+        super().__init__(modelo.extraer_lote, max_lote, espera, nombre="extractor-facial")
+        self.modelo = modelo
+
+    async def extraer(self, frame: np.ndarray) -> np.ndarray | None:
+        """Embedding del rostro del frame BGR, o None si no se detecta ninguno."""
+        return await self.resolver(frame)
+
+
+# Instancia única por proceso; None si no hay modelo configurado
+_modelo = cargar_modelo(settings.MODELO_FACIAL)
+extractor_facial = None if _modelo is None else ExtractorLotes(
+    _modelo,
+    max_lote=settings.EXTRACCION_LOTE,
+    espera=settings.EXTRACCION_ESPERA_MS / 1000,
+)
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from typing import Callable
+import cv2
+import numpy as np
+from backend.app.core.config import settings
+from backend.app.logic.face_embedding import extractor_facial
+from backend.app.models.access import MotivoRechazo
+
+# detector(gris reducido) -> cajas (x, y, ancho, alto); None = sin detector rápido
+DetectorRostros = Callable[[np.ndarray], list[tuple[int, int, int, int]] | None]
+
+
+@dataclass
+class ResultadoCalidad:
+    motivo: MotivoRechazo | None
+    brillo: float
+    nitidez: float | None = None
+    rostro: float | None = None  # Alto del rostro mayor / alto del frame
+
+    @property
+    def apta(self) -> bool:
+        return self.motivo is None
+
+
+class EvaluadorCalidad:
+    """
+    Filtro de calidad de las capturas, previo al embedding y la verificación.
+
+    Trabaja sobre el frame en grises reducido a `lado` píxeles de ancho, así
+    que cuesta una fracción de la extracción del embedding. Comprueba, en este
+    orden y de la más barata a la más cara:
+    - exposición: brillo medio y proporción de píxeles negros/quemados del histograma;
+    - tamaño del rostro, si hay detector;
+    - nitidez: varianza del Laplaciano (sobre el rostro si se detectó).
+    """
+
+    def __init__(
+        self,
+        detector: DetectorRostros | None = None,
+        lado: int = 160,
+        nitidez_min: float = 30.0,
+        brillo_min: float = 40.0,
+        brillo_max: float = 215.0,
+        recorte_max: float = 0.5,
+        rostro_min: float = 0.2,
+    ):
+        self.detector = detector
+        self.lado = lado
+        self.nitidez_min = nitidez_min
+        self.brillo_min = brillo_min
+        self.brillo_max = brillo_max
+        self.recorte_max = recorte_max
+        self.rostro_min = rostro_min
+
+    def _reducir(self, frame: np.ndarray) -> np.ndarray:
+        gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if gris.shape[1] > self.lado:
+            alto = max(1, round(gris.shape[0] * self.lado / gris.shape[1]))
+            gris = cv2.resize(gris, (self.lado, alto), interpolation=cv2.INTER_AREA)
+        return gris
+
+    def evaluar(self, frame: np.ndarray) -> ResultadoCalidad:
+        """Evalúa un frame BGR o en grises de cualquier tamaño."""
+        gris = self._reducir(frame)
+
+        histograma = cv2.calcHist([gris], [0], None, [256], [0, 256]).ravel() / gris.size
+        brillo = float(histograma @ np.arange(256))
+        if brillo < self.brillo_min or histograma[:16].sum() > self.recorte_max:
+            return ResultadoCalidad(MotivoRechazo.subexpuesta, brillo)
+        if brillo > self.brillo_max or histograma[240:].sum() > self.recorte_max:
+            return ResultadoCalidad(MotivoRechazo.sobreexpuesta, brillo)
+
+        region = gris
+        rostro = None
+        cajas = self.detector(gris) if self.detector is not None else None
+        if cajas is not None:
+            if not cajas:
+                return ResultadoCalidad(MotivoRechazo.sin_rostro, brillo)
+            x, y, ancho, alto = max(cajas, key=lambda caja: caja[2] * caja[3])
+            rostro = alto / gris.shape[0]
+            if rostro < self.rostro_min:
+                return ResultadoCalidad(MotivoRechazo.rostro_pequeno, brillo, rostro=rostro)
+            region = gris[y:y + alto, x:x + ancho]
+
+        nitidez = float(cv2.Laplacian(region, cv2.CV_64F).var())
+        if nitidez < self.nitidez_min:
+            return ResultadoCalidad(MotivoRechazo.desenfocada, brillo, nitidez, rostro)
+        return ResultadoCalidad(None, brillo, nitidez, rostro)
+
+    def evaluar_jpeg(self, datos: bytes) -> ResultadoCalidad | None:
+        """
+        Evalúa un JPEG decodificándolo directamente reducido y en grises (el
+        decodificador omite el trabajo de la resolución completa).
+
+        Returns:
+            ResultadoCalidad | None: None si los datos no son una imagen válida.
+        """
+        gris = cv2.imdecode(np.frombuffer(datos, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_2)
+        if gris is None:
+            return None
+        return self.evaluar(gris)
+
+
+# Instancia única por proceso: usa el detector rápido del modelo facial configurado
+evaluador_calidad = EvaluadorCalidad(
+    detector=extractor_facial.modelo.detectar_rostros if extractor_facial is not None else None,
+    lado=settings.CALIDAD_LADO,
+    nitidez_min=settings.CALIDAD_NITIDEZ_MIN,
+    brillo_min=settings.CALIDAD_BRILLO_MIN,
+    brillo_max=settings.CALIDAD_BRILLO_MAX,
+    rostro_min=settings.CALIDAD_ROSTRO_MIN,
+)
@@ -0,0 +1,179 @@
+import logging
+import os
+import threading
+import numpy as np
+from backend.app.core.config import settings
+from backend.app.logic.change_log import VigilanteCambios
+from backend.app.logic.embedding_store import AlmacenEmbeddings
+from backend.app.logic.embeddings import DIMENSION_FACIAL, decodificar_embedding, normalizar
+from backend.app.logic.universal_controller_instance import vigilante_cambios
+from backend.app.logic.universal_controller_server import DIR_DATA
+
+logger = logging.getLogger(__name__)
+
+
+class IndiceBiometria:
+    """
+    Caché en memoria de la tabla Biometria para los verificadores.
+
+    Mantiene el mapa rfid_tag -> id_usuario, los ids con embedding facial
+    agrupados por facial_hash y los templates de huella. Los embeddings en sí
+    viven en el AlmacenEmbeddings mapeado en memoria, compartido entre workers.
+    Se carga una sola vez y después solo aplica las filas que cambian,
+    entregadas por el VigilanteCambios del proceso.
+    """
+
+    def __init__(self, vigilante: VigilanteCambios, almacen: AlmacenEmbeddings):
+        self.vigilante = vigilante
+        self.almacen = almacen
+        self._lock = threading.RLock()
+        self._cargado = False
+        self._filas: dict[int, dict] = {}
+        self._por_rfid: dict[str, int] = {}
+        self._por_hash: dict[str, set[int]] = {}
+
+    def _asegurar_cargado(self):
+        if not self._cargado:
+            with self.vigilante.lock, self._lock:
+                if not self._cargado:
+                    self.vigilante.suscribir("Biometria", self.aplicar_cambios)
+                    self._cargar()
+                    self._cargado = True
+
+    def _cargar(self, reconstruir: bool = False):
+        """Carga los metadatos desde la base de datos y pone al día el almacén de embeddings."""
+        with self.vigilante.lock, self._lock:
+            conn = self.vigilante.conexion()
+            version = self.vigilante.watermark
+            if reconstruir or not self.almacen.existe() or self.almacen.watermark > version:
+                self._reconstruir_almacen(conn, version)
+            elif self.almacen.watermark < version:
+                # Cambios confirmados mientras ningún worker estaba en marcha
+                pendientes = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT id_registro FROM RegistroCambios WHERE tabla = 'Biometria' AND version > ?",
+                    (self.almacen.watermark,),
+                )]
+                filas = self.vigilante.leer_filas("Biometria", pendientes)
+                self.almacen.aplicar({i: self._embedding(f) for i, f in filas.items()}, version)
+
+            self._filas.clear()
+            self._por_rfid.clear()
+            self._por_hash.clear()
+            for row in conn.execute(
+                "SELECT id_biometria, id_usuario, facial_hash, template_huella, rfid_tag FROM Biometria"
+            ):
+                self._agregar(dict(row))
+        logger.info("IndiceBiometria cargado: %d registros, %d embeddings", len(self._filas), len(self.almacen))
+
+    def _reconstruir_almacen(self, conn, version: int):
+        ids, vectores = [], []
+        for row in conn.execute(
+            "SELECT id_biometria, vector_facial, facial_hash FROM Biometria WHERE vector_facial IS NOT NULL"
+        ):
+            embedding = self._embedding(dict(row))
+            if embedding is not None:
+                ids.append(row["id_biometria"])
+                vectores.append(embedding)
+        matriz = np.vstack(vectores) if vectores else np.empty((0, DIMENSION_FACIAL), dtype=np.float32)
+        self.almacen.reconstruir(ids, matriz, version)
+
+    @staticmethod
+    def _embedding(fila: dict | None) -> np.ndarray | None:
+        """Embedding normalizado de la fila, o None si no tiene uno válido."""
+        if not fila or not fila.get("vector_facial") or not fila.get("facial_hash"):
+            return None
+        try:
+            embedding = decodificar_embedding(fila["vector_facial"])
+        except ValueError as e:
+            logger.warning("Biometria %s con vector_facial inválido: %s", fila["id_biometria"], e)
+            return None
+        if embedding.shape[0] != DIMENSION_FACIAL:
+            logger.warning("Biometria %s con embedding de dimensión %d", fila["id_biometria"], embedding.shape[0])
+            return None
+        return normalizar(embedding)
+
+    def _agregar(self, fila: dict):
+        fila.pop("vector_facial", None)  # el vector vive en el almacén
+        fila.pop("huella_hash", None)
+        fila.pop("fecha_actualizacion", None)
+        id_biometria = fila["id_biometria"]
+        self._filas[id_biometria] = fila
+        if fila.get("rfid_tag"):
+            self._por_rfid[fila["rfid_tag"]] = fila["id_usuario"]
+        if fila.get("facial_hash"):
+            self._por_hash.setdefault(fila["facial_hash"][:8].lower(), set()).add(id_biometria)
+
+    def _quitar(self, id_biometria: int):
+        fila = self._filas.pop(id_biometria, None)
+        if fila is None:
+            return
+        tag = fila.get("rfid_tag")
+        if tag and self._por_rfid.get(tag) == fila["id_usuario"]:
+            del self._por_rfid[tag]
+        if fila.get("facial_hash"):
+            ids = self._por_hash.get(fila["facial_hash"][:8].lower())
+            if ids:
+                ids.discard(id_biometria)
+
+    def aplicar_cambios(self, filas: dict[int, dict | None] | None):
+        """Aplica las filas cambiadas de Biometria (None = recarga completa)."""
+        if filas is None:
+            self._cargar(reconstruir=True)
+            return
+        with self._lock:
+            # Solo un worker escribe cada versión en el almacén; el resto la encuentra aplicada
+            self.almacen.aplicar({i: self._embedding(f) for i, f in filas.items()}, self.vigilante.watermark)
+            for id_biometria, fila in filas.items():
+                self._quitar(id_biometria)
+                if fila is not None:
+                    self._agregar(dict(fila))
+
+    def usuario_por_rfid(self, rfid_tag: str) -> int | None:
+        """id_usuario asociado al tag RFID, o None."""
+        self._asegurar_cargado()
+        return self._por_rfid.get(rfid_tag)
+
+    def candidatos_faciales(self, hash_prefix: str) -> list[tuple[int, np.ndarray]]:
+        """(id_usuario, embedding normalizado) de los registros con ese facial_hash."""
+        self._asegurar_cargado()
+        with self._lock:
+            ids, matriz = self.almacen.vectores(list(self._por_hash.get(hash_prefix[:8].lower(), ())))
+            return [(self._filas[i]["id_usuario"], matriz[k]) for k, i in enumerate(ids)]
+
+    def galeria_facial(self, hash_prefixes: set[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Candidatos de varios facial_hash a la vez, para comparar un lote de sondas.
+
+        Returns:
+            tuple: id_usuario (N), embeddings normalizados (N x 128) y prefijo
+            de facial_hash de cada fila (N).
+        """
+        self._asegurar_cargado()
+        with self._lock:
+            pedidos = [i for h in hash_prefixes for i in self._por_hash.get(h[:8].lower(), ())]
+            ids, matriz = self.almacen.vectores(pedidos)
+            usuarios = np.fromiter((self._filas[i]["id_usuario"] for i in ids), dtype=np.int64, count=len(ids))
+            hashes = np.array([self._filas[i]["facial_hash"][:8].lower() for i in ids], dtype="U8")
+            return usuarios, matriz, hashes
+
+    def galeria_completa(self) -> tuple[np.ndarray, np.ndarray]:
+        """id_usuario (N) y embeddings normalizados (N x 128) de todos los registros faciales."""
+        self._asegurar_cargado()
+        with self._lock:
+            ids, matriz = self.almacen.vectores([i for ids in self._por_hash.values() for i in ids])
+            usuarios = np.fromiter((self._filas[i]["id_usuario"] for i in ids), dtype=np.int64, count=len(ids))
+            return usuarios, matriz
+
+    def templates_huella(self) -> list[tuple[int, str]]:
+        """(id_usuario, template_huella) de todos los registros con huella."""
+        self._asegurar_cargado()
+        with self._lock:
+            return [(f["id_usuario"], f["template_huella"]) for f in self._filas.values() if f.get("template_huella")]
+
+
+# Instancia única por proceso; el archivo de embeddings es compartido entre procesos
+indice_biometria = IndiceBiometria(
+    vigilante_cambios,
+    AlmacenEmbeddings(settings.EMBEDDINGS_FILE or os.path.join(DIR_DATA, "embeddings.bin"),
+                      dtype=settings.EMBEDDINGS_DTYPE),
+)
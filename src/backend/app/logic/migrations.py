@@ -0,0 +1,280 @@
+import logging
+import sqlite3
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Tablas que crea script_db.py; las migraciones se aplican sobre ese esquema base
+TABLAS_BASE = ("Usuarios", "Biometria", "Operarios", "Torniquetes", "Registros")
+
+
+def _crear_triggers_cambios(conn: sqlite3.Connection, tabla: str, pk: str):
+    """Registra en RegistroCambios cada INSERT/UPDATE/DELETE de la tabla."""
+    for evento, op, fila in (("INSERT", "I", "NEW"), ("UPDATE", "U", "NEW"), ("DELETE", "D", "OLD")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla}_{op}
+            AFTER {evento} ON {tabla}
+            BEGIN
+                INSERT INTO RegistroCambios (tabla, id_registro, operacion)
+                VALUES ('{tabla}', {fila}.{pk}, '{op}');
+            END
+        """)
+
+
+def _m001_registro_cambios(conn: sqlite3.Connection):
+    """Log de cambios versionado para las credenciales (Biometria y Usuarios)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS RegistroCambios (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabla TEXT NOT NULL,
+            id_registro INTEGER NOT NULL,
+            operacion TEXT NOT NULL,
+            fecha DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _crear_triggers_cambios(conn, "Biometria", "id_biometria")
+    _crear_triggers_cambios(conn, "Usuarios", "id_usuario")
+
+
+def _m002_cambios_entidades(conn: sqlite3.Connection):
+    """Log de cambios para las demás entidades que cachean los workers."""
+    _crear_triggers_cambios(conn, "Torniquetes", "id_torniquete")
+    _crear_triggers_cambios(conn, "Operarios", "id_operario")
+
+
+# Expresiones del efecto de un registro sobre los contadores de tráfico
+_HORA = "strftime('%Y-%m-%d %H:00', {f}.fecha_hora)"
+_ENTRADA = "(COALESCE({f}.resultado, 0) = 1 AND lower(trim(COALESCE({f}.tipo_acceso, ''))) = 'entrada')"
+_SALIDA = "(COALESCE({f}.resultado, 0) = 1 AND lower(trim(COALESCE({f}.tipo_acceso, ''))) = 'salida')"
+_DENEGADO = "(COALESCE({f}.resultado, 0) = 0)"
+
+
+def _sql_acumular_trafico(fila: str, signo: str) -> str:
+    """Sentencias que suman (signo '+') o restan ('-') un registro a los contadores."""
+    hora, entrada, salida, denegado = (e.format(f=fila) for e in (_HORA, _ENTRADA, _SALIDA, _DENEGADO))
+    return f"""
+        INSERT INTO TraficoHorario (id_torniquete, hora, entradas, salidas, denegados)
+        SELECT {fila}.id_torniquete, {hora}, {signo}{entrada}, {signo}{salida}, {signo}{denegado}
+        WHERE {hora} IS NOT NULL AND {fila}.id_torniquete IS NOT NULL
+        ON CONFLICT (id_torniquete, hora) DO UPDATE SET
+            entradas = entradas + excluded.entradas,
+            salidas = salidas + excluded.salidas,
+            denegados = denegados + excluded.denegados;
+        INSERT INTO Ocupacion (id, dentro, actualizado)
+        SELECT 1, {signo}({entrada} - {salida}), CURRENT_TIMESTAMP
+        WHERE {entrada} OR {salida}
+        ON CONFLICT (id) DO UPDATE SET
+            dentro = dentro + excluded.dentro,
+            actualizado = excluded.actualizado;
+    """
+
+
+def _m003_rollups_trafico(conn: sqlite3.Connection):
+    """Contadores de tráfico por torniquete y hora y ocupación actual, mantenidos por triggers."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS TraficoHorario (
+            id_torniquete INTEGER NOT NULL,
+            hora TEXT NOT NULL,
+            entradas INTEGER NOT NULL DEFAULT 0,
+            salidas INTEGER NOT NULL DEFAULT 0,
+            denegados INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (id_torniquete, hora)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trafico_hora ON TraficoHorario (hora)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Ocupacion (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            dentro INTEGER NOT NULL DEFAULT 0,
+            actualizado DATETIME
+        )
+    """)
+    _crear_triggers_trafico(conn)
+
+    # Carga inicial desde el histórico existente (una única pasada)
+    hora, entrada, salida, denegado = (e.format(f="r") for e in (_HORA, _ENTRADA, _SALIDA, _DENEGADO))
+    conn.execute(f"""
+        INSERT INTO TraficoHorario (id_torniquete, hora, entradas, salidas, denegados)
+        SELECT r.id_torniquete, {hora}, SUM({entrada}), SUM({salida}), SUM({denegado})
+        FROM Registros r
+        WHERE {hora} IS NOT NULL AND r.id_torniquete IS NOT NULL
+        GROUP BY r.id_torniquete, {hora}
+    """)
+    conn.execute(f"""
+        INSERT INTO Ocupacion (id, dentro, actualizado)
+        SELECT 1, COALESCE(SUM({entrada}) - SUM({salida}), 0), CURRENT_TIMESTAMP FROM Registros r
+    """)
+
+
+def _crear_triggers_trafico(conn: sqlite3.Connection):
+    """Triggers de Registros que mantienen TraficoHorario y Ocupacion."""
+    for evento, cuerpo in (
+        ("INSERT", _sql_acumular_trafico("NEW", "+")),
+        ("DELETE", _sql_acumular_trafico("OLD", "-")),
+        ("UPDATE", _sql_acumular_trafico("OLD", "-") + _sql_acumular_trafico("NEW", "+")),
+    ):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_trafico_{evento.lower()}
+            AFTER {evento} ON Registros
+            BEGIN
+                {cuerpo}
+            END
+        """)
+
+
+def _m004_indice_cambios_tabla(conn: sqlite3.Connection):
+    """Índice de RegistroCambios por tabla para leer la generación de cada tabla."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cambios_tabla ON RegistroCambios (tabla, version)")
+
+
+def _m005_archivo_mensual(conn: sqlite3.Connection):
+    """Marca de archivado en curso: mover filas al archivo mensual no descuenta el tráfico."""
+    conn.execute("CREATE TABLE IF NOT EXISTS ArchivadoEnCurso (id INTEGER PRIMARY KEY CHECK (id = 1))")
+    conn.execute("DROP TRIGGER IF EXISTS trg_trafico_delete")
+    conn.execute(f"""
+        CREATE TRIGGER trg_trafico_delete
+        AFTER DELETE ON Registros
+        WHEN NOT EXISTS (SELECT 1 FROM ArchivadoEnCurso)
+        BEGIN
+            {_sql_acumular_trafico("OLD", "-")}
+        END
+    """)
+
+
+def _crear_indice_fts(conn: sqlite3.Connection, tabla: str, pk: str, columnas: tuple[str, ...]):
+    """
+    Índice FTS5 `{tabla}FTS` con contenido externo (no duplica el texto) y triggers
+    que lo sincronizan. Solo se indexan filas con texto en alguna columna: la
+    mayoría de Registros no tiene observaciones y no debe pagar la inserción.
+    """
+    fts = f"{tabla}FTS"
+    lista = ", ".join(columnas)
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {lista}, content='{tabla}', content_rowid='{pk}',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+
+    def con_texto(fila: str) -> str:
+        return " || ".join(f"COALESCE({fila}.{c}, '')" for c in columnas) + " <> ''"
+
+    def valores(fila: str) -> str:
+        return ", ".join(f"{fila}.{c}" for c in columnas)
+
+    borrar = f"INSERT INTO {fts} ({fts}, rowid, {lista}) SELECT 'delete', OLD.{pk}, {valores('OLD')}"
+    insertar = f"INSERT INTO {fts} (rowid, {lista}) SELECT NEW.{pk}, {valores('NEW')}"
+    # Un solo trigger de UPDATE: el borrado del texto anterior debe ir antes de insertar el nuevo
+    for nombre, evento, cuerpo in (
+        ("i", "INSERT", f"{insertar} WHERE {con_texto('NEW')};"),
+        ("d", "DELETE", f"{borrar} WHERE {con_texto('OLD')};"),
+        ("u", f"UPDATE OF {pk}, {lista}",
+         f"{borrar} WHERE {con_texto('OLD')}; {insertar} WHERE {con_texto('NEW')};"),
+    ):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_fts_{tabla}_{nombre}
+            AFTER {evento} ON {tabla}
+            BEGIN
+                {cuerpo}
+            END
+        """)
+    conn.execute(f"""
+        INSERT INTO {fts} (rowid, {lista})
+        SELECT {pk}, {lista} FROM {tabla} WHERE {con_texto(tabla)}
+    """)
+
+
+def _m006_busqueda_fts(conn: sqlite3.Connection):
+    """Búsqueda de texto completo (FTS5) en Usuarios y en las observaciones de Registros."""
+    _crear_indice_fts(conn, "Usuarios", "id_usuario", ("nombre_completo", "cargo"))
+    _crear_indice_fts(conn, "Registros", "id_registro", ("observaciones",))
+
+
+# Índices de las consultas frecuentes: (tabla, nombre, columnas). Los compuestos cubren
+# las búsquedas por credencial (devuelven id_usuario sin leer la fila) y los historiales
+# de un usuario o torniquete ordenados por fecha.
+INDICES = (
+    ("Biometria", "idx_biometria_rfid", "rfid_tag, id_usuario"),
+    ("Biometria", "idx_biometria_facial_hash", "facial_hash, id_usuario"),
+    ("Biometria", "idx_biometria_usuario", "id_usuario"),
+    ("Registros", "idx_registros_fecha", "fecha_hora"),
+    ("Registros", "idx_registros_usuario_fecha", "id_usuario, fecha_hora"),
+    ("Registros", "idx_registros_torniquete_fecha", "id_torniquete, fecha_hora"),
+    ("RegistrosInvalidos", "idx_invalidos_fecha", "fecha_invalido"),
+    ("RegistrosInvalidos", "idx_invalidos_registro", "id_registro"),
+    ("HistorialEstadoUsuario", "idx_historial_fecha", "fecha_cambio"),
+    ("HistorialEstadoUsuario", "idx_historial_usuario_fecha", "id_usuario, fecha_cambio"),
+)
+
+
+def crear_indices(conn: sqlite3.Connection, tabla: str):
+    """Crea (si faltan) los índices de INDICES que corresponden a la tabla."""
+    for tabla_indice, nombre, columnas in INDICES:
+        if tabla_indice == tabla:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})")
+
+
+def _m007_indices_consultas(conn: sqlite3.Connection):
+    """Índices de credenciales (rfid_tag, facial_hash, id_usuario) y de historiales por fecha."""
+    existentes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    # Fuera de TABLAS_BASE solo se exigen las tablas de credenciales y Registros: si
+    # RegistrosInvalidos o HistorialEstadoUsuario faltan aún, UniversalController crea
+    # sus índices junto con la tabla (_ensure_table_exists)
+    for tabla in {tabla for tabla, _, _ in INDICES} & existentes:
+        crear_indices(conn, tabla)
+
+
+def _m008_trafico_sin_torniquete(conn: sqlite3.Connection):
+    """Los registros sin torniquete cuentan en la ocupación pero no en TraficoHorario."""
+    for evento in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_trafico_{evento}")
+    _crear_triggers_trafico(conn)
+    _m005_archivo_mensual(conn)  # Vuelve a poner la condición de archivado en el de DELETE
+
+
+# (número, función) en orden; el número aplicado se guarda en PRAGMA user_version
+MIGRACIONES: list[tuple[int, Callable[[sqlite3.Connection], None]]] = [
+    (1, _m001_registro_cambios),
+    (2, _m002_cambios_entidades),
+    (3, _m003_rollups_trafico),
+    (4, _m004_indice_cambios_tabla),
+    (5, _m005_archivo_mensual),
+    (6, _m006_busqueda_fts),
+    (7, _m007_indices_consultas),
+    (8, _m008_trafico_sin_torniquete),
+]
+
+
+def aplicar_migraciones(conn: sqlite3.Connection) -> int:
+    """
+    Aplica las migraciones pendientes sobre la base de datos.
+
+    Cada migración corre en su propia transacción `BEGIN IMMEDIATE`, de modo que
+    varios procesos arrancando a la vez no la apliquen dos veces.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base de datos.
+
+    Returns:
+        int: Versión de esquema resultante.
+    """
+    existentes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    if not all(tabla in existentes for tabla in TABLAS_BASE):
+        logger.warning("Esquema base incompleto; ejecutar script_db.py antes de migrar.")
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    for numero, migracion in MIGRACIONES:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= numero:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Otro proceso pudo aplicarla mientras esperábamos el lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] < numero:
+                migracion(conn)
+                conn.execute(f"PRAGMA user_version = {numero}")
+                logger.info("Migración %d aplicada: %s", numero, migracion.__doc__)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return conn.execute("PRAGMA user_version").fetchone()[0]
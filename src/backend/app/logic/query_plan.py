@@ -0,0 +1,62 @@
+from typing import Any, Sequence
+
+
+class PlanConsulta:
+    """
+    SQL y mapeo de filas precompilados para un modelo.
+
+    Se construye una vez por clase de modelo: el orden de columnas, la clave
+    primaria y las sentencias se calculan aquí en lugar de en cada llamada.
+    Las filas se leen como tuplas y se convierten en modelo llamando
+    directamente al validador de pydantic con un dict ya ordenado; en
+    pydantic 2 validar tipos simples es más barato que `model_construct`, y
+    conserva la conversión de los BOOL que SQLite guarda como 0/1.
+
+    `sql_json` devuelve la tabla entera ya serializada como un array JSON de
+    objetos (json_group_array), para listados que se envían sin pasar por
+    dicts de Python.
+    """
+
+    __slots__ = (
+        "modelo", "tabla", "columnas", "clave", "sql_crear", "sql_todos", "sql_por_id", "sql_json", "_validar",
+    )
+
+    def __init__(self, modelo: Any):
+        campos = modelo.get_fields()
+        self.modelo = modelo
+        self.tabla = modelo.__entity_name__
+        self.columnas = tuple(campos)
+        self.clave = self.columnas[0]
+        lista = ", ".join(self.columnas)
+        self.sql_crear = f"CREATE TABLE IF NOT EXISTS {self.tabla} ({', '.join(f'{k} {v}' for k, v in campos.items())})"
+        self.sql_todos = f"SELECT * FROM {self.tabla}"
+        self.sql_por_id = f"SELECT {lista} FROM {self.tabla} WHERE {self.clave} = ?"
+        pares = ", ".join(f"'{c}', {c}" for c in self.columnas)
+        self.sql_json = f"SELECT json_group_array(json_object({pares})) FROM {self.tabla}"
+        self._validar = modelo.__pydantic_validator__.validate_python
+
+    def a_modelo(self, fila: Sequence[Any]) -> Any:
+        """Modelo a partir de una tupla en el orden de `columnas`."""
+        return self._validar(dict(zip(self.columnas, fila)))
+
+    def sql_columnas(self, columnas: Sequence[str] | None) -> str:
+        """SELECT de las columnas pedidas (solo columnas del modelo, nunca texto libre)."""
+        if not columnas:
+            return f"SELECT {', '.join(self.columnas)} FROM {self.tabla}"
+        desconocidas = set(columnas) - set(self.columnas)
+        if desconocidas:
+            raise ValueError(f"Columnas desconocidas en '{self.tabla}': {', '.join(sorted(desconocidas))}")
+        return f"SELECT {', '.join(columnas)} FROM {self.tabla}"
+
+
+# Planes por clase de modelo, compartidos por todos los controladores del proceso
+_planes: dict[type, PlanConsulta] = {}
+
+
+def plan_de(modelo: Any) -> PlanConsulta:
+    """Plan del modelo (clase o instancia), compilado la primera vez."""
+    clase = modelo if isinstance(modelo, type) else type(modelo)
+    plan = _planes.get(clase)
+    if plan is None:
+        plan = _planes[clase] = PlanConsulta(clase)
+    return plan
@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Formato de la clave horaria de TraficoHorario (ver migración 3)
+FORMATO_HORA = "%Y-%m-%d %H:00"
+
+
+def clave_hora(fecha: datetime) -> str:
+    """Clave horaria de TraficoHorario para una fecha."""
+    return fecha.strftime(FORMATO_HORA)
+
+
+class TraficoDashboard:
+    """
+    Lecturas del tablero de tráfico sobre los contadores materializados.
+
+    `TraficoHorario` y `Ocupacion` los mantienen los triggers de `Registros`
+    al confirmar cada evento, así que estas consultas leen solo las filas del
+    rango pedido (por clave primaria) y nunca recorren el histórico.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    def ocupacion(self) -> dict:
+        """
+        Personas dentro del edificio según entradas y salidas autorizadas.
+
+        Returns:
+            dict: {"dentro", "actualizado"}; "dentro" no baja de 0 aunque haya
+            más salidas que entradas registradas.
+        """
+        row = self.controller.conn.execute("SELECT dentro, actualizado FROM Ocupacion WHERE id = 1").fetchone()
+        if row is None:
+            return {"dentro": 0, "actualizado": None}
+        return {"dentro": max(row["dentro"], 0), "actualizado": row["actualizado"]}
+
+    def por_hora(
+        self, desde: datetime, hasta: datetime, id_torniquete: int | None = None
+    ) -> list[dict]:
+        """
+        Entradas, salidas y denegados por torniquete y hora en [desde, hasta).
+
+        Args:
+            desde (datetime): Inicio del rango.
+            hasta (datetime): Fin del rango (excluido).
+            id_torniquete (int | None): Limita a un torniquete.
+
+        Returns:
+            list[dict]: Filas {"id_torniquete", "hora", "entradas", "salidas", "denegados"}.
+        """
+        sql = "SELECT id_torniquete, hora, entradas, salidas, denegados FROM TraficoHorario WHERE hora >= ? AND hora < ?"
+        params: list = [clave_hora(desde), clave_hora(hasta)]
+        if id_torniquete is not None:
+            sql += " AND id_torniquete = ?"
+            params.append(id_torniquete)
+        sql += " ORDER BY hora, id_torniquete"
+        return [dict(row) for row in self.controller.conn.execute(sql, params)]
+
+    def totales(self, desde: datetime, hasta: datetime) -> list[dict]:
+        """Totales por torniquete en [desde, hasta)."""
+        sql = """
+            SELECT id_torniquete, SUM(entradas) AS entradas, SUM(salidas) AS salidas, SUM(denegados) AS denegados
+            FROM TraficoHorario WHERE hora >= ? AND hora < ?
+            GROUP BY id_torniquete ORDER BY id_torniquete
+        """
+        return [dict(row) for row in self.controller.conn.execute(sql, (clave_hora(desde), clave_hora(hasta)))]
+
+
+def rango_por_defecto(horas: int = 24) -> tuple[datetime, datetime]:
+    """Últimas `horas` horas completas más la hora en curso."""
+    hasta = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return hasta - timedelta(hours=horas), hasta
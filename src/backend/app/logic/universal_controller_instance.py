@@ -1,4 +1,29 @@
-from backend.app.logic.universal_controller_server import UniversalController
+from backend.app.core.config import settings
+from backend.app.core.lanes import controlador_del_hilo
+from backend.app.logic.universal_controller_server import UniversalController, DB_FILE
+from backend.app.logic.change_log import VigilanteCambios
+from backend.app.logic.entity_cache import TABLAS_CACHEABLES
+
+class ControladorPorCarril:
+    """
+    Controlador global de la app. Dentro de un hilo de carril delega en el
+    controlador (y la conexión) propio de ese hilo; fuera, en el compartido.
+    """
+
+    def __init__(self, base: UniversalController):
+        self._base = base
+
+    def __getattr__(self, nombre):
+        return getattr(controlador_del_hilo() or self._base, nombre)
+
 
 # Instancia única y global del controlador para toda la app
-universal_controller = UniversalController()
\ No newline at end of file
+universal_controller = ControladorPorCarril(UniversalController())
+
+# Vigilante del log de cambios de este proceso; las escrituras locales sincronizan al instante
+vigilante_cambios = VigilanteCambios(DB_FILE, intervalo=settings.CAMBIOS_INTERVALO)
+UniversalController.after_commit_hooks.append(vigilante_cambios.sincronizar)
+
+# Las escrituras de otros workers invalidan la caché de lecturas compartida
+for _tabla in TABLAS_CACHEABLES:
+    vigilante_cambios.suscribir(_tabla, lambda filas, tabla=_tabla: UniversalController.cache.invalidar(tabla))
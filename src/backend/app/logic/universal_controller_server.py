@@ -1,20 +1,90 @@
 import os
 import sqlite3
-from typing import Any
+import logging
+import numpy as np
+from contextlib import closing, contextmanager
+from typing import Any, Callable
+from backend.app.core.config import settings
+from backend.app.logic.entity_cache import AUSENTE, TABLAS_CACHEABLES, CacheEntidades
+from backend.app.logic.migrations import aplicar_migraciones, crear_indices
+from backend.app.logic.query_plan import plan_de
 
 # Definir la ruta a la base de datos
 PATH = os.getcwd()
 DIR_DATA = os.path.join(PATH, 'backend', 'app', 'data')
 DB_FILE = os.path.join(DIR_DATA, 'data.db')
 
+# Tablas internas que clear_tables no vacía (el log de cambios registra los borrados)
+PRESERVED_TABLES = {"RegistroCambios"}
+
+logger = logging.getLogger(__name__)
+
 class UniversalController:
-    """Universal controller for CRUD operations using SQLite."""
+    """
+    Universal controller for CRUD operations using SQLite.
+
+    With `solo_lectura=True` the connection rejects writes (PRAGMA query_only)
+    and `instantanea()` wraps a request in one read transaction: in WAL mode
+    every query of the request sees the same snapshot, and neither waits for
+    nor blocks the writers.
+    """
+
+    # Callbacks run after every committed mutation, shared by all instances in the process
+    after_commit_hooks: list[Callable[[], Any]] = []
+    # Read cache shared by all instances in the process (one controller per lane thread)
+    cache = CacheEntidades(settings.ENTIDADES_CACHE_MAX)
 
-    def __init__(self):
+    def __init__(self, solo_lectura: bool = False):
         """Initialize the database connection and cursor."""
+        self.solo_lectura = solo_lectura
         self.conn = sqlite3.connect(DB_FILE, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row  # Return rows as dictionaries
         self.cursor = self.conn.cursor()
+        # Cursor for the fast paths: plain tuples instead of sqlite3.Row
+        self.tuple_cursor = self.conn.cursor()
+        self.tuple_cursor.row_factory = None
+        # Tables already ensured on this connection (skips the DDL + commit on every call)
+        self._ensured_tables: set[str] = set()
+        if solo_lectura:
+            self.conn.execute("PRAGMA query_only = ON")
+            return  # Migrations are applied by the writers
+        if settings.SQLITE_WAL:
+            # Persistent in the file: a no-op once the database is in WAL mode
+            self.conn.execute("PRAGMA journal_mode = WAL")
+        aplicar_migraciones(self.conn)
+
+    def cerrar(self):
+        """Close the SQLite connection."""
+        self.conn.close()
+
+    @contextmanager
+    def instantanea(self):
+        """Run the block inside one read transaction (read-only controllers; reentrant)."""
+        if not self.solo_lectura or self.conn.in_transaction:
+            yield
+            return
+        # Pin the cache generations first: inside the transaction they are never pinned
+        self.cache.fijar_generaciones(self.conn)
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self.conn.rollback()
+
+    def notify_commit(self):
+        """Run the after-commit hooks (e.g. refresh in-process caches)."""
+        for hook in self.after_commit_hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception("Error running after-commit hook")
+
+    def etag(self, model: Any) -> str | None:
+        """ETag of the model's table, derived from its change-log generation (None if not cached)."""
+        table = self._get_table_name(model)
+        if table not in TABLAS_CACHEABLES:
+            return None
+        return f'"{table.lower()}-{self.cache.generacion(table, self.conn)}"'
 
     def _get_table_name(self, obj: Any) -> str:
         """Retrieve the table name based on the object's class."""
@@ -26,13 +96,33 @@ class UniversalController:
             raise ValueError("El objeto o su clase no tienen definido '__entity_name__'.")
 
     def _ensure_table_exists(self, obj: Any):
-        """Ensure that the table exists in the database; create it if it doesn't."""
+        """Ensure that the table and its query indexes exist; create them if they don't."""
         table = self._get_table_name(obj)
-        fields = obj.get_fields()
-        columns = ", ".join(f"{k} {v}" for k, v in fields.items())
-        sql = f"CREATE TABLE IF NOT EXISTS {table} ({columns})"
-        self.cursor.execute(sql)
-        self.conn.commit()
+        if table in self._ensured_tables:
+            return
+        if self.solo_lectura:
+            self._ensure_table_exists_read_only(obj, table)
+        else:
+            self.cursor.execute(plan_de(obj).sql_crear)
+            crear_indices(self.conn, table)
+            self.conn.commit()
+        self._ensured_tables.add(table)
+
+    def _ensure_table_exists_read_only(self, obj: Any, table: str):
+        """Create a missing table through a short-lived writer connection."""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_schema WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        if exists:
+            return
+        with closing(sqlite3.connect(DB_FILE, timeout=30)) as writer:
+            writer.execute(plan_de(obj).sql_crear)
+            crear_indices(writer, table)
+            writer.commit()
+        if self.conn.in_transaction:
+            # The current snapshot predates the table: reopen it (the table is empty anyway)
+            self.conn.rollback()
+            self.conn.execute("BEGIN")
         
     def add(self, obj: Any) -> Any:
         """Add a new object to the database."""
@@ -52,33 +142,80 @@ class UniversalController:
                 f"An object with the same primary key already exists in '{table}'."
             )
 
+        self.cache.invalidar(table)
+        self.notify_commit()
         return obj
 
     def read_all(self, obj: Any) -> list[dict]:
         """Retrieve all objects from a table."""
-        self._ensure_table_exists(obj)
         table = self._get_table_name(obj)
-        self.cursor.execute(f"SELECT * FROM {table}")
-        rows = self.cursor.fetchall()
-        return [dict(row) for row in rows]
+        if table in TABLAS_CACHEABLES:
+            generation = self.cache.generacion(table, self.conn)
+            cached = self.cache.obtener(table, "*", generation)
+            if cached is not AUSENTE:
+                return [dict(row) for row in cached]
+        self._ensure_table_exists(obj)
+        cursor = self.tuple_cursor.execute(plan_de(obj).sql_todos)
+        columns = [d[0] for d in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        if table in TABLAS_CACHEABLES:
+            self.cache.guardar(table, "*", generation, rows)
+            return [dict(row) for row in rows]
+        return rows
+
+    def read_all_json(self, model: Any) -> bytes:
+        """
+        All rows of a table as a JSON array of objects, serialized by SQLite
+        itself (same content as read_all, without building Python dicts).
+        """
+        table = self._get_table_name(model)
+        if table in TABLAS_CACHEABLES:
+            generation = self.cache.generacion(table, self.conn)
+            cached = self.cache.obtener(table, "json", generation)
+            if cached is not AUSENTE:
+                return cached
+        self._ensure_table_exists(model)
+        body = self.tuple_cursor.execute(plan_de(model).sql_json).fetchone()[0].encode("utf-8")
+        if table in TABLAS_CACHEABLES:
+            self.cache.guardar(table, "json", generation, body)
+        return body
 
     def get_by_id(self, model, id):
         """Retrieve a single record by ID."""
-        self._ensure_table_exists(model)
         table = model.__entity_name__
-        primary_key = list(model.get_fields().keys())[0]  # Obtener el nombre de la clave primaria
-        sql = f"SELECT * FROM {table} WHERE {primary_key} = ?"
-        self.cursor.execute(sql, (id,))
-        row = self.cursor.fetchone()
+        if table in TABLAS_CACHEABLES:
+            generation = self.cache.generacion(table, self.conn)
+            cached = self.cache.obtener(table, (model, id), generation)
+            if cached is not AUSENTE:
+                return cached.model_copy() if cached is not None else None
+            unit = self._get_by_id(model, id)
+            self.cache.guardar(table, (model, id), generation, unit)
+            return unit.model_copy() if unit is not None else None
+        return self._get_by_id(model, id)
+
+    def _get_by_id(self, model, id):
+        self._ensure_table_exists(model)
+        plan = plan_de(model)  # SQL, column order and row constructor compiled once per model
+        row = self.tuple_cursor.execute(plan.sql_por_id, (id,)).fetchone()
 
         if not row:
             return None  # Devolver None si no se encuentra el registro
 
-        # Convertir los datos en un diccionario compatible con el modelo
-        fields = model.get_fields()
-        data = {key: row[idx] for idx, key in enumerate(fields.keys())}
+        return plan.a_modelo(row)
+
+    def read_rows(self, model: Any, columns: list[str] | None = None) -> list[tuple]:
+        """
+        Bulk read as plain tuples (no dicts or models), in the model's column
+        order or in the order of `columns`.
+        """
+        self._ensure_table_exists(model)
+        return self.tuple_cursor.execute(plan_de(model).sql_columnas(columns)).fetchall()
 
-        return model(**data)
+    def read_array(self, model: Any, column: str, dtype: Any = float) -> np.ndarray:
+        """Bulk read of one column straight into a NumPy array (NULL must be representable in dtype)."""
+        self._ensure_table_exists(model)
+        cursor = self.tuple_cursor.execute(plan_de(model).sql_columnas([column]))
+        return np.fromiter((row[0] for row in cursor), dtype=dtype)
 
     def update(self, obj: Any) -> Any:
         """Update an existing object."""
@@ -96,10 +233,12 @@ class UniversalController:
         sql = f"UPDATE {table} SET {assignments} WHERE {id_field} = ?"
         self.cursor.execute(sql, values)
         self.conn.commit()
+        self.cache.invalidar(table)
 
         if self.cursor.rowcount == 0:
             raise ValueError(f"No se encontró un registro con {id_field} = {data[id_field]} en la tabla '{table}'.")
 
+        self.notify_commit()
         return obj
 
     def delete(self, obj: Any) -> bool:
@@ -112,19 +251,27 @@ class UniversalController:
         sql = f"DELETE FROM {table} WHERE {id_field} = ?"
         self.cursor.execute(sql, (data[id_field],))
         self.conn.commit()
+        self.cache.invalidar(table)
 
         if self.cursor.rowcount == 0:
             raise ValueError(f"No se encontró un registro con {id_field} = {data[id_field]} en la tabla '{table}'.")
+        self.notify_commit()
         return True
 
     def clear_tables(self):
         """Delete all data from all tables in the database without dropping them."""
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = self.cursor.fetchall()
+        # Only ordinary tables: FTS5 virtual tables and their shadow tables are kept
+        # in sync by the triggers of their content tables
+        self.cursor.execute("PRAGMA main.table_list")
+        tables = [row for row in self.cursor.fetchall() if row["type"] == "table"]
         for table in tables:
             table_name = table["name"]
+            if table_name in PRESERVED_TABLES or table_name == "sqlite_schema" or table_name.startswith("sqlite_stat"):
+                continue  # The change log must keep increasing across clears
             self.cursor.execute(f"DELETE FROM {table_name}")
         self.conn.commit()
+        self.cache.invalidar()
+        self.notify_commit()
     def get_by_field(self, table: str, field: str, value: Any) -> dict | None:
         """Retrieve a single record by a specific field."""
         sql = f"SELECT * FROM {table} WHERE {field} = ?"
@@ -134,9 +281,17 @@ class UniversalController:
             return dict(row)
         return None
     def get_by_field_like(self, table: str, field: str, value_prefix: str) -> list[dict]:
-        """Retrieve records where a specific field starts with a given prefix."""
-        sql = f"SELECT * FROM {table} WHERE {field} LIKE ?"
-        like_pattern = f"{value_prefix}%"
-        self.cursor.execute(sql, (like_pattern,))
+        """
+        Retrieve records where a specific field starts with a given prefix.
+
+        Written as the range [prefix, next prefix) instead of LIKE 'prefix%' so
+        it can use an index on the field (LIKE is case-insensitive and cannot).
+        The match is case-sensitive and '%'/'_' are taken literally.
+        """
+        if not value_prefix:
+            self.cursor.execute(f"SELECT * FROM {table} WHERE {field} IS NOT NULL")
+        else:
+            upper = value_prefix[:-1] + chr(ord(value_prefix[-1]) + 1)
+            self.cursor.execute(f"SELECT * FROM {table} WHERE {field} >= ? AND {field} < ?", (value_prefix, upper))
         rows = self.cursor.fetchall()
-        return [dict(row) for row in rows]
\ No newline at end of file
+        return [dict(row) for row in rows]
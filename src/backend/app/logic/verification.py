@@ -1,16 +1,51 @@
+from backend.app.core.batching import PlanificadorLotes
+from backend.app.core.config import settings
 from backend.app.models.access import MedioAcceso, AccesoRequest
 from backend.app.models.verificador_acceso import VerificadorAcceso
-from backend.app.logic.universal_controller_instance import universal_controller
+from backend.app.logic.indice_biometria import indice_biometria
+from backend.app.logic.embeddings import DIMENSION_FACIAL, decodificar_embedding, normalizar, hash_facial
 import numpy as np
 import base64
-import hashlib
 import logging
-from backend.app.models.biometria import BiometriaOut
 import cv2
 from skimage.metrics import structural_similarity as ssim
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+# Umbral de similitud coseno para reconocimiento facial (embeddings normalizados);
+# se calibra con backend.app.logic.calibration
+UMBRAL_FACIAL = settings.UMBRAL_FACIAL
+
+
+def ranking_top_k(usuarios: np.ndarray, scores: np.ndarray, k: int) -> list[dict]:
+    """
+    Las k identidades con mayor score, ordenadas de mayor a menor.
+
+    Si un usuario tiene varios registros cuenta su mejor score. La selección
+    es parcial (`np.argpartition`, O(N)): solo se ordenan los k+1 mejores.
+
+    Returns:
+        list[dict]: {"usuario_id", "score", "margen"}; el margen es la
+        diferencia con el siguiente del ranking (None si no hay siguiente).
+    """
+    if len(scores) == 0 or k <= 0:
+        return []
+    unicos, inversa = np.unique(usuarios, return_inverse=True)
+    mejores = np.full(len(unicos), -np.inf)
+    np.maximum.at(mejores, inversa, scores)
+
+    n = min(k + 1, len(unicos))
+    seleccion = np.argpartition(-mejores, n - 1)[:n] if n < len(unicos) else np.arange(len(unicos))
+    seleccion = seleccion[np.argsort(-mejores[seleccion], kind="stable")]
+    ranking = []
+    for posicion, indice in enumerate(seleccion[:k]):
+        siguiente = mejores[seleccion[posicion + 1]] if posicion + 1 < len(seleccion) else None
+        ranking.append({
+            "usuario_id": int(unicos[indice]),
+            "score": float(mejores[indice]),
+            "margen": float(mejores[indice] - siguiente) if siguiente is not None else None,
+        })
+    return ranking
 
 class VerificadorRFID:
     def verificar(self, data: dict) -> tuple[bool, int | None]:
@@ -23,16 +58,16 @@ class VerificadorRFID:
             (False, None) en caso contrario.
         """
         rfid_tag = data.get("rfid_tag")
-        logger.debug("VerificadorRFID.verificar llamado con rfid_tag=%s", str(rfid_tag))
+        logger.debug("VerificadorRFID.verificar llamado con rfid_tag=%s", rfid_tag)
         if not rfid_tag:
-            logger.info("RFID no proporcionado en la petición.")
+            logger.debug("RFID no proporcionado en la petición.")
             return False, None
         try:
-            biometria = universal_controller.get_by_field("Biometria", "rfid_tag", rfid_tag)
-            if biometria:
-                logger.info("RFID encontrado. id_usuario=%s", str(biometria.get("id_usuario")))
-                return True, biometria["id_usuario"]
-            logger.info("RFID no encontrado en la base de datos.")
+            id_usuario = indice_biometria.usuario_por_rfid(rfid_tag)
+            if id_usuario is not None:
+                logger.debug("RFID encontrado. id_usuario=%s", id_usuario)
+                return True, id_usuario
+            logger.debug("RFID no encontrado en la base de datos.")
             return False, None
         except Exception as e:
             logger.exception("Error buscando RFID en la DB: %s", e)
@@ -43,7 +78,7 @@ class VerificadorHuella:
     Soporta tanto templates tipo imagen (SSIM) como vectores (correlación).
     """
 
-    def __init__(self, umbral_imagen=0.85, umbral_vector=0.98):
+    def __init__(self, umbral_imagen=settings.UMBRAL_HUELLA_IMAGEN, umbral_vector=settings.UMBRAL_HUELLA_VECTOR):
         self.umbral_imagen = umbral_imagen
         self.umbral_vector = umbral_vector
 
@@ -73,6 +108,65 @@ class VerificadorHuella:
         v1, v2 = v1[:min_len], v2[:min_len]
         return np.corrcoef(v1, v2)[0, 1]
 
+    def _similitudes_vectoriales(self, sonda: np.ndarray, vectores: list[np.ndarray]) -> np.ndarray:
+        """
+        Correlación normalizada de la sonda con cada template, vectorizada por
+        grupos de templates de la misma longitud (igual que `_similitud_vectorial`).
+        """
+        scores = np.zeros(len(vectores), dtype=np.float64)
+        por_longitud: dict[int, list[int]] = {}
+        for k, v in enumerate(vectores):
+            por_longitud.setdefault(len(v), []).append(k)
+        for longitud, posiciones in por_longitud.items():
+            m = min(longitud, len(sonda))
+            if m == 0:
+                continue
+            matriz = np.stack([vectores[k][:m] for k in posiciones]).astype(np.float64)
+            matriz = matriz - matriz.mean(axis=1, keepdims=True)
+            p = sonda[:m].astype(np.float64)
+            p -= p.mean()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                scores[posiciones] = (matriz @ p) / (np.linalg.norm(matriz, axis=1) * np.linalg.norm(p))
+        return scores
+
+    def _puntuar(self, vector_in_b64: str) -> tuple[np.ndarray, np.ndarray, bool]:
+        """
+        Similitud de la huella enviada con todos los templates.
+
+        Returns:
+            tuple: id_usuario y score de cada template comparable, y si se usó
+            el modo vector (True) o imagen (False).
+        """
+        # 1️⃣ Intentar decodificar como imagen
+        img_sensor = self._decode_image(vector_in_b64)
+        usar_vector = img_sensor is None
+
+        usuarios, scores = [], []
+        templates = indice_biometria.templates_huella()
+        if usar_vector:
+            # === Comparación tipo vector: la sonda se decodifica una sola vez ===
+            sonda = self._decode_vector(vector_in_b64)
+            if sonda is not None:
+                vectores = []
+                for id_usuario, tpl_b64 in templates:
+                    v2 = self._decode_vector(tpl_b64)
+                    if v2 is not None:
+                        usuarios.append(id_usuario)
+                        vectores.append(v2)
+                scores = self._similitudes_vectoriales(sonda, vectores) if vectores else []
+        else:
+            # === Comparación tipo imagen ===
+            h, w = img_sensor.shape
+            for id_usuario, tpl_b64 in templates:
+                img_db = self._decode_image(tpl_b64)
+                if img_db is None:
+                    continue
+                usuarios.append(id_usuario)
+                scores.append(ssim(img_sensor, cv2.resize(img_db, (w, h))))
+
+        scores = np.nan_to_num(np.asarray(scores, dtype=np.float64), nan=0.0)
+        return np.asarray(usuarios, dtype=np.int64), scores, usar_vector
+
     def verificar(self, data: dict) -> tuple[bool, int | None]:
         """
         Verifica si la huella enviada coincide con alguna en la DB.
@@ -82,46 +176,32 @@ class VerificadorHuella:
         if not vector_in_b64:
             return False, None
 
-        # 1️⃣ Intentar decodificar como imagen
-        img_sensor = self._decode_image(vector_in_b64)
-        usar_vector = img_sensor is None
-
-        registros_db = universal_controller.read_all(BiometriaOut())
-        if not registros_db:
+        usuarios, scores, usar_vector = self._puntuar(vector_in_b64)
+        if len(scores) == 0:
             return False, None
 
-        mejor_score = 0.0
-        mejor_id = None
-
-        for registro in registros_db:
-            tpl_b64 = registro.get("template_huella")
-            if not tpl_b64:
-                continue
+        mejor = int(np.argmax(scores))
+        mejor_score = max(float(scores[mejor]), 0.0)
+        umbral = self.umbral_vector if usar_vector else self.umbral_imagen
 
-            if usar_vector:
-                # === Comparación tipo vector ===
-                v1 = self._decode_vector(vector_in_b64)
-                v2 = self._decode_vector(tpl_b64)
-                if v1 is None or v2 is None:
-                    continue
-                score = self._similitud_vectorial(v1, v2)
-                umbral = self.umbral_vector
-            else:
-                # === Comparación tipo imagen ===
-                img_db = self._decode_image(tpl_b64)
-                if img_db is None:
-                    continue
-                h, w = img_sensor.shape
-                img_db = cv2.resize(img_db, (w, h))
-                score = ssim(img_sensor, img_db)
-                umbral = self.umbral_imagen
+        logger.debug("Mejor similitud huella: %.3f (modo %s)", mejor_score, "vector" if usar_vector else "imagen")
+        if mejor_score >= umbral:
+            return True, int(usuarios[mejor])
+        return False, None
 
-            if score > mejor_score:
-                mejor_score = score
-                mejor_id = registro["id_usuario"]
+    def candidatos(self, data: dict, k: int = 5) -> tuple[list[dict], float]:
+        """
+        Las k identidades más parecidas a la huella enviada, para revisión.
 
-        print(f"[DEBUG] Mejor similitud: {mejor_score:.3f} (modo {'vector' if usar_vector else 'imagen'})")
-        return (mejor_score >= umbral, mejor_id if mejor_score >= umbral else None)
+        Returns:
+            tuple: ranking (ver `ranking_top_k`) y umbral aplicado en `verificar`.
+        """
+        vector_in_b64 = data.get("vector")
+        if not vector_in_b64:
+            return [], self.umbral_vector
+        usuarios, scores, usar_vector = self._puntuar(vector_in_b64)
+        umbral = self.umbral_vector if usar_vector else self.umbral_imagen
+        return ranking_top_k(usuarios, scores, k), umbral
 
 class VerificadorCamara(VerificadorAcceso):
     """
@@ -133,161 +213,136 @@ class VerificadorCamara(VerificadorAcceso):
     def verificar(self, data: dict) -> tuple[bool, int | None]:
         """
         Args:
-            data (dict): {"vector": "[0.123, -0.456, ...]"} - String JSON con 128 decimales
-                        o Base64 del array numpy serializado
+            data (dict): {"vector": "[0.123, -0.456, ...]"} - String JSON con 128 decimales,
+                        Base64 del array numpy serializado o el np.ndarray ya extraído
+                        en el servidor (/acceso/camara/frame)
 
         Returns:
             (True, id_usuario) si hay coincidencia, (False, None) si no.
+
+        Raises:
+            TimeoutError: Si el comparador no responde en COMPARACION_TIMEOUT_MS.
         """
-        vector_str = data.get("vector") or data.get("embedding") or data.get("vector_facial")
+        # Un np.ndarray no tiene valor de verdad: se distingue antes que los textos vacíos
+        vector_str = next((v for v in (data.get("vector"), data.get("embedding"), data.get("vector_facial"))
+                           if isinstance(v, np.ndarray) or v), None)
         logger.debug("VerificadorCamara.verificar recibido. keys=%s", list(data.keys()))
         
-        if not vector_str:
-            logger.info("No se proporcionó vector facial en la petición.")
+        if vector_str is None:
+            logger.debug("No se proporcionó vector facial en la petición.")
             return False, None
 
         try:
-            # Intentar decodificar como Base64 primero (formato numpy serializado)
-            try:
-                padded_vector = vector_str + '=' * (-len(vector_str) % 4)
-                vector_bytes = base64.b64decode(padded_vector)
-                embedding_capturado = np.frombuffer(vector_bytes, dtype=np.float32)
-                logger.info("Embedding decodificado desde Base64. Shape: %s", embedding_capturado.shape)
-            except Exception:
-                # Si falla, asumir que es un string JSON "[0.123, -0.456, ...]"
-                import json
-                embedding_list = json.loads(vector_str)
-                embedding_capturado = np.array(embedding_list, dtype=np.float32)
-                logger.info("Embedding parseado desde JSON. Shape: %s", embedding_capturado.shape)
-            
+            # Base64 del array numpy serializado o string JSON "[0.123, -0.456, ...]"
+            if isinstance(vector_str, np.ndarray):
+                embedding_capturado = vector_str.astype(np.float32, copy=False)
+            else:
+                embedding_capturado = decodificar_embedding(vector_str)
+            logger.debug("Embedding facial decodificado. Shape: %s", embedding_capturado.shape)
+
             # Validar que sea un vector de 128 dimensiones
-            if embedding_capturado.shape[0] != 128:
+            if embedding_capturado.shape[0] != DIMENSION_FACIAL:
                 logger.warning("El embedding facial debe tener 128 dimensiones, recibido: %d", embedding_capturado.shape[0])
                 return False, None
-                
+
         except Exception as e:
             logger.warning("Error procesando vector facial: %s", e)
             return False, None
 
         try:
             # Serializar embedding para calcular hash (normalizar primero)
-            embedding_norm = embedding_capturado / (np.linalg.norm(embedding_capturado) + 1e-8)
-            embedding_bytes = embedding_norm.tobytes()
-            hash_prefix = hashlib.sha256(embedding_bytes).hexdigest()[:8]
+            embedding_norm = normalizar(embedding_capturado)
+            hash_prefix = hash_facial(embedding_norm)
             logger.debug("Hash prefix calculado para embedding facial: %s", hash_prefix)
         except Exception as e:
             logger.exception("Error calculando hash del embedding facial: %s", e)
             return False, None
-        
-        logger.info("Buscando candidatos con facial_hash similar: %s", hash_prefix)
 
+        # La comparación se agrupa con las sondas concurrentes de otras peticiones; la espera
+        # está acotada para no retener el hilo del carril de acceso (compartido con RFID y huella)
+        futuro = comparador_facial.enviar((embedding_norm, hash_prefix))
         try:
-            candidatos = universal_controller.get_by_field_like(
-                "Biometria", "facial_hash", hash_prefix
-            )
-            logger.info("Candidatos faciales recuperados: %d", len(candidatos) if candidatos else 0)
-            logger.debug("Candidatos sample: %s", str(candidatos[:3]) if candidatos else "[]")
+            resultado, user_id = futuro.result(timeout=settings.COMPARACION_TIMEOUT_MS / 1000)
+        except TimeoutError:
+            futuro.cancel()  # si sigue en cola, el lote la omite
+            logger.warning("Comparación facial sin respuesta en %.0f ms", settings.COMPARACION_TIMEOUT_MS)
+            raise
         except Exception as e:
-            logger.exception("Error consultando candidatos faciales en la DB: %s", e)
+            logger.exception("Error comparando el embedding facial: %s", e)
             return False, None
+        logger.debug("Resultado comparación facial final: matched=%s user_id=%s", resultado, user_id)
+        return resultado, user_id
 
-        if not candidatos:
-            logger.info("No se encontraron candidatos con facial_hash similar.")
-            return False, None
+    def candidatos(self, data: dict, k: int = 5) -> tuple[list[dict], float]:
+        """
+        Las k identidades más parecidas al embedding enviado en toda la
+        galería (sin el filtro por facial_hash), para revisar accesos denegados.
 
-        # Comparar embeddings usando similitud coseno
-        resultado, user_id = self._comparar_embeddings_faciales(embedding_capturado, candidatos)
-        logger.info("Resultado comparación facial final: matched=%s user_id=%s", str(resultado), str(user_id))
-        return resultado, user_id
+        Returns:
+            tuple: ranking (ver `ranking_top_k`) y umbral de coincidencia.
+        """
+        vector = data.get("vector")
+        if vector is None or (isinstance(vector, str) and not vector):
+            return [], UMBRAL_FACIAL
+        embedding = vector if isinstance(vector, np.ndarray) else decodificar_embedding(vector)
+        if embedding.shape[0] != DIMENSION_FACIAL:
+            raise ValueError(f"El embedding facial debe tener {DIMENSION_FACIAL} dimensiones")
+        usuarios, galeria = indice_biometria.galeria_completa()
+        scores = galeria @ normalizar(embedding.astype(np.float32, copy=False))
+        return ranking_top_k(usuarios, scores, k), UMBRAL_FACIAL
 
-    def _comparar_embeddings_faciales(
-        self, embedding_capturado: np.ndarray, candidatos: list[dict]
-    ) -> tuple[bool, int | None]:
+    @staticmethod
+    def _comparar_lote(sondas: list[tuple[np.ndarray, str]]) -> list[tuple[bool, int | None]]:
         """
-        Compara el embedding facial capturado con los candidatos usando similitud coseno.
-        
+        Compara un lote de sondas con sus candidatos en una sola multiplicación.
+
+        Cada sonda solo puede coincidir con los registros de su mismo
+        facial_hash (igual que la búsqueda individual): se calcula la matriz
+        (B x 128)·(128 x N) contra la unión de candidatos y se enmascaran los
+        pares de hash distinto.
+
         Args:
-            embedding_capturado: Vector numpy de 128 dimensiones
-            candidatos: Lista de registros de Biometria con vector_facial
-            
+            sondas: (embedding normalizado, prefijo de facial_hash) de cada petición
+
         Returns:
-            (True, id_usuario) si hay coincidencia >= umbral, (False, None) si no.
+            (True, id_usuario) o (False, None) por sonda, en el mismo orden.
         """
-        logger.info("Iniciando comparación de embeddings faciales: %d candidatos", len(candidatos))
-        
-        mejor_score = 0.0
-        mejor_usuario = None
-        
-        # Normalizar embedding capturado
-        embedding_capturado_norm = embedding_capturado / (np.linalg.norm(embedding_capturado) + 1e-8)
-
-        for idx, c in enumerate(candidatos):
-            usuario_id = c.get("id_usuario")
-            logger.debug("Comparando contra candidato facial %d: id_usuario=%s", idx, str(usuario_id))
-            
-            stored_vector = c.get("vector_facial")
-            if not stored_vector:
-                logger.debug("Candidato %s no tiene vector_facial almacenado, saltando.", str(usuario_id))
-                continue
+        hashes = np.array([h[:8].lower() for _, h in sondas], dtype="U8")
+        usuarios, galeria, hashes_galeria = indice_biometria.galeria_facial(set(hashes.tolist()))
+        logger.debug("Comparación facial por lotes: %d sondas x %d candidatos", len(sondas), len(usuarios))
+        if len(usuarios) == 0:
+            return [(False, None)] * len(sondas)
 
-            try:
-                # Decodificar vector almacenado (puede ser Base64 o JSON)
-                try:
-                    padded_stored = stored_vector + '=' * (-len(stored_vector) % 4)
-                    stored_bytes = base64.b64decode(padded_stored)
-                    stored_embedding = np.frombuffer(stored_bytes, dtype=np.float32)
-                except Exception:
-                    import json
-                    stored_list = json.loads(stored_vector)
-                    stored_embedding = np.array(stored_list, dtype=np.float32)
-                
-                logger.debug("Candidato %s: embedding decodificado shape=%s", str(usuario_id), stored_embedding.shape)
-                
-                if stored_embedding.shape[0] != 128:
-                    logger.warning("Candidato %s tiene embedding con dimensión incorrecta: %d", 
-                                 str(usuario_id), stored_embedding.shape[0])
-                    continue
-                    
-            except Exception as e:
-                logger.warning("Error decodificando embedding del candidato %s: %s", str(usuario_id), e)
-                continue
+        scores = np.stack([embedding for embedding, _ in sondas]) @ galeria.T
+        scores[hashes[:, None] != hashes_galeria[None, :]] = -np.inf
+        mejores = scores.argmax(axis=1)
+        mejores_scores = scores[np.arange(len(sondas)), mejores]
 
-            try:
-                # Normalizar embedding almacenado
-                stored_embedding_norm = stored_embedding / (np.linalg.norm(stored_embedding) + 1e-8)
-                
-                # Calcular similitud coseno
-                score = float(np.dot(embedding_capturado_norm, stored_embedding_norm))
-                
-                logger.debug("Score facial con candidato %s = %f", str(usuario_id), score)
-                
-                if score > mejor_score:
-                    mejor_score = score
-                    mejor_usuario = usuario_id
-                    
-            except Exception as e:
-                logger.warning("Error comparando embeddings con candidato %s: %s", str(usuario_id), e)
-
-        # Umbral para reconocimiento facial (ajustable según precisión deseada)
-        UMBRAL = 0.70  # Para embeddings normalizados, 0.70 es un buen umbral
-        logger.info("Mejor score facial encontrado = %f (umbral=%f) -> usuario=%s", 
-                   mejor_score, UMBRAL, str(mejor_usuario))
-
-        if mejor_score >= UMBRAL:
-            logger.info("Coincidencia facial aceptada con usuario %s (score=%f)", str(mejor_usuario), mejor_score)
-            return True, mejor_usuario
-
-        logger.info("No hubo coincidencia facial válida. Mejor score=%f", mejor_score)
-        return False, None
+        resultados = []
+        for mejor, mejor_score in zip(mejores, mejores_scores):
+            if mejor_score >= UMBRAL_FACIAL:
+                resultados.append((True, int(usuarios[mejor])))
+            else:
+                resultados.append((False, None))
+        return resultados
 
 class VerificadorFactory:
     @staticmethod
     def obtener(medio: MedioAcceso) -> VerificadorAcceso:
-        logger.debug("VerificadorFactory.obtener: medio=%s", str(medio))
+        logger.debug("VerificadorFactory.obtener: medio=%s", medio)
         if medio == MedioAcceso.rfid:
             return VerificadorRFID()
         elif medio == MedioAcceso.huella:
             return VerificadorHuella()
         elif medio == MedioAcceso.camara:
             return VerificadorCamara()
-        raise ValueError("Medio no soportado")
\ No newline at end of file
+        raise ValueError("Medio no soportado")
+
+
+# Comparaciones faciales concurrentes agrupadas en micro-lotes (una multiplicación por lote)
+comparador_facial = PlanificadorLotes(
+    VerificadorCamara._comparar_lote,
+    max_lote=settings.COMPARACION_LOTE,
+    espera=settings.COMPARACION_ESPERA_MS / 1000,
+    nombre="comparador-facial",
+)
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 
 # Enum de medios soportados
@@ -9,14 +9,42 @@ class MedioAcceso(str, Enum):
     huella = "huella"
     rfid = "rfid"
 
+# Sentido del paso por el torniquete (anti-passback)
+class SentidoAcceso(str, Enum):
+    entrada = "entrada"
+    salida = "salida"
+
+# Motivo por el que se descarta una captura antes de verificarla; el
+# dispositivo debe repetir la captura (acercar al usuario, mejorar la luz...)
+class MotivoRechazo(str, Enum):
+    sin_rostro = "sin_rostro"
+    rostro_pequeno = "rostro_pequeno"
+    desenfocada = "desenfocada"
+    subexpuesta = "subexpuesta"
+    sobreexpuesta = "sobreexpuesta"
+
 # Request genérico
 class AccesoRequest(BaseModel):
     medio: MedioAcceso
     data: Dict[str, Any]   # Solo un medio a la vez
+    sentido: Optional[SentidoAcceso] = None  # Sin sentido no se aplica anti-passback
+    id_torniquete: Optional[int] = None
 
 # Response estandarizada
 class AccesoResponse(BaseModel):
     status: Optional[bool] = None
     medio: MedioAcceso
     usuario_id: Optional[int] = None
-    mensaje: Optional[str] = None
\ No newline at end of file
+    mensaje: Optional[str] = None
+    motivo: Optional[MotivoRechazo] = None  # Solo si la captura se descartó por calidad
+
+# Identidades más parecidas a una muestra (revisión de accesos denegados)
+class CandidatoAcceso(BaseModel):
+    usuario_id: int
+    score: float
+    margen: Optional[float] = None  # Diferencia con el siguiente candidato
+
+class CandidatosResponse(BaseModel):
+    medio: MedioAcceso
+    umbral: float
+    candidatos: List[CandidatoAcceso]
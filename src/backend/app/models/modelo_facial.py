@@ -0,0 +1,15 @@
+# Interfaz de los modelos de detección + embedding facial (intercambiables)
+from abc import ABC, abstractmethod
+import numpy as np
+class ModeloFacial(ABC):
+    @abstractmethod
+    def extraer_lote(self, frames: list[np.ndarray]) -> list[np.ndarray | None]:
+        """Embedding de 128 floats del rostro de cada frame BGR, o None si no hay rostro."""
+        pass
+
+    def detectar_rostros(self, gris: np.ndarray) -> list[tuple[int, int, int, int]] | None:
+        """
+        Cajas (x, y, ancho, alto) de los rostros en un frame en grises reducido,
+        para el filtro de calidad. None si el modelo no ofrece un detector rápido.
+        """
+        return None
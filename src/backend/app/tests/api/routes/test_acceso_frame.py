@@ -0,0 +1,132 @@
+import base64
+from contextlib import asynccontextmanager
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.api.main import app
+from backend.app.api.routes import access_service
+from backend.app.core.admission import control_admision
+from backend.app.logic.face_embedding import ExtractorLotes, ModeloStub
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def extractor(monkeypatch):
+    """En producción el modelo se configura con MODELO_FACIAL; aquí, el stub."""
+    modelo = ModeloStub()
+    extractor = ExtractorLotes(modelo)
+    monkeypatch.setattr(access_service, "extractor_facial", extractor)
+    monkeypatch.setattr(access_service.evaluador_calidad, "detector", modelo.detectar_rostros)
+    yield extractor
+    extractor.detener()
+
+
+def _jpeg(frame: np.ndarray) -> bytes:
+    ok, datos = cv2.imencode(".jpg", frame)
+    assert ok
+    return datos.tobytes()
+
+
+def test_acceso_con_frame_extrae_el_embedding_en_el_servidor():
+    rng = np.random.default_rng(7)
+    frame = cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (160, 120),
+                       interpolation=cv2.INTER_NEAREST)
+    jpeg = _jpeg(frame)
+
+    # Se registra el embedding que el modelo obtiene del mismo JPEG decodificado
+    decodificado = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    embedding = ModeloStub().extraer_lote([decodificado])[0]
+    response = client.post("/biometria/create", data={
+        "id_usuario": 3901,
+        "vector_facial": base64.b64encode(embedding.tobytes()).decode(),
+        "fecha_actualizacion": "2025-10-20T20:00:00",
+    })
+    assert response.status_code == 200
+
+    acceso = client.post(
+        "/acceso/camara/frame",
+        data={"dispositivo_id": "CAM_FRAME_1", "fecha": "2025-10-20T20:01:00"},
+        files={"imagen": ("captura.jpg", jpeg, "image/jpeg")},
+    )
+    assert acceso.status_code == 200
+    data = acceso.json()
+    assert data["status"] is True
+    assert data["usuario_id"] == 3901
+    assert data["medio"] == "camara"
+    assert data["motivo"] is None
+
+
+def test_frame_sin_rostro_o_invalido():
+    uniforme = np.full((120, 160, 3), 90, dtype=np.uint8)
+    acceso = client.post(
+        "/acceso/camara/frame",
+        data={"dispositivo_id": "CAM_FRAME_2"},
+        files={"imagen": ("captura.jpg", _jpeg(uniforme), "image/jpeg")},
+    )
+    assert acceso.status_code == 200
+    assert acceso.json()["status"] is False
+    assert acceso.json()["usuario_id"] is None
+    assert acceso.json()["motivo"] == "sin_rostro"
+
+    invalido = client.post(
+        "/acceso/camara/frame",
+        data={"dispositivo_id": "CAM_FRAME_2"},
+        files={"imagen": ("captura.jpg", b"no es un jpeg", "image/jpeg")},
+    )
+    assert invalido.status_code == 422
+
+
+def test_frame_borroso_se_rechaza_antes_del_modelo(extractor):
+    rng = np.random.default_rng(8)
+    frame = cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (160, 120),
+                       interpolation=cv2.INTER_NEAREST)
+    borroso = cv2.GaussianBlur(frame, (0, 0), 12)
+    frames_antes = extractor.elementos
+
+    acceso = client.post(
+        "/acceso/camara/frame",
+        data={"dispositivo_id": "CAM_FRAME_3"},
+        files={"imagen": ("captura.jpg", _jpeg(borroso), "image/jpeg")},
+    )
+    assert acceso.status_code == 200
+    assert acceso.json()["status"] is False
+    assert acceso.json()["motivo"] == "desenfocada"
+    assert extractor.elementos == frames_antes
+
+
+def test_sin_modelo_configurado_responde_503(monkeypatch):
+    monkeypatch.setattr(access_service, "extractor_facial", None)
+    acceso = client.post(
+        "/acceso/camara/frame",
+        data={"dispositivo_id": "CAM_FRAME_4"},
+        files={"imagen": ("captura.jpg", _jpeg(np.full((120, 160, 3), 90, dtype=np.uint8)), "image/jpeg")},
+    )
+    assert acceso.status_code == 503
+
+
+def test_extraccion_dentro_del_limite_de_verificaciones(monkeypatch, extractor):
+    etapas = []
+    original = control_admision.verificacion
+
+    @asynccontextmanager
+    async def verificacion():
+        async with original():
+            etapas.append("entra")
+            yield
+            etapas.append("sale")
+
+    extraer_lote = extractor.procesar_lote
+    monkeypatch.setattr(control_admision, "verificacion", verificacion)
+    monkeypatch.setattr(extractor, "procesar_lote", lambda frames: etapas.append("modelo") or extraer_lote(frames))
+    rng = np.random.default_rng(9)
+    frame = cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (160, 120), interpolation=cv2.INTER_NEAREST)
+    acceso = client.post(
+        "/acceso/camara/frame",
+        data={"dispositivo_id": "CAM_FRAME_5"},
+        files={"imagen": ("captura.jpg", _jpeg(frame), "image/jpeg")},
+    )
+    assert acceso.status_code == 200
+    # Un solo hueco de verificación cubre el modelo y la verificación
+    assert etapas == ["entra", "modelo", "sale"]
@@ -65,6 +65,20 @@ def test_acceso_rfid_fallido():
     data = response.json()
     assert data["status"] is False
 
+def test_acceso_rfid_antipassback():
+    from backend.app.logic.antipassback import estado_presencia
+    test_controller.add(BiometriaCreate(id_biometria=1, id_usuario=1, rfid_tag="VALID123"))
+    params = {"rfid_tag": "VALID123", "id_torniquete": 1}
+    try:
+        assert client.post("/acceso/rfid", params={**params, "sentido": "entrada"}).json()["status"] is True
+        segunda = client.post("/acceso/rfid", params={**params, "sentido": "entrada"}).json()
+        assert segunda["status"] is False
+        assert segunda["mensaje"] == "Acceso denegado (anti-passback)"
+        assert client.post("/acceso/rfid", params={**params, "sentido": "salida"}).json()["status"] is True
+        assert client.post("/acceso/rfid", params={"rfid_tag": "VALID123", "sentido": "entrada"}).status_code == 422
+    finally:
+        estado_presencia.vaciar()
+
 # Ruta del template base
 TEMPLATE_PATH = Path("backend/app/tests/data/template_b64.txt")
 def cargar_template_base() -> str:
@@ -203,4 +217,16 @@ def test_huella_fracaso_total():
     data = resp.json()
     logger.info(f"❌ Caso fracaso total: {data}")
     assert data["status"] is False
-    assert data.get("usuario_id") is None
\ No newline at end of file
+    assert data.get("usuario_id") is None
+
+def test_acceso_camara_responde_503_si_la_comparacion_excede_su_presupuesto(monkeypatch):
+    from backend.app.logic import verification
+
+    def verificar_atascado(self, data):
+        raise TimeoutError  # lo que hace verificar() si el comparador no responde a tiempo
+
+    monkeypatch.setattr(verification.VerificadorCamara, "verificar", verificar_atascado)
+    vector = base64.b64encode(np.ones(128, np.float32).tobytes()).decode()
+    response = client.post("/acceso/camara", params={"dispositivo_id": "CAM_TIMEOUT", "vector": vector}, headers=headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
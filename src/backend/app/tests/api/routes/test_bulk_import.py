@@ -0,0 +1,131 @@
+import base64
+import hashlib
+import json
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.api.main import app
+from backend.app.logic.universal_controller_instance import universal_controller as controller
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def limpiar_db():
+    controller.clear_tables()
+    yield
+    controller.clear_tables()
+
+
+def _b64(embedding: np.ndarray) -> str:
+    return base64.b64encode(embedding.astype(np.float32).tobytes()).decode()
+
+
+def test_import_ndjson_habilita_acceso():
+    rng = np.random.default_rng(7)
+    embeddings = [rng.random(128).astype(np.float32) for _ in range(3)]
+    lineas = [
+        {"nombre_completo": "Ana", "rfid_tag": "IMP-1", "vector_facial": _b64(embeddings[0])},
+        {"nombre_completo": "Luis", "rfid_tag": "IMP-2", "vector_facial": embeddings[1].tolist()},
+        {"id_usuario": 50, "nombre_completo": "Eva", "vector_facial": _b64(embeddings[2])},
+        {"nombre_completo": "Repetido", "rfid_tag": "IMP-1"},
+        {"nombre_completo": "Corto", "vector_facial": _b64(embeddings[0][:10])},
+        {"cargo": "sin nombre"},
+    ]
+    contenido = "\n".join(json.dumps(l) for l in lineas) + "\n{no es json\n"
+
+    resp = client.post("/biometria/import", files={"archivo": ("alta.ndjson", contenido.encode(), "application/x-ndjson")})
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert data["procesados"] == 7
+    assert data["usuarios_creados"] == 3
+    assert data["biometrias_creadas"] == 3
+    assert sorted(e["linea"] for e in data["errores"]) == [4, 5, 6, 7]
+
+    rfid = client.post("/acceso/rfid", params={"rfid_tag": "IMP-2"}).json()
+    assert rfid["status"] is True
+
+    # Los embeddings importados en bloque tienen el mismo facial_hash que el alta individual
+    for embedding, esperado in ((embeddings[1], rfid["usuario_id"]), (embeddings[2], 50)):
+        camara = client.post("/acceso/camara", params={"dispositivo_id": "test", "vector": _b64(embedding)}).json()
+        assert camara["status"] is True
+        assert camara["usuario_id"] == esperado
+
+
+def test_import_csv():
+    contenido = "nombre_completo,cargo,rfid_tag,estado\nAna,Docente,CSV-1,true\nLuis,,CSV-2,0\n"
+    resp = client.post("/biometria/import", files={"archivo": ("alta.csv", contenido.encode(), "text/csv")})
+    data = resp.json()["data"]
+    assert data["usuarios_creados"] == 2
+    assert data["errores"] == []
+    assert client.post("/acceso/rfid", params={"rfid_tag": "CSV-1"}).json()["status"] is True
+
+
+def _importar(lineas: list[dict]) -> dict:
+    contenido = "\n".join(json.dumps(l) for l in lineas) + "\n"
+    resp = client.post("/biometria/import", files={"archivo": ("alta.ndjson", contenido.encode(), "application/x-ndjson")})
+    assert resp.status_code == 200
+    return resp.json()["data"]
+
+
+def _tags() -> dict:
+    return dict(controller.conn.execute("SELECT rfid_tag, id_usuario FROM Biometria WHERE rfid_tag IS NOT NULL"))
+
+
+def test_id_usuario_inexistente_se_informa_por_linea():
+    data = _importar([
+        {"id_usuario": 999, "rfid_tag": "HUERFANO"},
+        {"id_usuario": 10, "nombre_completo": "Ana"},
+        {"id_usuario": 10, "rfid_tag": "ANA-1"},  # creado en el mismo archivo
+        {"id_usuario": 11, "nombre_completo": "Nulo", "vector_facial": [0.0] * 128},
+        {"id_usuario": 11, "rfid_tag": "NULO-1"},  # su alta fue rechazada
+    ])
+    assert data["errores"] == [
+        {"linea": 1, "error": "id_usuario inexistente: 999"},
+        {"linea": 4, "error": "vector_facial no finito o nulo"},
+        {"linea": 5, "error": "id_usuario inexistente: 11"},
+    ]
+    assert data["usuarios_creados"] == 1 and data["biometrias_creadas"] == 1
+    assert _tags() == {"ANA-1": 10}
+
+
+def test_id_usuario_duplicado_no_rechaza_el_lote():
+    assert _importar([{"id_usuario": 3, "nombre_completo": "Previo"}])["errores"] == []
+    data = _importar([
+        {"nombre_completo": "Auto", "rfid_tag": "DUP-1"},
+        {"id_usuario": 3, "nombre_completo": "Ya existe", "rfid_tag": "DUP-2"},
+        {"id_usuario": 5, "nombre_completo": "Eva", "rfid_tag": "DUP-3"},
+        {"id_usuario": 5, "nombre_completo": "Otra Eva", "rfid_tag": "DUP-4"},
+        {"nombre_completo": "Auto 2", "rfid_tag": "DUP-5"},
+    ])
+    assert data["errores"] == [
+        {"linea": 2, "error": "id_usuario duplicado: 3"},
+        {"linea": 4, "error": "id_usuario duplicado: 5"},
+    ]
+    assert data["usuarios_creados"] == 3
+    ids = _tags()
+    # Los ids asignados no chocan con los explícitos del mismo lote
+    assert sorted(ids) == ["DUP-1", "DUP-3", "DUP-5"]
+    assert ids["DUP-3"] == 5 and len(set(ids.values())) == 3
+
+
+def test_lineas_que_no_son_objetos_o_con_template_corrupto_se_rechazan_por_linea():
+    template = base64.b64encode(bytes(range(64))).decode()
+    contenido = "\n".join([
+        json.dumps({"nombre_completo": "Ana", "rfid_tag": "TPL-1", "template_huella": template}),
+        "[1, 2]",
+        json.dumps({"nombre_completo": "Luis", "rfid_tag": "TPL-2", "template_huella": "abcde"}),
+        json.dumps({"nombre_completo": "Eva", "rfid_tag": "TPL-3"}),
+    ]) + "\n"
+    resp = client.post("/biometria/import", files={"archivo": ("alta.ndjson", contenido.encode(), "application/x-ndjson")})
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert data["errores"] == [
+        {"linea": 2, "error": "Se esperaba un objeto JSON, no list"},
+        {"linea": 3, "error": "template_huella no es base64 válido"},
+    ]
+    # El resto del lote se importa
+    assert data["usuarios_creados"] == 2
+    assert sorted(_tags()) == ["TPL-1", "TPL-3"]
+    huella_hash = controller.conn.execute("SELECT huella_hash FROM Biometria WHERE rfid_tag = 'TPL-1'").fetchone()[0]
+    assert huella_hash == hashlib.sha256(bytes(range(64))).hexdigest()[:8]
@@ -0,0 +1,62 @@
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.api.main import app
+from backend.app.logic.busqueda import consulta_fts
+from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.models.registros import RegistrosCreate
+from backend.app.models.usuarios import UsuariosCreate
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def limpiar_db():
+    controller.clear_tables()
+    yield
+    controller.clear_tables()
+
+
+def test_consulta_fts_neutraliza_la_sintaxis():
+    assert consulta_fts('ana "OR* NEAR(') == '"ana"* "OR"* "NEAR"*'
+    assert consulta_fts(' -*" ') is None
+
+
+def test_busqueda_de_usuarios_por_prefijo_sin_acentos_y_ordenada():
+    controller.add(UsuariosCreate(id_usuario=1, nombre_completo="José García", cargo="Vigilante", estado=True))
+    controller.add(UsuariosCreate(id_usuario=2, nombre_completo="Ana Pérez", cargo="Asistente de José", estado=True))
+    controller.add(UsuariosCreate(id_usuario=3, nombre_completo="Luis Gómez", cargo="Contador", estado=False))
+
+    assert [u["id_usuario"] for u in client.get("/usuarios/search", params={"q": "gar"}).json()] == [1]
+    # El nombre pesa más que el cargo
+    assert [u["id_usuario"] for u in client.get("/usuarios/search", params={"q": "JOSE"}).json()] == [1, 2]
+    assert client.get("/usuarios/search", params={"q": "jose vigil"}).json()[0]["nombre_completo"] == "José García"
+    assert client.get("/usuarios/search", params={"q": '" OR'}).json() == []
+    assert client.get("/usuarios/search", params={"q": ""}).status_code == 422
+
+    # Los triggers mantienen el índice al actualizar y borrar
+    controller.update(UsuariosCreate(id_usuario=3, nombre_completo="Luis Gómez", cargo="Vigilante", estado=True))
+    assert [u["id_usuario"] for u in client.get("/usuarios/search", params={"q": "vigilante"}).json()] == [1, 3]
+    controller.delete(UsuariosCreate(id_usuario=1))
+    assert [u["id_usuario"] for u in client.get("/usuarios/search", params={"q": "vigilante"}).json()] == [3]
+
+
+def test_busqueda_en_observaciones_de_registros():
+    controller.add(RegistrosCreate(id_registro=1, id_usuario=1, id_torniquete=1, observaciones="Tarjeta dañada, se repuso"))
+    controller.add(RegistrosCreate(id_registro=2, id_usuario=2, id_torniquete=1))
+    controller.add(RegistrosCreate(id_registro=3, id_usuario=2, id_torniquete=1, observaciones="Visita sin tarjeta"))
+
+    encontrados = client.get("/registros/search", params={"q": "tarjeta"}).json()
+    assert sorted(r["id_registro"] for r in encontrados) == [1, 3]
+    assert client.get("/registros/search", params={"q": "danada"}).json()[0]["fragmento"].startswith("Tarjeta [dañada]")
+
+
+def test_clear_tables_conserva_la_integridad_del_indice():
+    controller.add(UsuariosCreate(id_usuario=1, nombre_completo="Ana", estado=True))
+    controller.clear_tables()
+    assert client.get("/usuarios/search", params={"q": "ana"}).json() == []
+    for fts in ("UsuariosFTS", "RegistrosFTS"):
+        # Lanza si el índice no coincide con su tabla de contenido
+        controller.conn.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('integrity-check', 1)")
+    with pytest.raises(sqlite3.OperationalError):
+        controller.conn.execute("SELECT * FROM UsuariosFTS WHERE UsuariosFTS MATCH 'NEAR('").fetchall()
@@ -0,0 +1,113 @@
+import base64
+from pathlib import Path
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.api.main import app
+from backend.app.core.admission import control_admision
+from backend.app.core.auth import encode_token
+from backend.app.core.conf import headers
+from backend.app.logic.universal_controller_instance import UniversalController
+from backend.app.logic.verification import VerificadorHuella, ranking_top_k
+from backend.app.models.biometria import BiometriaCreate
+
+client = TestClient(app)
+test_controller = UniversalController()
+
+TEMPLATE_PATH = Path("backend/app/tests/data/template_b64.txt")
+
+
+@pytest.fixture(autouse=True)
+def limpiar_db():
+    test_controller.clear_tables()
+    yield
+    test_controller.clear_tables()
+
+
+def test_ranking_top_k_coincide_con_ordenacion_completa():
+    rng = np.random.default_rng(3)
+    usuarios = rng.integers(0, 300, 2000)
+    scores = rng.random(2000)
+    ranking = ranking_top_k(usuarios, scores, 5)
+
+    # Referencia: mejor score por usuario con ordenación completa
+    mejores = {}
+    for u, s in zip(usuarios.tolist(), scores.tolist()):
+        mejores[u] = max(s, mejores.get(u, -1))
+    esperado = sorted(mejores.items(), key=lambda item: -item[1])[:6]
+
+    assert [c["usuario_id"] for c in ranking] == [u for u, _ in esperado[:5]]
+    assert ranking[0]["margen"] == pytest.approx(esperado[0][1] - esperado[1][1])
+    assert ranking[4]["margen"] == pytest.approx(esperado[4][1] - esperado[5][1])
+    assert ranking_top_k(np.array([7]), np.array([0.5]), 3) == [{"usuario_id": 7, "score": 0.5, "margen": None}]
+
+
+def test_candidatos_camara_ordenados_con_scores():
+    rng = np.random.default_rng(11)
+    embeddings = {id_usuario: rng.standard_normal(128).astype(np.float32) for id_usuario in (501, 502, 503)}
+    for id_usuario, embedding in embeddings.items():
+        assert client.post("/biometria/create", data={
+            "id_usuario": id_usuario,
+            "vector_facial": base64.b64encode(embedding.tobytes()).decode(),
+        }).status_code == 200
+
+    # Sonda cercana a 502 pero no idéntica: /acceso/camara la rechazaría (otro facial_hash)
+    sonda = embeddings[502] + 0.1 * rng.standard_normal(128).astype(np.float32)
+    resp = client.post("/acceso/camara/candidates",
+                       params={"vector": base64.b64encode(sonda.astype(np.float32).tobytes()).decode(), "k": 2},
+                       headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["medio"] == "camara"
+    assert data["umbral"] == pytest.approx(0.70)
+    assert [c["usuario_id"] for c in data["candidatos"]] == [502, data["candidatos"][1]["usuario_id"]]
+    assert data["candidatos"][0]["score"] > 0.9
+    assert data["candidatos"][0]["margen"] > 0.5
+    assert data["candidatos"][1]["margen"] is not None
+
+    invalido = client.post("/acceso/camara/candidates",
+                           params={"vector": base64.b64encode(np.zeros(10, np.float32).tobytes()).decode()},
+                           headers=headers)
+    assert invalido.status_code == 422
+
+
+def test_candidatos_huella_y_puntuacion_vectorizada():
+    tpl = "".join(TEMPLATE_PATH.read_text(encoding="utf-8").split())
+    rng = np.random.default_rng(5)
+    otros = [base64.b64encode(rng.integers(0, 256, 512, dtype=np.uint8).tobytes()).decode() for _ in range(3)]
+    test_controller.add(BiometriaCreate(id_biometria=1, id_usuario=1, template_huella=tpl))
+    for k, otro in enumerate(otros, start=2):
+        test_controller.add(BiometriaCreate(id_biometria=k, id_usuario=k, template_huella=otro))
+
+    resp = client.post("/acceso/huella/candidates", json={"vector": tpl, "k": 3}, headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["medio"] == "huella"
+    assert len(data["candidatos"]) == 3
+    assert data["candidatos"][0]["usuario_id"] == 1
+    assert data["candidatos"][0]["score"] == pytest.approx(1.0)
+
+    # La puntuación vectorizada coincide con la correlación template a template
+    verificador = VerificadorHuella()
+    usuarios, scores, usar_vector = verificador._puntuar(otros[0])
+    sonda = verificador._decode_vector(otros[0])
+    templates = dict(zip([1, 2, 3, 4], [tpl, *otros]))
+    assert usar_vector
+    for id_usuario, score in zip(usuarios.tolist(), scores.tolist()):
+        esperado = verificador._similitud_vectorial(sonda, verificador._decode_vector(templates[id_usuario]))
+        assert score == pytest.approx(esperado)
+
+
+def test_candidatos_requieren_rol_de_revision_y_estan_limitados(monkeypatch):
+    vector = base64.b64encode(np.ones(128, np.float32).tobytes()).decode()
+    pasajero = {"Authorization": f"Bearer {encode_token({'sub': '900', 'scope': 'pasajero'})}"}
+    for ruta, kwargs in (("/acceso/camara/candidates", {"params": {"vector": vector}}),
+                         ("/acceso/huella/candidates", {"json": {"vector": vector}})):
+        assert client.post(ruta, **kwargs).status_code == 401
+        assert client.post(ruta, headers=pasajero, **kwargs).status_code == 403
+
+    limitadas = []
+    monkeypatch.setattr(control_admision, "limitar", limitadas.append)
+    operario = {"Authorization": f"Bearer {encode_token({'sub': '901', 'scope': 'operario'})}"}
+    assert client.post("/acceso/camara/candidates", params={"vector": vector}, headers=operario).status_code == 200
+    assert limitadas == ["revisor:901"]
@@ -0,0 +1,82 @@
+import base64
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.api.routes.credenciales.credenciales_query import app as credenciales_router
+from backend.app.logic.universal_controller_instance import UniversalController
+from backend.app.models.biometria import BiometriaCreate
+from backend.app.models.usuarios import UsuariosCreate
+
+test_controller = UniversalController()
+
+app_for_test = FastAPI()
+app_for_test.include_router(credenciales_router)
+client = TestClient(app_for_test)
+
+
+@pytest.fixture(autouse=True)
+def limpiar_db():
+    test_controller.clear_tables()
+    yield
+    test_controller.clear_tables()
+
+
+def test_snapshot_completo_con_faciales():
+    embedding = np.random.default_rng(1).standard_normal(128).astype(np.float32)
+    test_controller.add(UsuariosCreate(id_usuario=1, nombre_completo="Ana", estado=True))
+    test_controller.add(BiometriaCreate(id_biometria=1, id_usuario=1, rfid_tag="TAG1",
+                                        vector_facial=base64.b64encode(embedding.tobytes()).decode()))
+    test_controller.add(BiometriaCreate(id_biometria=2, id_usuario=2))  # sin credenciales
+
+    resp = client.get("/credenciales/snapshot", params={"incluir_faciales": True})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["completo"] is True
+    assert [e["id"] for e in data["altas"]] == [1]
+    q = np.frombuffer(base64.b64decode(data["altas"][0]["f"]), dtype=np.int8) / data["escala_facial"]
+    assert np.dot(q, embedding / np.linalg.norm(embedding)) > 0.99
+
+
+def test_delta_y_304():
+    test_controller.add(UsuariosCreate(id_usuario=1, nombre_completo="Ana", estado=True))
+    test_controller.add(BiometriaCreate(id_biometria=1, id_usuario=1, rfid_tag="TAG1"))
+    snapshot = client.get("/credenciales/snapshot")
+    version, etag = snapshot.json()["version"], snapshot.headers["etag"]
+
+    sin_cambios = client.get("/credenciales/snapshot", params={"since_version": version},
+                             headers={"If-None-Match": etag})
+    assert sin_cambios.status_code == 304
+
+    test_controller.add(BiometriaCreate(id_biometria=2, id_usuario=1, rfid_tag="TAG2"))
+    test_controller.update(UsuariosCreate(id_usuario=1, nombre_completo="Ana", estado=False))
+
+    delta = client.get("/credenciales/snapshot", params={"since_version": version},
+                       headers={"If-None-Match": etag})
+    assert delta.status_code == 200
+    data = delta.json()
+    assert data["completo"] is False
+    assert data["version"] > version
+    assert data["altas"] == []
+    assert data["bajas"] == [1, 2]  # usuario desactivado: todas sus credenciales salen
+
+
+def test_version_desconocida_devuelve_snapshot():
+    test_controller.add(UsuariosCreate(id_usuario=1, nombre_completo="Ana", estado=True))
+    test_controller.add(BiometriaCreate(id_biometria=1, id_usuario=1, rfid_tag="TAG1"))
+    data = client.get("/credenciales/snapshot", params={"since_version": 10**9}).json()
+    assert data["completo"] is True
+    assert data["altas"] == [{"id": 1, "u": 1, "rfid": "TAG1"}]
+
+
+def test_usuario_inexistente_o_borrado_no_exporta_credenciales():
+    test_controller.add(UsuariosCreate(id_usuario=1, nombre_completo="Ana", estado=True))
+    test_controller.add(BiometriaCreate(id_biometria=1, id_usuario=1, rfid_tag="TAG1"))
+    test_controller.add(BiometriaCreate(id_biometria=2, id_usuario=2, rfid_tag="TAG2"))  # usuario que no existe
+    snapshot = client.get("/credenciales/snapshot").json()
+    assert [e["id"] for e in snapshot["altas"]] == [1]
+
+    test_controller.delete(UsuariosCreate(id_usuario=1))
+    delta = client.get("/credenciales/snapshot", params={"since_version": snapshot["version"]}).json()
+    assert delta["completo"] is False
+    assert delta["altas"] == [] and delta["bajas"] == [1]
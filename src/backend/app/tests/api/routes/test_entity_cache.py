@@ -0,0 +1,86 @@
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.api.main import app
+from backend.app.logic.universal_controller_instance import universal_controller as controller, vigilante_cambios
+from backend.app.logic.universal_controller_server import DB_FILE, UniversalController
+from backend.app.models.torniquetes import TorniquetesCreate
+from backend.app.models.usuarios import UsuariosCreate, UsuariosOut
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def limpiar_db():
+    controller.clear_tables()
+    yield
+    controller.clear_tables()
+
+
+def test_etag_y_304_sin_acceso_a_la_base():
+    controller.add(UsuariosCreate(id_usuario=1, nombre_completo="Ana", estado=True))
+    primera = client.get("/usuarios/all")
+    etag = primera.headers["ETag"]
+    assert [u["nombre_completo"] for u in primera.json()] == ["Ana"]
+
+    assert client.get("/usuarios/all", headers={"If-None-Match": etag}).status_code == 304
+
+    # Con la caché caliente ni el ETag ni la lectura tocan la base de datos
+    controller.read_all(UsuariosOut)
+    consultas = []
+    controller.conn.set_trace_callback(consultas.append)
+    try:
+        assert controller.etag(UsuariosOut) == etag
+        assert controller.read_all(UsuariosOut)[0]["nombre_completo"] == "Ana"
+    finally:
+        controller.conn.set_trace_callback(None)
+    assert consultas == []
+
+    # Una escritura cambia la generación de la tabla y por tanto el ETag
+    controller.update(UsuariosCreate(id_usuario=1, nombre_completo="Ana María", estado=True))
+    nueva = client.get("/usuarios/all", headers={"If-None-Match": etag})
+    assert nueva.status_code == 200
+    assert nueva.headers["ETag"] != etag
+    assert nueva.json()[0]["nombre_completo"] == "Ana María"
+
+
+def test_by_id_cacheado_e_invalidado():
+    controller.add(TorniquetesCreate(id_torniquete=1, tipo="A", ubicacion="Norte", estado=True))
+    assert client.get("/torniquetes/by_id", params={"id_torniquete": 1}).json()["ubicacion"] == "Norte"
+    etag = client.get("/torniquetes/by_id", params={"id_torniquete": 1}).headers["ETag"]
+    assert client.get("/torniquetes/by_id", params={"id_torniquete": 1},
+                      headers={"If-None-Match": etag}).status_code == 304
+
+    controller.delete(TorniquetesCreate(id_torniquete=1))
+    assert client.get("/torniquetes/by_id", params={"id_torniquete": 1}).json() is None
+
+
+def test_escrituras_de_otro_worker_invalidan_la_cache():
+    controller.add(UsuariosCreate(id_usuario=1, nombre_completo="Ana", estado=True))
+    lector = UniversalController()
+    assert lector.get_by_id(UsuariosOut, 1).nombre_completo == "Ana"
+
+    otro_worker = sqlite3.connect(DB_FILE)
+    otro_worker.execute("UPDATE Usuarios SET nombre_completo = 'Eva' WHERE id_usuario = 1")
+    otro_worker.commit()
+    otro_worker.close()
+    vigilante_cambios.sincronizar()  # lo que hace el sondeo periódico
+
+    assert lector.get_by_id(UsuariosOut, 1).nombre_completo == "Eva"
+
+
+def test_instantaneas_de_lectura_no_consultan_la_generacion_tras_una_escritura():
+    controller.add(UsuariosCreate(id_usuario=1, nombre_completo="Ana", estado=True))
+    lector = UniversalController(solo_lectura=True)
+    consultas = []
+    try:
+        with lector.instantanea():
+            etag = lector.etag(UsuariosOut)  # la primera instantánea fija la generación
+        lector.conn.set_trace_callback(consultas.append)
+        for _ in range(3):
+            with lector.instantanea():
+                assert lector.etag(UsuariosOut) == etag
+    finally:
+        lector.conn.set_trace_callback(None)
+        lector.cerrar()
+    assert not [c for c in consultas if "RegistroCambios" in c]
@@ -0,0 +1,55 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.api.main import app
+from backend.app.core.responses import RespuestaJSON, orjson
+from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.models.biometria import BiometriaCreate, BiometriaOut
+from backend.app.models.registros import RegistrosCreate, RegistrosOut
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def limpiar_db():
+    controller.clear_tables()
+    yield
+    controller.clear_tables()
+
+
+def test_registros_all_serializado_por_sqlite_igual_que_read_all():
+    assert client.get("/registros/all").json() == []
+    controller.add(RegistrosCreate(id_registro=1, id_usuario=7, id_torniquete=2, fecha_hora="2025-10-20 08:00:00",
+                                   tipo_acceso="rfid", resultado=True, observaciones='comillas "y" ñ'))
+    controller.add(RegistrosCreate(id_registro=2, id_usuario=8, id_torniquete=2, resultado=False))
+
+    respuesta = client.get("/registros/all")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"] == "application/json"
+    assert respuesta.json() == controller.read_all(RegistrosOut)
+    assert respuesta.json()[0]["observaciones"] == 'comillas "y" ñ'
+
+
+def test_biometria_all_cacheado_hasta_la_siguiente_escritura():
+    controller.add(BiometriaCreate(id_biometria=1, id_usuario=1, rfid_tag="A1"))
+    assert json.loads(controller.read_all_json(BiometriaOut)) == controller.read_all(BiometriaOut)
+
+    # Con la caché caliente el cuerpo se sirve sin consultar la base de datos
+    consultas = []
+    controller.conn.set_trace_callback(consultas.append)
+    try:
+        cuerpo = controller.read_all_json(BiometriaOut)
+    finally:
+        controller.conn.set_trace_callback(None)
+    assert consultas == []
+
+    controller.add(BiometriaCreate(id_biometria=2, id_usuario=2, rfid_tag="B2"))
+    assert controller.read_all_json(BiometriaOut) != cuerpo
+    assert [b["rfid_tag"] for b in client.get("/biometria/all").json()] == ["A1", "B2"]
+
+
+def test_clase_de_respuesta_por_defecto():
+    ruta = next(r for r in app.routes if getattr(r, "path", None) == "/usuarios/all")
+    assert ruta.response_class is RespuestaJSON
+    if orjson is not None:
+        assert RespuestaJSON.__name__ == "ORJSONResponse"
@@ -0,0 +1,87 @@
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.api.main import app
+from backend.app.logic.universal_controller_instance import universal_controller as controller
+from backend.app.logic.migrations import _m003_rollups_trafico, _m008_trafico_sin_torniquete
+from backend.app.logic.query_plan import plan_de
+from backend.app.models.registros import RegistrosCreate, RegistrosOut
+
+client = TestClient(app)
+
+RANGO = {"desde": "2025-10-20T00:00:00", "hasta": "2025-10-21T00:00:00"}
+
+
+@pytest.fixture(autouse=True)
+def limpiar_db():
+    controller.clear_tables()
+    yield
+    controller.clear_tables()
+
+
+def _registro(id_registro, id_torniquete, fecha_hora, tipo_acceso, resultado=True):
+    item = RegistrosCreate(id_registro=id_registro, id_usuario=1, id_torniquete=id_torniquete,
+                           fecha_hora=fecha_hora, tipo_acceso=tipo_acceso, resultado=resultado)
+    controller.add(item)
+    return item
+
+
+def test_contadores_por_hora_y_ocupacion():
+    _registro(1, 1, "2025-10-20T08:05:00", "entrada")
+    _registro(2, 1, "2025-10-20T08:40:00", "Entrada")
+    _registro(3, 2, "2025-10-20T08:59:59", "entrada", resultado=False)
+    _registro(4, 2, "2025-10-20 09:10:00", "salida")
+
+    filas = client.get("/trafico/por_hora", params=RANGO).json()
+    assert filas == [
+        {"id_torniquete": 1, "hora": "2025-10-20 08:00", "entradas": 2, "salidas": 0, "denegados": 0},
+        {"id_torniquete": 2, "hora": "2025-10-20 08:00", "entradas": 0, "salidas": 0, "denegados": 1},
+        {"id_torniquete": 2, "hora": "2025-10-20 09:00", "entradas": 0, "salidas": 1, "denegados": 0},
+    ]
+    assert client.get("/trafico/por_hora", params={**RANGO, "id_torniquete": 2}).json()[0]["denegados"] == 1
+    assert client.get("/trafico/ocupacion").json()["dentro"] == 1
+
+    totales = client.get("/trafico/totales", params=RANGO).json()
+    assert totales == [
+        {"id_torniquete": 1, "entradas": 2, "salidas": 0, "denegados": 0},
+        {"id_torniquete": 2, "entradas": 0, "salidas": 1, "denegados": 1},
+    ]
+
+
+def test_update_y_delete_mantienen_contadores():
+    item = _registro(1, 1, "2025-10-20T08:05:00", "entrada")
+    _registro(2, 1, "2025-10-20T08:10:00", "entrada")
+
+    item.tipo_acceso = "salida"
+    controller.update(item)
+    assert client.get("/trafico/ocupacion").json()["dentro"] == 0
+    fila = client.get("/trafico/por_hora", params=RANGO).json()[0]
+    assert (fila["entradas"], fila["salidas"]) == (1, 1)
+
+    controller.delete(item)
+    assert client.get("/trafico/ocupacion").json()["dentro"] == 1
+    fila = client.get("/trafico/por_hora", params=RANGO).json()[0]
+    assert (fila["entradas"], fila["salidas"]) == (1, 0)
+
+
+def test_rango_invalido():
+    resp = client.get("/trafico/por_hora", params={"desde": RANGO["hasta"], "hasta": RANGO["desde"]})
+    assert resp.status_code == 400
+
+
+
+def test_registro_sin_torniquete_solo_cuenta_en_ocupacion(tmp_path):
+    # Registros creada desde el modelo (id_torniquete admite NULL), como en una base nueva
+    conn = sqlite3.connect(tmp_path / "scratch.db")
+    conn.execute(plan_de(RegistrosOut).sql_crear)
+    _m003_rollups_trafico(conn)
+    _m008_trafico_sin_torniquete(conn)
+    conn.execute(
+        "INSERT INTO Registros (id_usuario, fecha_hora, tipo_acceso, resultado) VALUES (?, ?, ?, ?)",
+        (1, "2025-10-20T08:05:00", "entrada", True),
+    )
+    assert conn.execute("SELECT count(*) FROM TraficoHorario").fetchone()[0] == 0
+    assert conn.execute("SELECT dentro FROM Ocupacion").fetchone()[0] == 1
+    conn.execute("DELETE FROM Registros")
+    assert conn.execute("SELECT dentro FROM Ocupacion").fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from backend.app.api.main import app
+from backend.app.core.admission import ControlAdmision, LimitadorTokens, control_admision
+
+client = TestClient(app)
+
+
+def test_limitador_admite_rafaga_y_luego_espera():
+    limitador = LimitadorTokens(tasa=2, rafaga=3)
+    assert [limitador.consumir("a") for _ in range(3)] == [0, 0, 0]
+    espera = limitador.consumir("a")
+    assert 0 < espera <= 0.5
+    assert limitador.consumir("b") == 0  # cada dispositivo tiene su propia cubeta
+
+
+def test_limitador_acota_claves():
+    limitador = LimitadorTokens(tasa=1, rafaga=1, max_claves=2)
+    for clave in ("a", "b", "c"):
+        limitador.consumir(clave)
+    assert list(limitador._cubetas) == ["b", "c"]
+
+
+def test_verificacion_rechaza_con_503_si_no_hay_hueco():
+    control = ControlAdmision(tasa=1, rafaga=1, concurrencia=1, espera=0.01)
+
+    async def escenario():
+        async with control.verificacion():
+            with pytest.raises(HTTPException) as exc:
+                async with control.verificacion():
+                    pass
+            return exc.value
+
+    error = asyncio.run(escenario())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert control.rechazos_carga == 1
+
+
+def test_dispositivo_en_bucle_recibe_429():
+    params = {"dispositivo_id": "ESP32_BUCLE", "vector": "no-es-un-vector"}
+    rafaga = int(control_admision.limitador.rafaga)
+    codigos = [client.post("/acceso/camara", params=params).status_code for _ in range(rafaga + 1)]
+    assert codigos[:rafaga] == [200] * rafaga
+    assert codigos[-1] == 429
+
+    limitada = client.post("/acceso/camara", params=params)
+    assert int(limitada.headers["Retry-After"]) >= 1
+    # Otro dispositivo no se ve afectado
+    assert client.post("/acceso/camara", params={**params, "dispositivo_id": "ESP32_OK"}).status_code == 200
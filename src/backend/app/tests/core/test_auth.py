@@ -0,0 +1,124 @@
+import time
+import pytest
+from fastapi import HTTPException
+from fastapi.security import SecurityScopes
+from jose import jwt
+from starlette.requests import Request
+from backend.app.core import auth
+from backend.app.core.auth import encode_token, get_current_user, token_cache
+from backend.app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+@pytest.fixture
+def decodificaciones(monkeypatch):
+    """Cuenta las verificaciones completas de firma."""
+    llamadas = []
+    original = jwt.decode
+
+    def contar(*args, **kwargs):
+        llamadas.append(args[0])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", contar)
+    return llamadas
+
+
+def _usuario(token: str) -> dict:
+    request = Request({"type": "http", "headers": []})
+    return get_current_user(SecurityScopes(), request, token)
+
+
+def test_token_valido_se_verifica_una_sola_vez(decodificaciones):
+    token = encode_token({"sub": "001", "scope": "system", "exp": time.time() + 60})
+    for _ in range(5):
+        assert _usuario(token) == {"sub": "001", "scope": "system"}
+    assert len(decodificaciones) == 1
+
+
+def test_token_expirado_se_rechaza():
+    token = encode_token({"sub": "001", "scope": "system", "exp": time.time() - 1})
+    with pytest.raises(HTTPException) as exc:
+        _usuario(token)
+    assert exc.value.status_code == 401
+
+
+def test_la_cache_no_sobrevive_al_exp(monkeypatch, decodificaciones):
+    exp = time.time() + 60
+    token = encode_token({"sub": "001", "scope": "system", "exp": exp})
+    _usuario(token)
+    monkeypatch.setattr(auth.time, "time", lambda: exp)
+    _usuario(token)  # la firma (y el exp) se vuelven a verificar con jose
+    assert len(decodificaciones) == 2
+
+
+def test_token_alterado_se_rechaza_aunque_el_original_este_en_cache():
+    token = encode_token({"sub": "001", "scope": "system"})
+    _usuario(token)
+    cabecera, cuerpo, firma = token.split(".")
+    otro_cuerpo = jwt.encode({"sub": "001", "scope": "administrador"}, "otra-clave").split(".")[1]
+    for alterado in (f"{cabecera}.{cuerpo}.{firma[::-1]}", f"{cabecera}.{otro_cuerpo}.{firma}"):
+        with pytest.raises(HTTPException) as exc:
+            _usuario(alterado)
+        assert exc.value.status_code == 401
+
+
+def test_revocacion_de_token_y_de_sujeto():
+    token = encode_token({"sub": "001", "scope": "system", "iat": int(time.time()) - 5})
+    _usuario(token)
+    token_cache.revoke_token(token)
+    with pytest.raises(HTTPException):
+        _usuario(token)
+
+    otro = encode_token({"sub": "002", "scope": "operario", "iat": int(time.time()) - 5})
+    _usuario(otro)
+    token_cache.revoke_subject("002")
+    with pytest.raises(HTTPException):
+        _usuario(otro)
+    # Un token emitido después de la revocación vuelve a valer
+    nuevo = encode_token({"sub": "002", "scope": "operario", "iat": time.time() + 1})
+    assert _usuario(nuevo)["sub"] == "002"
+
+
+def test_encode_token_fija_iat_y_exp():
+    antes = int(time.time())
+    claims = jwt.get_unverified_claims(encode_token({"sub": "001", "scope": "system"}))
+    assert antes <= claims["iat"] <= time.time()
+    assert claims["exp"] == claims["iat"] + settings.AUTH_TOKEN_MAX_AGE
+    # Un exp explícito se respeta
+    assert jwt.get_unverified_claims(encode_token({"sub": "001", "exp": antes + 5}))["exp"] == antes + 5
+
+
+def test_revocacion_de_sujeto_caduca_tras_la_vida_maxima(monkeypatch):
+    cache = auth.TokenCache(max_token_age=60)
+    ahora = time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: ahora)
+    cache.revoke_subject("002")
+    sin_iat = {"sub": "002", "scope": "operario"}
+    assert cache.is_revoked("t", sin_iat)
+
+    # Pasada la vida máxima ya no queda ningún token anterior: la revocación se olvida
+    monkeypatch.setattr(auth.time, "time", lambda: ahora + 60)
+    assert not cache.is_revoked("t", sin_iat)
+    assert cache._revoked_subjects == {}
+
+    # Las revocaciones caducadas se purgan también al revocar otros sujetos
+    cache.revoke_subject("003")
+    monkeypatch.setattr(auth.time, "time", lambda: ahora + 130)
+    cache.revoke_subject("004")
+    assert list(cache._revoked_subjects) == ["004"]
+
+
+def test_cache_acotada():
+    pequena = auth.TokenCache(max_size=2)
+    for i in range(3):
+        pequena.put(f"t{i}", {"sub": str(i)})
+    assert pequena.get("t0") is None
+    assert pequena.get("t2") == {"sub": "2"}
+    assert settings.AUTH_CACHE_SIZE == token_cache.max_size
@@ -0,0 +1,113 @@
+import asyncio
+import sqlite3
+import threading
+import time
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from backend.app.core.lanes import Carril, carriles, ruta_carril
+from backend.app.logic.universal_controller_instance import universal_controller
+from backend.app.logic.universal_controller_server import UniversalController
+from backend.app.models.torniquetes import TorniquetesCreate, TorniquetesOut
+
+router = APIRouter(prefix="/prueba", route_class=ruta_carril("reportes"))
+
+
+@router.get("/hilo")
+async def hilo():
+    return {"hilo": threading.current_thread().name, "conexion": id(universal_controller.conn)}
+
+
+@router.get("/lento")
+def lento():
+    time.sleep(0.3)
+    return {"ok": True}
+
+
+@router.get("/instantanea")
+def instantanea():
+    antes = len(universal_controller.read_rows(TorniquetesOut))
+    # Un escritor confirma mientras la petición lee: no espera al lector ni el lector lo ve
+    escritor = UniversalController()
+    try:
+        escritor.add(TorniquetesCreate(tipo="prueba", ubicacion="instantanea", estado=True))
+    finally:
+        escritor.cerrar()
+    return {"antes": antes, "despues": len(universal_controller.read_rows(TorniquetesOut))}
+
+
+@router.post("/escribir")
+def escribir():
+    universal_controller.add(TorniquetesCreate(tipo="prueba", ubicacion="solo lectura", estado=True))
+
+
+rapido = APIRouter()
+
+
+@rapido.get("/rapido")
+async def ruta_rapida():
+    return await carriles["acceso"].ejecutar(lambda: {"ok": True})
+
+
+app = FastAPI()
+app.include_router(router)
+app.include_router(rapido)
+
+
+def test_endpoint_corre_en_su_carril_con_conexion_propia():
+    data = TestClient(app).get("/prueba/hilo").json()
+    assert data["hilo"].startswith("carril-reportes")
+    assert data["conexion"] != id(universal_controller.conn)
+
+
+def test_informes_lentos_no_retrasan_el_carril_de_acceso():
+    async def escenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            informes = [asyncio.create_task(client.get("/prueba/lento")) for _ in range(4)]
+            await asyncio.sleep(0.05)
+            inicio = time.perf_counter()
+            assert (await client.get("/rapido")).status_code == 200
+            latencia = time.perf_counter() - inicio
+            await asyncio.gather(*informes)
+            return latencia
+
+    assert asyncio.run(escenario()) < 0.2
+
+
+def test_carril_saturado_responde_503():
+    carril = Carril("pruebas", concurrencia=1, max_pendientes=1)
+    evento = threading.Event()
+
+    async def escenario():
+        bloqueada = asyncio.create_task(carril.ejecutar(evento.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as exc:
+            await carril.ejecutar(lambda: None)
+        evento.set()
+        await bloqueada
+        return exc.value
+
+    try:
+        error = asyncio.run(escenario())
+    finally:
+        carril.detener()
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+
+
+def test_consultas_de_una_peticion_ven_la_misma_instantanea():
+    try:
+        data = TestClient(app).get("/prueba/instantanea").json()
+        assert data["despues"] == data["antes"]
+        assert len(universal_controller.read_rows(TorniquetesOut)) == data["antes"] + 1
+    finally:
+        universal_controller.conn.execute("DELETE FROM Torniquetes WHERE tipo = 'prueba'")
+        universal_controller.conn.commit()
+        UniversalController.cache.invalidar("Torniquetes")
+
+
+def test_carril_de_reportes_no_admite_escrituras():
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        TestClient(app).post("/prueba/escribir")
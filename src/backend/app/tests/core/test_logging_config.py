@@ -0,0 +1,71 @@
+import json
+import logging
+import queue
+import pytest
+from backend.app.core import logging_config
+from backend.app.core.logging_config import JSONFormatter, FiltroMuestreo, ColaHandler, setup_logging, stop_logging
+
+
+def _record(level=logging.INFO, msg="hola %s", args=("mundo",), **extra):
+    record = logging.LogRecord("prueba", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_incluye_campos_extra():
+    linea = JSONFormatter().format(_record(evento="acceso", usuario_id=7))
+    data = json.loads(linea)
+    assert data["msg"] == "hola mundo"
+    assert data["level"] == "INFO"
+    assert data["evento"] == "acceso"
+    assert data["usuario_id"] == 7
+
+
+def test_filtro_muestreo_por_nivel():
+    filtro = FiltroMuestreo({logging.DEBUG: 0.0})
+    assert filtro.filter(_record(level=logging.DEBUG)) is False
+    assert filtro.filter(_record(level=logging.INFO)) is True
+
+
+def test_cola_handler_no_bloquea_y_fija_el_mensaje():
+    handler = ColaHandler(queue.Queue(maxsize=1))
+    datos = ["mundo"]
+    original = _record(args=(datos,))
+    handler.handle(original)
+    handler.handle(_record())  # la cola está llena: se descarta sin bloquear
+    assert handler.descartados == 1
+    datos.append("cambiado")  # el llamador modifica sus argumentos después de registrar
+    pendiente = handler.queue.get_nowait()
+    assert pendiente.getMessage() == "hola ['mundo']" and pendiente.args is None
+    assert original.args == (datos,)  # el registro original no se modifica
+
+
+@pytest.fixture
+def raiz_intacta():
+    """setup_logging reemplaza los handlers del logger raíz: se restauran al terminar."""
+    raiz = logging.getLogger()
+    handlers, nivel = list(raiz.handlers), raiz.level
+    yield raiz
+    stop_logging()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    for handler in handlers:
+        raiz.addHandler(handler)
+    raiz.setLevel(nivel)
+
+
+def test_stop_logging_quita_el_handler_y_setup_lo_reinstala(raiz_intacta, capfd):
+    stop_logging()
+    setup_logging()
+    primero = logging_config._handler
+    assert primero in raiz_intacta.handlers
+
+    stop_logging()
+    assert primero not in raiz_intacta.handlers
+    logging.getLogger("prueba").warning("tras el cierre")  # no queda retenido en una cola sin escritor
+    assert primero.queue.empty()
+
+    setup_logging()
+    logging.getLogger("prueba").warning("reinstalado")
+    stop_logging()
+    assert "reinstalado" in capfd.readouterr().err
@@ -0,0 +1,109 @@
+import time
+import cv2
+import numpy as np
+import pytest
+from backend.app.edge.camera_capture import ServicioCaptura, guardar_frame
+
+FPS = 50
+
+
+@pytest.fixture
+def video(tmp_path):
+    """Video MJPG cuyo frame n tiene el valor n en el canal azul: sustituye a la cámara."""
+    ruta = str(tmp_path / "camara.avi")
+    writer = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (64, 48))
+    for n in range(100):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[:, :, 0] = n * 2
+        writer.write(frame)
+    writer.release()
+    return ruta
+
+
+def test_entrega_el_frame_mas_reciente_al_instante(video):
+    servicio = ServicioCaptura(video, capacidad=4)
+    servicio.iniciar()
+    try:
+        assert servicio.ultimo_frame(timeout=2) is not None
+        time.sleep(0.1)
+
+        inicio = time.perf_counter()
+        instante, frame = servicio.ultimo_frame()
+        assert time.perf_counter() - inicio < 0.05
+        assert frame.shape == (48, 64, 3)
+        assert time.time() - instante < 0.2
+
+        # El buffer avanza con el video y conserva el orden de captura
+        time.sleep(0.1)
+        recientes = servicio.recientes()
+        assert len(recientes) == 3
+        assert [t for t, _ in recientes] == sorted(t for t, _ in recientes)
+        assert recientes[-1][0] > instante
+    finally:
+        servicio.detener()
+
+
+def test_frame_posterior_al_disparo(video, tmp_path):
+    servicio = ServicioCaptura(video)
+    servicio.iniciar()
+    try:
+        servicio.ultimo_frame(timeout=2)
+        disparo = time.time()
+        instante, frame = servicio.frame_posterior(disparo, timeout=1)
+        assert instante >= disparo
+        assert guardar_frame(frame, str(tmp_path), instante).endswith(".png")
+    finally:
+        servicio.detener()
+
+
+def test_fuente_inexistente_no_bloquea():
+    servicio = ServicioCaptura("/no/existe.avi", reintento=0.05)
+    servicio.iniciar()
+    try:
+        assert servicio.ultimo_frame(timeout=0.1) is None
+    finally:
+        servicio.detener()
+
+
+class CamaraQueCambiaDeResolucion:
+    """Como cv2.VideoCapture: si `destino` no tiene la forma del frame, devuelve un array nuevo."""
+
+    def __init__(self, cambio: int = 5):
+        self.cambio = cambio
+        self.leidos = 0
+
+    def get(self, propiedad):
+        return 0
+
+    def release(self):
+        pass
+
+    def read(self, destino=None):
+        self.leidos += 1
+        time.sleep(0.002)
+        forma = (48, 64, 3) if self.leidos <= self.cambio else (96, 128, 3)
+        frame = np.full(forma, self.leidos % 256, dtype=np.uint8)
+        if destino is not None and destino.shape == forma:
+            destino[...] = frame
+            return True, destino
+        return True, frame
+
+
+def test_cambio_de_resolucion_reasigna_el_buffer():
+    camara = CamaraQueCambiaDeResolucion()
+    servicio = ServicioCaptura(0, capacidad=4)
+    servicio._abrir = lambda: camara
+    servicio.iniciar()
+    try:
+        limite = time.monotonic() + 2
+        while time.monotonic() < limite and camara.leidos < 20:
+            time.sleep(0.01)
+        instante, frame = servicio.ultimo_frame()
+        recientes = servicio.recientes()
+    finally:
+        servicio.detener()
+
+    # Sin reasignar, el buffer seguiría sirviendo el último frame de 64x48 con instantes nuevos
+    assert frame.shape == (96, 128, 3)
+    assert int(frame[0, 0, 0]) > camara.cambio
+    assert all(f.shape == (96, 128, 3) for _, f in recientes)
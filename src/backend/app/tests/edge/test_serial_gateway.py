@@ -0,0 +1,224 @@
+import asyncio
+import base64
+import os
+import sys
+import httpx
+import numpy as np
+import pytest
+from backend.app.edge.serial_gateway import GatewaySerial, Puerta
+
+# La pasarela usa termios y add_reader: solo POSIX
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="GatewaySerial requiere POSIX")
+
+
+class CapturaFija:
+    """Sustituye a ServicioCaptura: siempre entrega el mismo frame."""
+
+    def __init__(self, valor: int):
+        self.frame = np.full((48, 64, 3), valor, dtype=np.uint8)
+
+    def iniciar(self):
+        pass
+
+    def detener(self):
+        pass
+
+    def ultimo_frame(self, timeout: float = 0.0):
+        return 0.0, self.frame.copy()
+
+
+class CapturaVacia(CapturaFija):
+    """Cámara que todavía no entregó ningún frame."""
+
+    def ultimo_frame(self, timeout: float = 0.0):
+        return None
+
+
+def extractor(frame: np.ndarray) -> np.ndarray:
+    # Embedding ficticio: identifica la cámara por el valor de sus píxeles
+    return np.full(128, float(frame[0, 0, 0]), dtype=np.float32)
+
+
+def _pty():
+    maestro, esclavo = os.openpty()
+    return maestro, esclavo, os.ttyname(esclavo)
+
+
+async def _leer_linea(fd: int, timeout: float = 2.0) -> bytes:
+    loop = asyncio.get_running_loop()
+    fin = loop.time() + timeout
+    datos = b""
+    while not datos.endswith(b"\n") and loop.time() < fin:
+        try:
+            datos += os.read(fd, 64)
+        except BlockingIOError:
+            await asyncio.sleep(0.01)
+    return datos
+
+
+def test_varias_puertas_reenvian_disparos_al_backend():
+    recibidas = []
+
+    def backend(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        recibidas.append(params)
+        vector = np.frombuffer(base64.b64decode(params["vector"]), dtype=np.float32)
+        concedido = params["dispositivo_id"] == "ESP32_001"
+        return httpx.Response(200, json={"status": concedido, "usuario_id": int(vector[0]) if concedido else None,
+                                         "mensaje": ""})
+
+    async def escenario():
+        ptys = [_pty(), _pty()]
+        puertas = [
+            Puerta(ptys[0][2], "ESP32_001", CapturaFija(7), id_torniquete=1, sentido="entrada"),
+            Puerta(ptys[1][2], "ESP32_002", CapturaFija(9)),
+        ]
+        cliente = httpx.AsyncClient(transport=httpx.MockTransport(backend), base_url="http://backend")
+        gateway = GatewaySerial(puertas, "http://backend", extractor, cliente=cliente)
+        await gateway.iniciar()
+        for maestro, _, _ in ptys:
+            os.set_blocking(maestro, False)
+        try:
+            # Línea partida en dos escrituras y ruido que no es un disparo
+            os.write(ptys[0][0], b"cap")
+            os.write(ptys[1][0], b"boot ok\ncapture\n")
+            await asyncio.sleep(0.05)
+            os.write(ptys[0][0], b"ture\r\n")
+
+            respuestas = [await _leer_linea(maestro) for maestro, _, _ in ptys]
+        finally:
+            await gateway.detener()
+            for maestro, esclavo, _ in ptys:
+                os.close(maestro)
+                os.close(esclavo)
+        return respuestas
+
+    respuestas = asyncio.run(escenario())
+
+    assert respuestas == [b"ACCESO 1\n", b"ACCESO 0\n"]
+    por_dispositivo = {p["dispositivo_id"]: p for p in recibidas}
+    assert len(recibidas) == 2
+    assert por_dispositivo["ESP32_001"]["sentido"] == "entrada"
+    assert por_dispositivo["ESP32_001"]["id_torniquete"] == "1"
+    assert "sentido" not in por_dispositivo["ESP32_002"]
+    vector = np.frombuffer(base64.b64decode(por_dispositivo["ESP32_002"]["vector"]), dtype=np.float32)
+    assert vector.shape == (128,) and vector[0] == 9
+
+
+def test_disparos_repetidos_durante_una_decision_se_descartan():
+    llamadas = 0
+
+    async def backend_lento(request: httpx.Request) -> httpx.Response:
+        nonlocal llamadas
+        llamadas += 1
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"status": True, "usuario_id": 1, "mensaje": ""})
+
+    async def escenario():
+        maestro, esclavo, ruta = _pty()
+        cliente = httpx.AsyncClient(transport=httpx.MockTransport(backend_lento), base_url="http://backend")
+        gateway = GatewaySerial([Puerta(ruta, "ESP32_001", CapturaFija(1))], "http://backend", extractor,
+                                cliente=cliente)
+        await gateway.iniciar()
+        try:
+            # Rebote del botón: tres disparos seguidos cuentan como uno
+            os.write(maestro, b"capture\ncapture\ncapture\n")
+            await asyncio.sleep(0.05)
+        finally:
+            await gateway.detener()
+            os.close(maestro)
+            os.close(esclavo)
+
+    asyncio.run(escenario())
+    assert llamadas == 1
+
+
+def test_sin_frame_o_sin_rostro_responde_acceso_denegado():
+    def backend(request: httpx.Request) -> httpx.Response:
+        raise AssertionError("No debe consultarse el backend")
+
+    async def escenario():
+        ptys = [_pty(), _pty()]
+        puertas = [Puerta(ptys[0][2], "ESP32_001", CapturaVacia(0)), Puerta(ptys[1][2], "ESP32_002", CapturaFija(0))]
+        cliente = httpx.AsyncClient(transport=httpx.MockTransport(backend), base_url="http://backend")
+        gateway = GatewaySerial(puertas, "http://backend", lambda frame: None, cliente=cliente)
+        await gateway.iniciar()
+        for maestro, _, _ in ptys:
+            os.set_blocking(maestro, False)
+        try:
+            for maestro, _, _ in ptys:
+                os.write(maestro, b"capture\n")
+            return [await _leer_linea(maestro) for maestro, _, _ in ptys]
+        finally:
+            await gateway.detener()
+            for maestro, esclavo, _ in ptys:
+                os.close(maestro)
+                os.close(esclavo)
+
+    # El ESP32 espera una respuesta a cada disparo
+    assert asyncio.run(escenario()) == [b"ACCESO 0\n", b"ACCESO 0\n"]
+
+
+def test_puerto_desconectado_se_reabre_con_espera():
+    import tty  # solo POSIX
+
+    async def escenario():
+        lectura, escritura = os.pipe()
+        os.set_blocking(lectura, False)
+        os.close(escritura)  # os.read devuelve b"": adaptador desenchufado
+        maestro, esclavo, _ = _pty()
+        tty.setraw(esclavo)
+        os.set_blocking(maestro, False)
+        # Primera apertura, un reintento con el dispositivo ausente y la reconexión
+        aperturas = [lectura, FileNotFoundError("sin dispositivo"), os.dup(esclavo)]
+
+        def abrir(puerta):
+            siguiente = aperturas.pop(0)
+            if isinstance(siguiente, Exception):
+                raise siguiente
+            return siguiente
+
+        cliente = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"status": True, "usuario_id": 1, "mensaje": ""})),
+            base_url="http://backend")
+        gateway = GatewaySerial([Puerta("/dev/ttyUSB0", "ESP32_001", CapturaFija(1))], "http://backend", extractor,
+                                cliente=cliente, reintento_min=0.01)
+        gateway._abrir_puerto = abrir
+        await gateway.iniciar()
+        try:
+            for _ in range(200):
+                if not aperturas and not gateway._reaperturas:
+                    break
+                await asyncio.sleep(0.01)
+            os.write(maestro, b"capture\n")
+            return await _leer_linea(maestro)
+        finally:
+            await gateway.detener()
+            os.close(maestro)
+            os.close(esclavo)
+
+    assert asyncio.run(escenario()) == b"ACCESO 1\n"
+
+
+def test_detener_cancela_las_reaperturas_pendientes():
+    async def escenario():
+        lectura, escritura = os.pipe()
+        os.set_blocking(lectura, False)
+        os.close(escritura)
+        gateway = GatewaySerial([Puerta("/dev/ttyUSB0", "ESP32_001", CapturaFija(1))], "http://backend", extractor,
+                                reintento_min=0.01)
+        aperturas = [lectura]
+
+        def abrir(puerta):
+            if not aperturas:
+                raise OSError("sin dispositivo")
+            return aperturas.pop()
+
+        gateway._abrir_puerto = abrir
+        await gateway.iniciar()
+        await asyncio.sleep(0.05)
+        pendientes = len(gateway._reaperturas)
+        await gateway.detener()
+        return pendientes, len(gateway._reaperturas)
+
+    assert asyncio.run(escenario()) == (1, 0)
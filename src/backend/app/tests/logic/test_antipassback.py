@@ -0,0 +1,91 @@
+import sqlite3
+import pytest
+from backend.app.logic.antipassback import EstadoPresencia
+from backend.app.logic.change_log import VigilanteCambios
+from backend.app.logic.migrations import aplicar_migraciones
+from backend.app.tests.logic.test_change_log import ESQUEMA
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "data.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(ESQUEMA)
+    aplicar_migraciones(conn)
+    conn.close()
+    return path
+
+
+def _estado(db_file, **kwargs) -> EstadoPresencia:
+    return EstadoPresencia(VigilanteCambios(db_file), db_file, **kwargs)
+
+
+def test_rechaza_segunda_entrada_y_persiste(db_file):
+    estado = _estado(db_file)
+    try:
+        assert estado.admitir(5, "entrada", 1) is True
+        assert estado.admitir(5, "entrada", 2) is False
+        assert estado.admitir(5, "salida", 2) is True
+        assert estado.admitir(5, "salida", 1) is True  # solo modo "estricto" rechaza salidas repetidas
+        assert estado.admitir(10_000_000, "entrada", 1) is True  # id fuera del array denso
+        assert estado.admitir(10_000_000, "entrada", 1) is False
+        estado.vaciar()
+    finally:
+        estado.detener()
+
+    conn = sqlite3.connect(db_file)
+    filas = conn.execute("SELECT id_usuario, id_torniquete, tipo_acceso, resultado, observaciones FROM Registros").fetchall()
+    assert filas[:2] == [(5, 1, "entrada", 1, None), (5, 2, "entrada", 0, "anti-passback")]
+    assert len(filas) == 6
+    # Los registros persistidos alimentan también los contadores de tráfico
+    assert conn.execute("SELECT SUM(entradas), SUM(denegados) FROM TraficoHorario").fetchone() == (2, 2)
+
+
+def test_modo_estricto_y_caducidad(db_file):
+    estado = _estado(db_file, modo="estricto")
+    try:
+        assert estado.admitir(1, "salida", 1) is True
+        assert estado.admitir(1, "salida", 1) is False
+    finally:
+        estado.detener()
+
+    escritor = sqlite3.connect(db_file)
+    escritor.execute("INSERT INTO Registros (id_usuario, id_torniquete, fecha_hora, tipo_acceso, resultado) "
+                     "VALUES (2, 1, '2020-01-01 08:00:00', 'entrada', 1)")
+    escritor.commit()
+    caduca = _estado(db_file, expira=3600)
+    try:
+        assert caduca.admitir(2, "entrada", 1) is True  # la entrada anterior ya caducó
+        assert caduca.admitir(2, "entrada", 1) is False
+    finally:
+        caduca.detener()
+
+
+def test_reconstruye_desde_registros_y_sigue_a_otros_workers(db_file):
+    escritor = sqlite3.connect(db_file)  # otro worker
+    escritor.executemany(
+        "INSERT INTO Registros (id_usuario, id_torniquete, fecha_hora, tipo_acceso, resultado) VALUES (?, ?, ?, ?, ?)",
+        [(1, 1, "2025-10-20 08:00:00", "entrada", 1),
+         (2, 1, "2025-10-20 08:01:00", "entrada", 1),
+         (2, 3, "2025-10-20 17:00:00", "Salida", 1),
+         (3, 1, "2025-10-20 08:02:00", "entrada", 0)],
+    )
+    escritor.commit()
+
+    vigilante = VigilanteCambios(db_file)
+    estado = EstadoPresencia(vigilante, db_file)
+    assert estado.ultimo_paso(1)["sentido"] == "entrada"
+    assert estado.ultimo_paso(2) == {"sentido": "salida", "fecha_hora": "2025-10-20 17:00:00.000", "id_torniquete": 3}
+    assert estado.ultimo_paso(3) is None  # los pasos denegados no cambian el estado
+
+    escritor.execute(
+        "INSERT INTO Registros (id_usuario, id_torniquete, fecha_hora, tipo_acceso, resultado) "
+        "VALUES (3, 2, datetime('now', 'localtime'), 'entrada', 1)"
+    )
+    escritor.commit()
+    vigilante.sincronizar()
+    try:
+        assert estado.admitir(3, "entrada", 1) is False
+        assert estado.admitir(2, "entrada", 1) is True
+    finally:
+        estado.detener()
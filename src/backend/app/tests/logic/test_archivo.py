@@ -0,0 +1,128 @@
+import sqlite3
+from datetime import datetime
+import pytest
+from backend.app.logic.archivo import ArchivoMensual, limites_mes
+from backend.app.logic.migrations import aplicar_migraciones
+from backend.app.models.registros import RegistrosOut
+
+ESQUEMA = """
+CREATE TABLE Usuarios (id_usuario INTEGER PRIMARY KEY AUTOINCREMENT, nombre_completo TEXT, cargo TEXT, estado BOOLEAN DEFAULT 1, fecha_registro DATETIME);
+CREATE TABLE Biometria (id_biometria INTEGER PRIMARY KEY AUTOINCREMENT, id_usuario INTEGER NOT NULL, vector_facial TEXT, facial_hash TEXT, huella_hash TEXT, template_huella TEXT, rfid_tag TEXT, fecha_actualizacion DATETIME);
+CREATE TABLE Operarios (id_operario INTEGER PRIMARY KEY AUTOINCREMENT, nombre_operario TEXT, usuario_sistema TEXT, contraseña_hash TEXT, activo BOOLEAN);
+CREATE TABLE Torniquetes (id_torniquete INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT, ubicacion TEXT, estado BOOLEAN);
+CREATE TABLE Registros (id_registro INTEGER PRIMARY KEY AUTOINCREMENT, id_usuario INTEGER, id_torniquete INTEGER, id_operario INTEGER, fecha_hora DATETIME, tipo_acceso TEXT, imagen_capturada TEXT, resultado BOOLEAN, observaciones TEXT);
+CREATE TABLE RegistrosInvalidos (id_invalido INTEGER PRIMARY KEY AUTOINCREMENT, id_registro INTEGER NOT NULL, motivo TEXT, fecha_invalido DATETIME);
+"""
+
+AHORA = datetime(2025, 10, 20, 12, 0)
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "data.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(ESQUEMA)
+    aplicar_migraciones(conn)
+    # Dos registros por mes de mayo a octubre; un inválido en junio
+    conn.executemany(
+        "INSERT INTO Registros (id_usuario, id_torniquete, fecha_hora, tipo_acceso, resultado) VALUES (?, 1, ?, ?, 1)",
+        [(i, f"2025-{mes:02d}-{dia:02d} 08:00:00", "entrada" if dia == 1 else "salida")
+         for i, (mes, dia) in enumerate(((m, d) for m in range(5, 11) for d in (1, 28)), 1)],
+    )
+    conn.execute("INSERT INTO RegistrosInvalidos (id_registro, motivo, fecha_invalido) VALUES (3, 'x', '2025-06-02 09:00:00')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _trafico(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return (conn.execute("SELECT * FROM TraficoHorario ORDER BY hora").fetchall(),
+                conn.execute("SELECT dentro FROM Ocupacion").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def test_limites_mes():
+    assert limites_mes("2025-06") == ("2025-06-01", "2025-07-01")
+    assert limites_mes("2025-12") == ("2025-12-01", "2026-01-01")
+
+
+def test_archiva_meses_cerrados_sin_tocar_el_trafico(db_file, tmp_path):
+    archivo = ArchivoMensual(db_file, str(tmp_path / "archivo"), meses_calientes=3)
+    trafico = _trafico(db_file)
+
+    assert archivo.meses_pendientes(AHORA) == ["2025-05", "2025-06"]
+    assert archivo.archivar(AHORA) == {
+        "2025-05": {"Registros": 2, "RegistrosInvalidos": 0},
+        "2025-06": {"Registros": 2, "RegistrosInvalidos": 1},
+    }
+    assert archivo.meses_archivados() == ["2025-05", "2025-06"]
+    assert archivo.meses_pendientes(AHORA) == []
+    assert archivo.archivar(AHORA) == {}
+
+    conn = sqlite3.connect(db_file)
+    assert conn.execute("SELECT MIN(fecha_hora) FROM Registros").fetchone()[0] == "2025-07-01 08:00:00"
+    assert conn.execute("SELECT COUNT(*) FROM ArchivadoEnCurso").fetchone()[0] == 0
+    # Los contadores de tráfico conservan la historia archivada...
+    assert _trafico(db_file) == trafico
+    # ...y un borrado normal sigue descontando
+    conn.execute("DELETE FROM Registros WHERE fecha_hora = '2025-10-01 08:00:00'")
+    conn.commit()
+    conn.close()
+    assert _trafico(db_file)[1] == trafico[1] - 1
+
+
+def test_consulta_por_rango_une_archivos_y_base_caliente(db_file, tmp_path):
+    archivo = ArchivoMensual(db_file, str(tmp_path / "archivo"), meses_calientes=3)
+    antes = archivo.consultar(RegistrosOut, "2025-05-15", datetime(2025, 8, 2))
+    archivo.archivar(AHORA)
+
+    despues = archivo.consultar(RegistrosOut, "2025-05-15", datetime(2025, 8, 2))
+    assert despues == antes
+    assert [r["fecha_hora"][:10] for r in despues] == [
+        "2025-05-28", "2025-06-01", "2025-06-28", "2025-07-01", "2025-07-28", "2025-08-01",
+    ]
+    # Los archivos se adjuntan en solo lectura y se liberan al terminar
+    assert archivo.consultar(RegistrosOut, "2025-06-01", "2025-06-02")[0]["id_registro"] == 3
+
+
+def test_consulta_por_rango_con_fechas_separadas_por_t(db_file, tmp_path):
+    conn = sqlite3.connect(db_file)
+    conn.executemany(
+        "INSERT INTO Registros (id_usuario, id_torniquete, fecha_hora, tipo_acceso, resultado) VALUES (1, 1, ?, 'entrada', 1)",
+        [("2025-06-10T08:00:00",), ("2025-06-10 09:00:00",), ("2025-06-10T13:00:00",),
+         ("2025-10-20T08:00:00",), ("2025-10-20 09:00:00",), ("2025-10-20T06:00:00",), ("2025-10-21T08:00:00",)],
+    )
+    conn.commit()
+    conn.close()
+    archivo = ArchivoMensual(db_file, str(tmp_path / "archivo"), meses_calientes=3)
+    archivo.archivar(AHORA)  # junio pasa a su archivo mensual
+
+    for desde, hasta in ((datetime(2025, 10, 20, 7), datetime(2025, 10, 20, 12)), ("2025-10-20T07:00", "2025-10-20T12:00")):
+        assert [r["fecha_hora"] for r in archivo.consultar(RegistrosOut, desde, hasta)] == [
+            "2025-10-20T08:00:00", "2025-10-20 09:00:00",
+        ]
+    assert [r["fecha_hora"] for r in archivo.consultar(RegistrosOut, datetime(2025, 6, 10, 7), datetime(2025, 6, 10, 12))] == [
+        "2025-06-10T08:00:00", "2025-06-10 09:00:00",
+    ]
+
+
+def test_vacuum_incremental_libera_paginas(db_file, tmp_path):
+    archivo = ArchivoMensual(db_file, str(tmp_path / "archivo"), meses_calientes=0, paginas_vacuum=10**6)
+    assert archivo.vacuum_incremental() == 0  # sin auto_vacuum incremental no hace nada
+    archivo.convertir_vacuum_incremental()
+
+    conn = sqlite3.connect(db_file)
+    conn.executemany("INSERT INTO Registros (id_usuario, id_torniquete, fecha_hora, observaciones) VALUES (1, 1, '2025-01-05', ?)",
+                     [("x" * 500,) for _ in range(2000)])
+    conn.commit()
+    conn.close()
+    archivo.archivar(AHORA)
+    conn = sqlite3.connect(db_file)
+    try:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    finally:
+        conn.close()
@@ -0,0 +1,105 @@
+import json
+import numpy as np
+from backend.app.core.config import _leer_umbrales
+from backend.app.logic.calibration import (
+    cargar_conjunto, curvas, distribuciones, main, preparar, puntuar, recomendar,
+)
+
+
+def _conjunto(identidades: int = 40, muestras: int = 4, ruido: float = 0.35, seed: int = 0):
+    """Embeddings agrupados por identidad: cada muestra es el centro más ruido."""
+    rng = np.random.default_rng(seed)
+    centros = rng.standard_normal((identidades, 128)).astype(np.float32)
+    vectores = [c + ruido * rng.standard_normal(128).astype(np.float32) for c in centros for _ in range(muestras)]
+    etiquetas = np.repeat(np.arange(identidades), muestras)
+    return vectores, etiquetas
+
+
+def test_bloques_equivalen_a_la_matriz_completa():
+    vectores, etiquetas = _conjunto()
+    matriz = preparar(vectores, "camara")
+    # Memoria mínima: fuerza bloques de pocas filas y muchos cruces entre bloques
+    genuinos, impostores, bordes = distribuciones(matriz, etiquetas, memoria_mb=0.01, bins=200)
+
+    scores = matriz @ matriz.T
+    i, j = np.triu_indices(len(matriz), k=1)
+    mismo = etiquetas[i] == etiquetas[j]
+    indices = np.clip(((scores[i, j] + 1) * 100).astype(np.int64), 0, 199)
+    assert np.array_equal(genuinos, np.bincount(indices[mismo], minlength=200))
+    assert np.array_equal(impostores, np.bincount(indices[~mismo], minlength=200))
+    assert genuinos.sum() == 40 * 6
+    assert genuinos.sum() + impostores.sum() == 160 * 159 // 2
+
+
+def test_curvas_y_umbrales_recomendados():
+    vectores, etiquetas = _conjunto()
+    genuinos, impostores, bordes = distribuciones(preparar(vectores, "camara"), etiquetas)
+    c = curvas(genuinos, impostores, bordes)
+    assert np.all(np.diff(c["far"]) <= 0) and np.all(np.diff(c["frr"]) >= 0)
+    assert c["far"][0] == 1 and c["frr"][0] == 0
+
+    calibracion = recomendar("camara", len(vectores), genuinos, impostores, bordes, far_objetivo=1e-3)
+    # Identidades bien separadas: el umbral deja fuera a los impostores sin rechazar genuinos
+    assert calibracion.far <= 1e-3
+    assert calibracion.frr < 0.05
+    assert calibracion.eer < 0.05
+    assert 0 < calibracion.umbral_far < 1
+
+
+def test_huella_vector_usa_correlacion():
+    rng = np.random.default_rng(1)
+    a = rng.integers(0, 256, 300).astype(np.float32)
+    b = rng.integers(0, 256, 320).astype(np.float32)
+    matriz = preparar([a, b], "huella_vector")
+    assert abs(float(matriz[0] @ matriz[1]) - np.corrcoef(a, b[:300])[0, 1]) < 1e-5
+
+
+def test_cli_escribe_umbrales_que_lee_la_configuracion(tmp_path):
+    vectores, etiquetas = _conjunto(identidades=10, muestras=3)
+    conjunto = tmp_path / "muestras.npz"
+    np.savez(conjunto, vectores=np.stack(vectores), etiquetas=etiquetas)
+    umbrales = tmp_path / "umbrales.json"
+    # El CLI conserva los umbrales de otros medios
+    umbrales.write_text(json.dumps({"umbrales": {"huella_vector": 0.9}}))
+
+    main(["--medio", "camara", "--conjunto", str(conjunto), "--far", "1e-2",
+          "--curvas", str(tmp_path / "roc.csv"), "--escribir", "--umbrales", str(umbrales)])
+
+    leidos = _leer_umbrales(str(umbrales))
+    assert leidos["huella_vector"] == 0.9
+    assert 0 < leidos["camara"] < 1
+    assert json.loads(umbrales.read_text())["calibracion"]["camara"]["muestras"] == 30
+    assert (tmp_path / "roc.csv").read_text().startswith("umbral,far,frr,tpr")
+
+    vectores_leidos, etiquetas_leidas = cargar_conjunto(str(conjunto), "camara")
+    assert np.stack(vectores_leidos).shape == (30, 128) and len(etiquetas_leidas) == 30
+
+
+def test_huella_con_longitudes_distintas_puntua_cada_par_como_el_verificador():
+    rng = np.random.default_rng(2)
+    base = rng.integers(0, 256, 400).astype(np.float32)
+    # Tres longitudes: recortar todo a la mínima daría otros scores que el verificador
+    vectores = [base[:300] + rng.normal(0, 20, 300).astype(np.float32), base[:350],
+                base[:400] + rng.normal(0, 20, 400).astype(np.float32), rng.integers(0, 256, 330).astype(np.float32)]
+    etiquetas = np.array([1, 1, 1, 2])
+    genuinos, impostores, _ = puntuar(vectores, etiquetas, "huella_vector", bins=200)
+
+    esperados_g, esperados_i = np.zeros(200, dtype=np.int64), np.zeros(200, dtype=np.int64)
+    for i in range(4):
+        for j in range(i + 1, 4):
+            m = min(len(vectores[i]), len(vectores[j]))
+            score = np.corrcoef(vectores[i][:m], vectores[j][:m])[0, 1]
+            destino = esperados_g if etiquetas[i] == etiquetas[j] else esperados_i
+            destino[min(int((score + 1) * 100), 199)] += 1
+    assert np.array_equal(genuinos, esperados_g) and np.array_equal(impostores, esperados_i)
+
+
+def test_cli_no_escribe_umbral_sin_pares_impostores_o_genuinos(tmp_path):
+    umbrales = tmp_path / "umbrales.json"
+    for identidades, muestras in ((1, 5), (6, 1)):  # una sola identidad / una muestra por identidad
+        vectores, etiquetas = _conjunto(identidades=identidades, muestras=muestras)
+        conjunto = tmp_path / f"muestras_{identidades}.npz"
+        np.savez(conjunto, vectores=np.stack(vectores), etiquetas=etiquetas)
+        codigo = main(["--medio", "camara", "--conjunto", str(conjunto), "--escribir", "--umbrales", str(umbrales)])
+        assert codigo == 1
+    assert not umbrales.exists()
@@ -0,0 +1,72 @@
+import base64
+import hashlib
+import sqlite3
+import numpy as np
+import pytest
+from backend.app.logic.change_log import VigilanteCambios
+from backend.app.logic.embedding_store import AlmacenEmbeddings
+from backend.app.logic.indice_biometria import IndiceBiometria
+from backend.app.logic.migrations import aplicar_migraciones
+
+ESQUEMA = """
+CREATE TABLE Usuarios (id_usuario INTEGER PRIMARY KEY AUTOINCREMENT, nombre_completo TEXT, cargo TEXT, estado BOOLEAN DEFAULT 1, fecha_registro DATETIME);
+CREATE TABLE Biometria (id_biometria INTEGER PRIMARY KEY AUTOINCREMENT, id_usuario INTEGER NOT NULL, vector_facial TEXT, facial_hash TEXT, huella_hash TEXT, template_huella TEXT, rfid_tag TEXT, fecha_actualizacion DATETIME);
+CREATE TABLE Operarios (id_operario INTEGER PRIMARY KEY AUTOINCREMENT, nombre_operario TEXT, usuario_sistema TEXT, contraseña_hash TEXT, activo BOOLEAN);
+CREATE TABLE Torniquetes (id_torniquete INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT, ubicacion TEXT, estado BOOLEAN);
+CREATE TABLE Registros (id_registro INTEGER PRIMARY KEY AUTOINCREMENT, id_usuario INTEGER, id_torniquete INTEGER, id_operario INTEGER, fecha_hora DATETIME, tipo_acceso TEXT, imagen_capturada TEXT, resultado BOOLEAN, observaciones TEXT);
+"""
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "data.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(ESQUEMA)
+    aplicar_migraciones(conn)
+    conn.close()
+    return path
+
+
+def test_vigilante_entrega_solo_filas_cambiadas(db_file):
+    escritor = sqlite3.connect(db_file)  # otro worker
+    escritor.execute("INSERT INTO Torniquetes (tipo) VALUES ('A'), ('B')")
+    escritor.commit()
+
+    vigilante = VigilanteCambios(db_file)
+    recibidos = []
+    vigilante.suscribir("Torniquetes", recibidos.append)
+    assert vigilante.sincronizar() == 0  # nada nuevo desde la marca de agua
+
+    escritor.execute("UPDATE Torniquetes SET tipo = 'C' WHERE id_torniquete = 2")
+    escritor.execute("DELETE FROM Torniquetes WHERE id_torniquete = 1")
+    escritor.commit()
+
+    assert vigilante.sincronizar() == 2
+    assert recibidos == [{1: None, 2: {"id_torniquete": 2, "tipo": "C", "ubicacion": None, "estado": None}}]
+    assert vigilante.sincronizar() == 0
+
+
+def test_indice_biometria_aplica_cambios_de_otro_worker(db_file, tmp_path):
+    indice = IndiceBiometria(VigilanteCambios(db_file), AlmacenEmbeddings(str(tmp_path / "embeddings.bin")))
+    assert indice.usuario_por_rfid("TAG") is None
+
+    embedding = np.random.default_rng(3).standard_normal(128).astype(np.float32)
+    norm = embedding / (np.linalg.norm(embedding) + 1e-8)
+    facial_hash = hashlib.sha256(norm.tobytes()).hexdigest()[:8]
+    escritor = sqlite3.connect(db_file)
+    escritor.execute(
+        "INSERT INTO Biometria (id_biometria, id_usuario, rfid_tag, vector_facial, facial_hash) VALUES (1, 7, 'TAG', ?, ?)",
+        (base64.b64encode(embedding.tobytes()).decode(), facial_hash),
+    )
+    escritor.commit()
+
+    indice.vigilante.sincronizar()
+    assert indice.usuario_por_rfid("TAG") == 7
+    [(id_usuario, guardado)] = indice.candidatos_faciales(facial_hash)
+    assert id_usuario == 7 and np.allclose(guardado, norm)
+
+    escritor.execute("DELETE FROM Biometria WHERE id_biometria = 1")
+    escritor.commit()
+    indice.vigilante.sincronizar()
+    assert indice.usuario_por_rfid("TAG") is None
+    assert indice.candidatos_faciales(facial_hash) == []
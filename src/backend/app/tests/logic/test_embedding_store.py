@@ -0,0 +1,81 @@
+import threading
+import time
+import numpy as np
+import pytest
+from backend.app.logic import embedding_store
+from backend.app.logic.embedding_store import AlmacenEmbeddings
+
+
+def _vectores(n, seed=0):
+    m = np.random.default_rng(seed).standard_normal((n, 128)).astype(np.float32)
+    return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("dtype,tolerancia", [("float32", 1e-7), ("int8", 1e-2)])
+def test_lector_ve_altas_y_bajas_del_escritor(tmp_path, dtype, tolerancia):
+    path = str(tmp_path / "emb.bin")
+    escritor = AlmacenEmbeddings(path, dtype=dtype)
+    m = _vectores(3)
+    escritor.reconstruir([10, 11, 12], m, watermark=5)
+
+    lector = AlmacenEmbeddings(path, dtype=dtype)  # otro worker
+    ids, leidos = lector.vectores([12, 10, 99])
+    assert ids == [12, 10]
+    assert np.allclose(leidos, m[[2, 0]], atol=tolerancia)
+
+    nuevo = _vectores(1, seed=1)[0]
+    assert escritor.aplicar({11: None, 12: nuevo, 13: nuevo}, watermark=6)
+    assert not lector.aplicar({13: nuevo}, watermark=6)  # versión ya aplicada por otro worker
+
+    ids, leidos = lector.vectores([10, 11, 12, 13])
+    assert ids == [10, 12, 13]
+    assert np.allclose(leidos[1], nuevo, atol=tolerancia)
+    assert len(lector) == 3 and lector.watermark == 6
+
+
+def test_compactacion_reemplaza_el_archivo(tmp_path):
+    path = str(tmp_path / "emb.bin")
+    escritor = AlmacenEmbeddings(path)
+    escritor.reconstruir([], np.empty((0, 128), dtype=np.float32), watermark=0)
+    lector = AlmacenEmbeddings(path)
+    assert len(lector) == 0
+
+    m = _vectores(1500)
+    escritor.aplicar(dict(zip(range(1500), m)), watermark=1)  # supera la capacidad inicial
+    escritor.aplicar(dict.fromkeys(range(1200)), watermark=2)  # deja más lápidas que filas vivas
+
+    ids, leidos = lector.vectores(list(range(1195, 1205)))
+    assert ids == list(range(1200, 1205))
+    assert np.allclose(leidos, m[1200:1205])
+    assert len(lector) == 300
+
+
+def test_lectores_concurrentes_durante_modificaciones_y_compactaciones(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, "_CAPACIDAD_MINIMA", 16)  # compacta cada pocas versiones
+    path = str(tmp_path / "emb.bin")
+    almacen = AlmacenEmbeddings(path)
+    almacen.reconstruir([1, 2], _vectores(2), watermark=0)
+    errores, parar = [], threading.Event()
+
+    def leer():
+        while not parar.is_set():
+            try:
+                ids, _ = almacen.vectores([1, 2])
+                if ids != [1, 2]:
+                    errores.append(ids)
+            except Exception as e:
+                errores.append(e)
+            time.sleep(0)  # cede el GIL al escritor
+
+    lectores = [threading.Thread(target=leer) for _ in range(3)]
+    for hilo in lectores:
+        hilo.start()
+    try:
+        # Cada versión reemplaza el vector de 1 y 2; las lápidas fuerzan compactaciones
+        for version in range(1, 300):
+            almacen.aplicar(dict(zip([1, 2], _vectores(2, seed=version))), watermark=version)
+    finally:
+        parar.set()
+        for hilo in lectores:
+            hilo.join()
+    assert errores == []
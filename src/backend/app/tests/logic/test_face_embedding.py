@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from backend.app.logic.face_embedding import ExtractorLotes, ModeloStub
+from backend.app.models.modelo_facial import ModeloFacial
+
+
+class ModeloContador(ModeloFacial):
+    """Registra el tamaño de cada lote; el embedding es el valor del frame."""
+
+    def __init__(self):
+        self.lotes = []
+
+    def extraer_lote(self, frames):
+        self.lotes.append(len(frames))
+        return [np.full(128, frame[0, 0, 0], dtype=np.float32) for frame in frames]
+
+
+def _frame(valor: int) -> np.ndarray:
+    return np.full((8, 8, 3), valor, dtype=np.uint8)
+
+
+def test_peticiones_concurrentes_se_agrupan_en_un_lote():
+    modelo = ModeloContador()
+    extractor = ExtractorLotes(modelo, max_lote=16, espera=0.2)
+    try:
+        futuros = [extractor.enviar(_frame(n)) for n in range(10)]
+        resultados = [f.result(timeout=2) for f in futuros]
+    finally:
+        extractor.detener()
+
+    assert modelo.lotes == [10]
+    # Cada petición recibe el embedding de su propio frame
+    assert [int(r[0]) for r in resultados] == list(range(10))
+
+
+def test_lote_limitado_a_max_lote():
+    modelo = ModeloContador()
+    extractor = ExtractorLotes(modelo, max_lote=4, espera=0.2)
+    try:
+        futuros = [extractor.enviar(_frame(n)) for n in range(10)]
+        for f in futuros:
+            f.result(timeout=2)
+    finally:
+        extractor.detener()
+
+    assert modelo.lotes == [4, 4, 2]
+
+
+def test_error_del_modelo_llega_a_todas_las_peticiones_del_lote():
+    class ModeloRoto(ModeloFacial):
+        def extraer_lote(self, frames):
+            raise RuntimeError("sin GPU")
+
+    extractor = ExtractorLotes(ModeloRoto(), espera=0.05)
+    try:
+        futuros = [extractor.enviar(_frame(0)) for _ in range(3)]
+        for f in futuros:
+            with pytest.raises(RuntimeError):
+                f.result(timeout=2)
+    finally:
+        extractor.detener()
+
+
+def test_peticion_cancelada_no_detiene_el_hilo_del_lote():
+    modelo = ModeloContador()
+    extractor = ExtractorLotes(modelo, espera=0.2)
+    try:
+        cancelado = extractor.enviar(_frame(1))
+        vivo = extractor.enviar(_frame(2))
+        assert cancelado.cancel()  # p. ej. el cliente cortó la conexión
+        assert int(vivo.result(timeout=2)[0]) == 2
+        # El hilo sigue atendiendo peticiones posteriores
+        assert int(extractor.enviar(_frame(3)).result(timeout=2)[0]) == 3
+    finally:
+        extractor.detener()
+    assert modelo.lotes == [1, 1]
+
+
+def test_lote_con_resultados_de_menos_falla_en_vez_de_colgar():
+    class ModeloIncompleto(ModeloFacial):
+        def extraer_lote(self, frames):
+            return [None] * (len(frames) - 1)
+
+    extractor = ExtractorLotes(ModeloIncompleto(), espera=0.05)
+    try:
+        futuros = [extractor.enviar(_frame(0)) for _ in range(3)]
+        for f in futuros:
+            with pytest.raises(RuntimeError, match="resultados"):
+                f.result(timeout=2)
+    finally:
+        extractor.detener()
+
+
+def test_stub_es_determinista_y_descarta_frames_uniformes():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (48, 64, 3), dtype=np.uint8)
+    primero, uniforme = ModeloStub().extraer_lote([frame, _frame(128)])
+    assert primero.shape == (128,) and primero.dtype == np.float32
+    assert np.array_equal(primero, ModeloStub().extraer_lote([frame])[0])
+    assert uniforme is None
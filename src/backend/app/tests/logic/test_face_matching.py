@@ -0,0 +1,99 @@
+import base64
+import threading
+import time
+import numpy as np
+import pytest
+from backend.app.core.config import settings
+from backend.app.logic import verification
+from backend.app.logic.embeddings import hash_facial, normalizar, normalizar_filas
+from backend.app.logic.verification import VerificadorCamara, comparador_facial
+
+
+class GaleriaFija:
+    """Sustituye a IndiceBiometria: usuarios 1..n con embeddings aleatorios."""
+
+    def __init__(self, n: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        # Como en Biometria: se guarda el vector original y el hash de su versión normalizada
+        self.originales = [rng.standard_normal(128).astype(np.float32) for _ in range(n)]
+        self.embeddings = [normalizar(v) for v in self.originales]
+        self.hashes = [hash_facial(e) for e in self.embeddings]
+        self.llamadas = 0
+
+    def galeria_facial(self, hash_prefixes):
+        self.llamadas += 1
+        filas = [k for k, h in enumerate(self.hashes) if h in hash_prefixes]
+        return (np.array([k + 1 for k in filas], dtype=np.int64),
+                np.stack([self.embeddings[k] for k in filas]) if filas else np.empty((0, 128), np.float32),
+                np.array([self.hashes[k] for k in filas], dtype="U8"))
+
+
+def test_lote_de_sondas_se_resuelve_con_una_consulta(monkeypatch):
+    galeria = GaleriaFija(5)
+    monkeypatch.setattr(verification, "indice_biometria", galeria)
+    desconocido = normalizar(np.random.default_rng(99).standard_normal(128).astype(np.float32))
+    sondas = [(galeria.embeddings[3], galeria.hashes[3]),
+              (desconocido, hash_facial(desconocido)),
+              (galeria.embeddings[0], galeria.hashes[0])]
+
+    assert VerificadorCamara._comparar_lote(sondas) == [(True, 4), (False, None), (True, 1)]
+    assert galeria.llamadas == 1
+
+
+def test_la_mascara_impide_coincidir_con_otro_facial_hash(monkeypatch):
+    galeria = GaleriaFija(2)
+    monkeypatch.setattr(verification, "indice_biometria", galeria)
+    # Sonda idéntica al usuario 1 pero etiquetada con el hash del usuario 2: no hay coincidencia
+    assert VerificadorCamara._comparar_lote([(galeria.embeddings[0], galeria.hashes[1])]) == [(False, None)]
+
+
+def test_verificaciones_concurrentes_comparten_lote(monkeypatch):
+    galeria = GaleriaFija(8, seed=1)
+    monkeypatch.setattr(verification, "indice_biometria", galeria)
+    monkeypatch.setattr(comparador_facial, "espera", 0.2)
+    lotes_antes = comparador_facial.lotes
+
+    resultados = [None] * 8
+    barrera = threading.Barrier(8)
+
+    def verificar(k):
+        vector = base64.b64encode(galeria.originales[k].tobytes()).decode()
+        barrera.wait()
+        resultados[k] = VerificadorCamara().verificar({"vector": vector})
+
+    hilos = [threading.Thread(target=verificar, args=(k,)) for k in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert resultados == [(True, k + 1) for k in range(8)]
+    assert comparador_facial.lotes - lotes_antes < 8
+
+
+def test_normalizar_filas_es_identico_byte_a_byte_a_normalizar():
+    rng = np.random.default_rng(3)
+    matriz = (rng.standard_normal((5000, 128)) * rng.uniform(0.01, 100, (5000, 1))).astype(np.float32)
+    filas = normalizar_filas(matriz)
+    # Cualquier diferencia de redondeo cambiaría el facial_hash respecto al verificador
+    assert all(f.tobytes() == normalizar(v).tobytes() for f, v in zip(filas, matriz))
+    assert [hash_facial(f) for f in filas] == [hash_facial(normalizar(v)) for v in matriz]
+
+
+def test_comparador_atascado_no_retiene_el_hilo_del_carril(monkeypatch):
+    galeria = GaleriaFija(2, seed=2)
+    monkeypatch.setattr(verification, "indice_biometria", galeria)
+    monkeypatch.setattr(settings, "COMPARACION_TIMEOUT_MS", 50)
+    comparar = comparador_facial.procesar_lote
+    monkeypatch.setattr(comparador_facial, "procesar_lote", lambda sondas: time.sleep(0.3) or comparar(sondas))
+    vector = base64.b64encode(galeria.originales[0].tobytes()).decode()
+
+    inicio = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        VerificadorCamara().verificar({"vector": vector})
+    assert time.perf_counter() - inicio < 0.25
+
+    # El comparador sigue atendiendo en cuanto se recupera
+    monkeypatch.setattr(comparador_facial, "procesar_lote", comparar)
+    monkeypatch.setattr(settings, "COMPARACION_TIMEOUT_MS", 2000)
+    assert VerificadorCamara().verificar({"vector": vector}) == (True, 1)
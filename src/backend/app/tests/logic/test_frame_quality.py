@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+from backend.app.logic.frame_quality import EvaluadorCalidad
+from backend.app.models.access import MotivoRechazo
+
+
+def _frame_nitido(brillo: int = 128) -> np.ndarray:
+    """Tablero de ajedrez de 640x480 (bordes marcados) centrado en `brillo`."""
+    tablero = (np.indices((480, 640)).sum(axis=0) // 40 % 2).astype(np.int16) * 80 - 40
+    return np.clip(tablero + brillo, 0, 255).astype(np.uint8)
+
+
+def test_frame_correcto_es_apto():
+    resultado = EvaluadorCalidad().evaluar(cv2.cvtColor(_frame_nitido(), cv2.COLOR_GRAY2BGR))
+    assert resultado.apta
+    assert resultado.nitidez > 30
+    assert 100 < resultado.brillo < 160
+
+
+def test_exposicion_y_desenfoque():
+    evaluador = EvaluadorCalidad()
+    assert evaluador.evaluar(_frame_nitido(20)).motivo == MotivoRechazo.subexpuesta
+    assert evaluador.evaluar(_frame_nitido(235)).motivo == MotivoRechazo.sobreexpuesta
+    borroso = cv2.GaussianBlur(_frame_nitido(), (0, 0), 25)
+    assert evaluador.evaluar(borroso).motivo == MotivoRechazo.desenfocada
+
+
+def test_tamano_del_rostro_con_detector():
+    frame = _frame_nitido()
+    sin_rostro = EvaluadorCalidad(detector=lambda gris: [])
+    assert sin_rostro.evaluar(frame).motivo == MotivoRechazo.sin_rostro
+
+    # El detector trabaja sobre el frame reducido (160x120): un rostro de 12 px es un 10 %
+    lejano = EvaluadorCalidad(detector=lambda gris: [(70, 50, 12, 12)])
+    resultado = lejano.evaluar(frame)
+    assert resultado.motivo == MotivoRechazo.rostro_pequeno
+    assert abs(resultado.rostro - 0.1) < 1e-6
+
+    cercano = EvaluadorCalidad(detector=lambda gris: [(5, 5, 10, 10), (40, 20, 60, 60)])
+    assert cercano.evaluar(frame).apta
+
+
+def test_evaluar_jpeg_invalido():
+    assert EvaluadorCalidad().evaluar_jpeg(b"no es un jpeg") is None
+    ok, jpeg = cv2.imencode(".jpg", _frame_nitido())
+    assert EvaluadorCalidad().evaluar_jpeg(jpeg.tobytes()).apta
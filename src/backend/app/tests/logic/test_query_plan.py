@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from backend.app.logic.query_plan import plan_de
+from backend.app.logic.universal_controller_server import UniversalController
+from backend.app.models.registros import RegistrosCreate, RegistrosOut
+
+controller = UniversalController()
+
+
+@pytest.fixture(autouse=True)
+def limpiar_db():
+    controller.clear_tables()
+    yield
+    controller.clear_tables()
+
+
+def _registros():
+    for i in range(1, 4):
+        controller.add(RegistrosCreate(id_registro=i, id_usuario=10 * i, id_torniquete=1,
+                                       fecha_hora=f"2025-10-20 10:0{i}:00", tipo_acceso="rfid",
+                                       resultado=i % 2 == 1, observaciones=f"r{i}"))
+
+
+def test_plan_compilado_una_vez_por_modelo():
+    plan = plan_de(RegistrosOut)
+    assert plan is plan_de(RegistrosOut()) and plan.clave == "id_registro"
+    assert plan.columnas == tuple(RegistrosOut.get_fields())
+    assert plan.sql_por_id.endswith("FROM Registros WHERE id_registro = ?")
+
+
+def test_get_by_id_sin_ddl_por_llamada_y_con_tipos_del_modelo():
+    _registros()
+    nuevo = UniversalController()
+    sentencias = []
+    nuevo.conn.set_trace_callback(sentencias.append)
+    try:
+        primero = nuevo.get_by_id(RegistrosOut, 1)
+        nuevo.get_by_id(RegistrosOut, 2)
+        nuevo.get_by_id(RegistrosOut, 3)
+    finally:
+        nuevo.conn.set_trace_callback(None)
+        nuevo.conn.close()
+
+    assert sum(s.startswith("CREATE TABLE") for s in sentencias) <= 1
+    # El BOOL guardado como 0/1 vuelve como bool, igual que con RegistrosOut(**fila)
+    assert primero == RegistrosOut(id_registro=1, id_usuario=10, id_torniquete=1, fecha_hora="2025-10-20 10:01:00",
+                                   tipo_acceso="rfid", resultado=True, observaciones="r1")
+    assert primero.resultado is True
+    assert controller.get_by_id(RegistrosOut, 99) is None
+
+
+def test_lecturas_masivas_en_tuplas_y_arrays():
+    _registros()
+    filas = controller.read_rows(RegistrosOut)
+    assert [f[0] for f in filas] == [1, 2, 3]
+    assert len(filas[0]) == len(RegistrosOut.get_fields())
+
+    assert controller.read_rows(RegistrosOut, ["id_usuario", "observaciones"]) == [(10, "r1"), (20, "r2"), (30, "r3")]
+    usuarios = controller.read_array(RegistrosOut, "id_usuario", np.int64)
+    assert usuarios.dtype == np.int64 and usuarios.tolist() == [10, 20, 30]
+
+    # read_all conserva su forma: dicts con las columnas de la tabla
+    assert controller.read_all(RegistrosOut)[1]["observaciones"] == "r2"
+
+    with pytest.raises(ValueError):
+        controller.read_rows(RegistrosOut, ["id_usuario; DROP TABLE Registros"])
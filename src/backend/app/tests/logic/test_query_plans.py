@@ -0,0 +1,127 @@
+import sqlite3
+import pytest
+from backend.app.logic import universal_controller_server
+from backend.app.logic.antipassback import _SELECT_NUEVOS
+from backend.app.models.biometria import BiometriaCreate, BiometriaOut
+from backend.app.models.historial_estado_usuario import HistorialEstadoUsuarioOut
+from backend.app.models.operarios import OperariosOut
+from backend.app.models.registros import RegistrosCreate, RegistrosOut
+from backend.app.models.registros_invalidos import RegistrosInvalidosOut
+from backend.app.models.torniquetes import TorniquetesOut
+from backend.app.models.usuarios import UsuariosOut
+
+# Esquema de logic/script_db.py (sin claves foráneas)
+ESQUEMA = """
+CREATE TABLE Usuarios (id_usuario INTEGER PRIMARY KEY AUTOINCREMENT, nombre_completo TEXT, cargo TEXT, estado BOOLEAN DEFAULT 1, fecha_registro DATETIME);
+CREATE TABLE Biometria (id_biometria INTEGER PRIMARY KEY AUTOINCREMENT, id_usuario INTEGER NOT NULL, vector_facial TEXT, facial_hash TEXT, huella_hash TEXT, template_huella TEXT, rfid_tag TEXT, fecha_actualizacion DATETIME);
+CREATE TABLE Operarios (id_operario INTEGER PRIMARY KEY AUTOINCREMENT, nombre_operario TEXT, usuario_sistema TEXT, contraseña_hash TEXT, activo BOOLEAN);
+CREATE TABLE Torniquetes (id_torniquete INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT, ubicacion TEXT, estado BOOLEAN);
+CREATE TABLE Registros (id_registro INTEGER PRIMARY KEY AUTOINCREMENT, id_usuario INTEGER NOT NULL, id_torniquete INTEGER NOT NULL, id_operario INTEGER, fecha_hora DATETIME, tipo_acceso TEXT, imagen_capturada TEXT, resultado BOOLEAN, observaciones TEXT);
+CREATE TABLE RegistrosInvalidos (id_invalido INTEGER PRIMARY KEY AUTOINCREMENT, id_registro INTEGER NOT NULL, motivo TEXT, fecha_invalido DATETIME);
+CREATE TABLE HistorialEstadoUsuario (id_historial INTEGER PRIMARY KEY AUTOINCREMENT, id_usuario INTEGER NOT NULL, estado_anterior BOOLEAN, estado_nuevo BOOLEAN, fecha_cambio DATETIME, motivo TEXT);
+"""
+
+MODELOS = (UsuariosOut, BiometriaOut, OperariosOut, TorniquetesOut, RegistrosOut, RegistrosInvalidosOut,
+           HistorialEstadoUsuarioOut)
+
+# Consultas frecuentes fuera de UniversalController: (sql, parámetros)
+CONSULTAS = [
+    # Rangos de fecha del archivo mensual y meses pendientes
+    ("SELECT * FROM Registros WHERE fecha_hora >= ? AND fecha_hora < ?", ("2025-01-01", "2025-02-01")),
+    ("SELECT * FROM Registros WHERE fecha_hora >= ? AND fecha_hora < ? "
+     "AND replace(fecha_hora, 'T', ' ') >= ? AND replace(fecha_hora, 'T', ' ') < ?",
+     ("2025-01-01 07:00", "2025-01-01T12:00", "2025-01-01 07:00", "2025-01-01 12:00")),
+    ("SELECT * FROM RegistrosInvalidos WHERE fecha_invalido >= ? AND fecha_invalido < ?", ("2025-01-01", "2025-02-01")),
+    ("SELECT * FROM HistorialEstadoUsuario WHERE fecha_cambio >= ? AND fecha_cambio < ?", ("2025-01-01", "2025-02-01")),
+    ("SELECT DISTINCT substr(fecha_hora, 1, 7) FROM Registros WHERE fecha_hora < ?", ("2025-01-01",)),
+    # Historial de un usuario o torniquete
+    ("SELECT fecha_hora FROM Registros WHERE id_usuario = ? ORDER BY fecha_hora DESC LIMIT 50", (1,)),
+    ("SELECT * FROM Registros WHERE id_torniquete = ? AND fecha_hora >= ?", (1, "2025-01-01")),
+    ("SELECT * FROM HistorialEstadoUsuario WHERE id_usuario = ? ORDER BY fecha_cambio", (1,)),
+    ("SELECT * FROM RegistrosInvalidos WHERE id_registro = ?", (1,)),
+    # Credenciales: verificación y feed incremental
+    ("SELECT id_usuario FROM Biometria WHERE rfid_tag = ?", ("A1",)),
+    ("SELECT id_usuario FROM Biometria WHERE facial_hash = ?", ("abcd1234",)),
+    ("SELECT id_biometria FROM Biometria WHERE id_usuario IN (?, ?)", (1, 2)),
+    # Log de cambios, generación de la caché y anti-passback
+    ("SELECT COALESCE(MAX(version), 0) FROM RegistroCambios WHERE tabla = ?", ("Biometria",)),
+    ("SELECT tabla, id_registro FROM RegistroCambios WHERE version > ? AND version <= ?", (1, 5)),
+    ("SELECT DISTINCT id_registro FROM RegistroCambios WHERE tabla = 'Biometria' AND version > ?", (1,)),
+    ("SELECT id_torniquete, hora, entradas FROM TraficoHorario WHERE hora >= ? AND hora < ?", ("2025", "2026")),
+    (_SELECT_NUEVOS, (1, 5)),
+]
+
+
+def _escaneos(conn: sqlite3.Connection, sql: str, params=()) -> list[str]:
+    """Pasos del plan que recorren una tabla o índice entero."""
+    return [fila[3] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params) if fila[3].startswith("SCAN")]
+
+
+@pytest.fixture
+def controller(tmp_path, monkeypatch):
+    db_file = str(tmp_path / "data.db")
+    conn = sqlite3.connect(db_file)
+    conn.executescript(ESQUEMA)
+    conn.close()
+    monkeypatch.setattr(universal_controller_server, "DB_FILE", db_file)
+    controller = universal_controller_server.UniversalController()
+    yield controller
+    controller.conn.close()
+
+
+@pytest.mark.parametrize("sql, params", CONSULTAS, ids=[sql.split("WHERE")[0].strip()[:40] for sql, _ in CONSULTAS])
+def test_consultas_frecuentes_usan_indices(controller, sql, params):
+    assert _escaneos(controller.conn, sql, params) == []
+
+
+def test_consultas_de_universal_controller_usan_indices(controller):
+    controller.add(BiometriaCreate(id_biometria=1, id_usuario=1, rfid_tag="AB12", facial_hash="abcd1234"))
+    controller.add(RegistrosCreate(id_registro=1, id_usuario=1, id_torniquete=1, fecha_hora="2025-01-01 08:00:00"))
+
+    sentencias = []
+    controller.conn.set_trace_callback(sentencias.append)
+    try:
+        for modelo in MODELOS:
+            controller._get_by_id(modelo, 1)
+        for campo, valor in (("rfid_tag", "AB12"), ("facial_hash", "abcd1234"), ("id_usuario", 1)):
+            controller.get_by_field("Biometria", campo, valor)
+        for campo in ("id_usuario", "id_torniquete", "fecha_hora"):
+            controller.get_by_field("Registros", campo, 1)
+        assert [b["id_biometria"] for b in controller.get_by_field_like("Biometria", "rfid_tag", "AB")] == [1]
+        controller.update(RegistrosCreate(id_registro=1, id_usuario=1, id_torniquete=2))
+        controller.update(BiometriaCreate(id_biometria=1, id_usuario=1, rfid_tag="CD34"))
+        controller.delete(RegistrosCreate(id_registro=1))
+        controller.delete(BiometriaCreate(id_biometria=1))
+    finally:
+        controller.conn.set_trace_callback(None)
+
+    consultas = [s for s in sentencias if s.lstrip().split(" ", 1)[0].upper() in ("SELECT", "UPDATE", "DELETE")]
+    assert len(consultas) >= len(MODELOS) + 9
+    for sql in consultas:
+        assert _escaneos(controller.conn, sql) == [], sql
+
+
+def test_get_by_field_like_es_un_rango_por_prefijo(controller):
+    for i, tag in enumerate(("AB12", "AB99", "AC00", "ab12", "A%"), 1):
+        controller.add(BiometriaCreate(id_biometria=i, id_usuario=i, rfid_tag=tag))
+    assert [b["rfid_tag"] for b in controller.get_by_field_like("Biometria", "rfid_tag", "AB")] == ["AB12", "AB99"]
+    assert [b["rfid_tag"] for b in controller.get_by_field_like("Biometria", "rfid_tag", "A%")] == ["A%"]
+    assert len(controller.get_by_field_like("Biometria", "rfid_tag", "")) == 5
+
+
+def test_tablas_creadas_tras_las_migraciones_reciben_sus_indices(tmp_path, monkeypatch):
+    # Base sin RegistrosInvalidos ni HistorialEstadoUsuario: la migración de índices no las ve
+    db_file = str(tmp_path / "data.db")
+    conn = sqlite3.connect(db_file)
+    conn.executescript("\n".join(l for l in ESQUEMA.splitlines() if "RegistrosInvalidos" not in l
+                                 and "HistorialEstadoUsuario" not in l))
+    conn.close()
+    monkeypatch.setattr(universal_controller_server, "DB_FILE", db_file)
+    controller = universal_controller_server.UniversalController()
+    try:
+        for modelo in (RegistrosInvalidosOut, HistorialEstadoUsuarioOut):
+            controller.read_all(modelo)  # crea la tabla
+        for sql, params in CONSULTAS[2:4] + CONSULTAS[7:9]:
+            assert _escaneos(controller.conn, sql, params) == [], sql
+    finally:
+        controller.conn.close()